@@ -0,0 +1,48 @@
+# Quality vs. time for the balanced distribution engine.
+# Run from the repo root: python -m benchmarks.bench_distribution
+import random
+import time
+
+import numpy as np
+
+from kentep_core.distribution import distribute_balanced
+from kentep_core.players import POSITIONS
+
+POOL_SIZES = [(100, 8), (1000, 26), (5000, 40)]
+TIME_BUDGETS = [0.05, 0.1, 0.25, 0.5, 1.0]
+SEEDS = [1, 2, 3]
+
+
+def make_pool(n, seed):
+    rng = random.Random(seed)
+    players = [{'name': f"Player {i}", 'rating': rng.randint(1, 10), 'position': rng.choice(POSITIONS[1:] + (None,))} for i in range(n)]
+    together = [(f"Player {i}", f"Player {i + 1}") for i in range(0, min(n, 40), 4)]
+    apart = [(f"Player {i}", f"Player {i + 2}") for i in range(1, min(n, 40), 4)]
+    return players, together, apart
+
+
+def round_robin_spread(players, num_teams, seed):
+    order = list(range(len(players)))
+    random.Random(seed).shuffle(order)
+    sums = np.zeros(num_teams)
+    for idx, player_idx in enumerate(order):
+        sums[idx % num_teams] += players[player_idx]['rating']
+    return float(sums.max() - sums.min())
+
+
+def main():
+    print(f"{'players':>8} {'teams':>6} {'budget s':>9} {'elapsed s':>10} {'spread':>8} {'random':>8} {'broken':>7} {'iters':>8}")
+    for n, num_teams in POOL_SIZES:
+        for budget in TIME_BUDGETS:
+            rows = []
+            for seed in SEEDS:
+                players, together, apart = make_pool(n, seed)
+                started = time.perf_counter()
+                _, report = distribute_balanced(players, num_teams, together, apart, time_budget=budget, seed=seed)
+                rows.append((time.perf_counter() - started, report['rating_spread'], round_robin_spread(players, num_teams, seed), report['violations'], report['iterations']))
+            elapsed, spread, random_spread, broken, iterations = (float(np.mean(col)) for col in zip(*rows))
+            print(f"{n:>8} {num_teams:>6} {budget:>9.2f} {elapsed:>10.3f} {spread:>8.2f} {random_spread:>8.2f} {broken:>7.1f} {iterations:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
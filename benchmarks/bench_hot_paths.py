@@ -0,0 +1,131 @@
+# Timings of the app's hot paths at growing pool sizes, for spotting regressions.
+# Run from the repo root:
+#   python -m benchmarks.bench_hot_paths                       # print the table
+#   python -m benchmarks.bench_hot_paths --save before.json    # keep the results
+#   python -m benchmarks.bench_hot_paths --baseline before.json  # flag cases that got slower (exit 1)
+import argparse
+import datetime
+import json
+import random
+import sys
+import time
+
+from kentep_core.event import build_event, default_event_settings
+from kentep_core.fixtures import schedule_event_fixtures
+from kentep_core.model import pack, unpack
+from kentep_core.players import POSITIONS
+from kentep_core.poster import image_output_available, render_poster
+from kentep_core.registry import find_duplicates
+from kentep_core.state import json_default, snapshot_hash
+from kentep_core.teams import form_teams
+
+PLAYER_COUNTS = [10, 100, 1000, 10000]
+PLAYERS_PER_TEAM = 8
+MAX_TEAMS = 100           # a round robin of 100 teams is already 4,950 games
+BALANCE_TIME_BUDGET = 0.1
+MAX_IMAGE_PLAYERS = 100   # a 1,000 player PDF is ~60 pages and takes seconds per render
+MIN_SECONDS = 0.2         # repeat fast cases until at least this much time is measured
+REPEATS = 3
+REGRESSION_RATIO = 1.5  # sub-millisecond cases jitter by ~30% between runs
+FIRST_NAMES = ["Budi", "Andi", "Joko", "Rizky", "Fajar", "Dedi", "Agus", "Rudi", "Eko", "Bayu", "Hendra", "Yusuf"]
+
+
+def make_players(n, seed=1):
+    # Realistic-ish names with some repeats and near-duplicates ("Budi S" / "Budi S.").
+    rng = random.Random(seed)
+    players = []
+    for i in range(n):
+        name = f"{rng.choice(FIRST_NAMES)} {chr(65 + i % 26)}{i // 26}"
+        if i % 50 == 49: name = players[i - 1]['name'] + "."
+        players.append({'name': name, 'rating': float(rng.randint(1, 10)), 'position': rng.choice(POSITIONS[1:] + (None,))})
+    return players
+
+
+def team_count(n):
+    return max(2, min(n // PLAYERS_PER_TEAM, MAX_TEAMS))
+
+
+def measure(func):
+    # Best of REPEATS, each averaged over enough loops to reach MIN_SECONDS.
+    started = time.perf_counter()
+    func()
+    first = time.perf_counter() - started
+    loops = max(1, int(MIN_SECONDS / first)) if first > 0 else 1000
+    best = first
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best
+
+
+def cases(n):
+    players = make_players(n)
+    goalkeepers, outfield = players[:n // 10], players[n // 10:]
+    num_teams = team_count(n)
+    settings = dict(default_event_settings(datetime.date(2024, 10, 12)), num_teams=num_teams, event_time_end=datetime.time(23, 0))
+    snapshot, _ = build_event(settings, outfield, goalkeepers, balance=False, seed=1)
+    team_ids = [t['id'] for t in snapshot['teams_data']]
+    names = [p['name'] for p in players]
+
+    yield 'distribution (shuffle)', lambda: form_teams(outfield, goalkeepers, num_teams, balance=False, rng=random.Random(1))
+    yield f'distribution (balanced, {BALANCE_TIME_BUDGET:g}s budget)', lambda: form_teams(outfield, goalkeepers, num_teams, seed=1, time_budget=BALANCE_TIME_BUDGET, rng=random.Random(1))
+    yield 'fixtures', lambda: schedule_event_fixtures(team_ids, settings['event_date'], settings['kick_off_time'], settings['event_time_start'],
+                                                      settings['event_time_end'], settings['game_duration'], pitches=4)
+    yield 'poster txt', lambda: render_poster(snapshot, 'txt')
+    if image_output_available() and n <= MAX_IMAGE_PLAYERS:
+        yield 'poster pdf', lambda: render_poster(snapshot, 'pdf')
+    yield 'duplicate detection', lambda: find_duplicates(names)
+    yield 'snapshot json', lambda: json.dumps(snapshot, default=json_default)
+    yield 'snapshot hash', lambda: snapshot_hash(snapshot)
+    packed = pack(snapshot)
+    yield 'snapshot pack', lambda: pack(snapshot)
+    yield 'snapshot unpack', lambda: unpack(packed)
+
+
+def run(player_counts):
+    results = {}
+    for n in player_counts:
+        for name, func in cases(n):
+            results[f"{name} @ {n}"] = measure(func)
+            print(f"{name:<38} {n:>7} {results[f'{name} @ {n}'] * 1000:>11.2f} ms", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold=REGRESSION_RATIO):
+    slower = []
+    print(f"\n{'case':<48} {'baseline ms':>12} {'now ms':>10} {'ratio':>7}")
+    for case, seconds in results.items():
+        if case not in baseline: continue
+        ratio = seconds / baseline[case] if baseline[case] else float('inf')
+        flag = " <-- slower" if ratio > threshold else ""
+        print(f"{case:<48} {baseline[case] * 1000:>12.2f} {seconds * 1000:>10.2f} {ratio:>7.2f}{flag}")
+        if flag: slower.append(case)
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kentep hot path benchmarks")
+    parser.add_argument('--players', type=int, nargs='+', default=PLAYER_COUNTS, help="pool sizes to run")
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare against a JSON file written by --save")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_RATIO, help="slowdown ratio that counts as a regression")
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<38} {'players':>7} {'time':>14}")
+    results = run(args.players)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=1)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as fh:
+            slower = compare(results, json.load(fh), args.threshold)
+        if slower:
+            print(f"\n{len(slower)} case(s) more than {args.threshold:g}x slower than the baseline")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+# Payload and memory of an event snapshot: legacy dict tree vs. the typed model / compact record.
+# Run from the repo root: python -m benchmarks.bench_snapshot_size
+import copy
+import json
+import tracemalloc
+
+from benchmarks.bench_hot_paths import PLAYER_COUNTS, make_players, team_count
+from kentep_core.event import build_event, default_event_settings
+from kentep_core.ledger import PaymentLedger
+from kentep_core.model import Event, compact_record, pack
+from kentep_core.state import json_default
+
+
+def make_snapshot(n):
+    players = make_players(n)
+    snapshot, _ = build_event(dict(default_event_settings(), num_teams=team_count(n)), players[n // 10:], players[:n // 10], balance=False, seed=1)
+    ledger = PaymentLedger([])
+    for team in snapshot['teams_data']:
+        for player in team['players']:
+            player['player_uid'] = f"u{player['id']}"
+            if len(ledger.events) < n // 2: ledger.record(player['id'], 50000, note="tf")
+    snapshot['payment_ledger'] = ledger.events
+    return json.loads(json.dumps(snapshot, default=json_default))
+
+
+def traced_bytes(build):
+    tracemalloc.start()
+    try:
+        kept = build()
+        return tracemalloc.get_traced_memory()[0], kept
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    print(f"{'players':>8} {'json B':>10} {'compact B':>10} {'packed B':>10} {'dicts B':>10} {'model B':>10}")
+    for n in PLAYER_COUNTS:
+        snapshot = make_snapshot(n)
+        legacy = len(json.dumps(snapshot).encode('utf-8'))
+        compact = len(json.dumps(compact_record(snapshot), separators=(',', ':')).encode('utf-8'))
+        dict_memory, _ = traced_bytes(lambda: copy.deepcopy((snapshot['teams_data'], snapshot['payment_ledger'])))
+        model_memory, _ = traced_bytes(lambda: Event.from_snapshot(snapshot))
+        print(f"{n:>8} {legacy:>10} {compact:>10} {len(pack(snapshot)):>10} {dict_memory:>10} {model_memory:>10}")
+
+
+if __name__ == '__main__':
+    main()
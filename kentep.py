@@ -2,248 +2,1272 @@
 # app.py
 import streamlit as st
 import datetime
-import random
-import json
 import requests
-import os
-import copy
-from itertools import combinations
+import sqlite3
+import itertools
+import zipfile
 import math
-from io import BytesIO
-
-# --- Basic Colors Definition ---
-BASIC_COLORS_LIMITED = {
-    "Blue": "#0000FF", "Yellow": "#FFFF00", "White": "#FFFFFF",
-    "Black": "#000000", "Red": "#FF0000"
-}
-BASIC_COLOR_HEX_LIST = list(BASIC_COLORS_LIMITED.values())
-
-COLOR_TO_EMOJI_MAP = {
-    "#0000FF": "🔵", "#FFFF00": "🟡", "#FFFFFF": "⚪",
-    "#000000": "⚫", "#FF0000": "🔴",
-}
-DEFAULT_COLOR_EMOJI = "🎨"
+import time
+import functools
+import pandas as pd
+from kentep_core.sync import CloudSyncWorker, DeltaSyncClient, JSONBIN_BASE_URL
+from kentep_core.storage import JsonBinStorage, SQLiteStorage, DeltaStorage, event_key_for, legacy_event_id, to_json_record
+from kentep_core.cache import SnapshotCache
+from kentep_core.delta import keyed_view, snapshot_from_view, apply_ops, split_path
+from kentep_core.players import POSITIONS, parse_player_entry, parse_constraints
+from kentep_core.teams import BASIC_COLORS_LIMITED, form_teams, register_team_players, new_player_id, generate_random_basic_color_hex
+from kentep_core.event import default_event_settings, coerce_event_settings, new_event_id
+from kentep_core.fixtures import schedule_event_fixtures, schedule_fixes, MAX_PITCHES, MIN_GAME_DURATION
+from kentep_core.registry import PlayerRegistry, find_duplicates, format_duplicate_report, DUPLICATE_REPORT_LIMIT
+from kentep_core.rosters import GRID_COLUMNS, roster_rows, index_players, move_players, swap_players, apply_grid_changes
+from kentep_core.poster import (
+    COLOR_TO_EMOJI_MAP, DEFAULT_COLOR_EMOJI, POSTER_FORMATS, poster_snapshot, render_poster, render_batch, image_output_available, poster_hash
+)
+from kentep_core.importer import IMPORTERS, parse_player_list, split_into_pools
+from kentep_core.season import LeagueTable, match_key, record_match, team_rosters, player_names
+from kentep_core.live import (
+    MatchLog, log_event, pitch_queue, final_scores, KICKOFF, PAUSE, RESUME, END, GOAL, YELLOW, RED, VOID, NOT_STARTED, RUNNING, PAUSED
+)
+from kentep_core.ledger import (
+    PaymentLedger, LedgerSummary, book_paid_flags, book_payments, outstanding_entries, import_entries, PAYMENT, REFUND, iter_payment_matches, roster_name_matcher, EXACT_MATCH
+)
+from kentep_core.diagnostics import Timings, snapshot_size
+from kentep_core.viewer import SharedSnapshot
+from kentep_core.state import (
+    init_revision_tracking, bump_revision, has_unsynced_changes, mark_synced, changed_since_sync, cached_state_hash, key_revision,
+    mark_queued, queued_hash, confirm_queued
+)
 
 # --- Cloud Sync Config ---
 KEYS_TO_PERSIST = [
-    'event_title', 'event_date', 'event_time_start', 'event_time_end', 'event_place',
+    'event_id', 'event_title', 'event_date', 'event_time_start', 'event_time_end', 'event_place',
     'event_publisher', 'event_organizer', 'kick_off_time', 'price_player', 'price_gk',
     'num_teams', 'game_duration', 'teams_data', 'form_global_outfield_players',
-    'form_global_goalkeepers', 'players_distributed'
+    'form_global_goalkeepers', 'players_distributed', 'form_team_constraints',
+    'num_pitches', 'min_rest_minutes', 'changeover_minutes', 'double_round_robin', 'player_registry', 'payment_ledger',
+    'match_results', 'season_name', 'match_log'
 ]
+DEFAULT_SQLITE_PATH = "kentep.db"
+DEFAULT_SYNC_DOC_ID = "kentep"
+DEFAULT_CACHE_PATH = "kentep-cache.json"
+REVALIDATE_POLL_SECONDS = 1
+ROSTER_PAGE_SIZES = [25, 50, 100, 250]
+ROSTER_WIDGET_KEY_PREFIXES = ('p_name_', 'p_rem_', 'team_name_display_', 'team_color_hex_')
+# Keyed form widgets ignore a changed `value=`, so they are dropped whenever their source key is replaced.
+POOL_FORM_WIDGET_KEYS = ('form_outfield_input', 'form_gk_input', 'form_constraints_input')
+IMPORT_ERROR_ROWS = 200
+PAYMENT_HISTORY_ROWS = 50
+SEASON_PLAYER_ROWS = 50
+LIVE_TICK_SECONDS = 1
+LIVE_LOG_ROWS = 30
+VIEWER_QUERY_VALUE = "public"  # ?view=public
+VIEWER_REFRESH_SECONDS = 5
+LIVE_EVENT_ICONS = {KICKOFF: "▶️", PAUSE: "⏸️", RESUME: "▶️", END: "🏁", GOAL: "⚽", YELLOW: "🟨", RED: "🟥", VOID: "↩️"}
+
+# --- Diagnostics ---
+def get_timings():
+    timings = st.session_state.get('diagnostics_timings')
+    if timings is None:
+        timings = st.session_state.diagnostics_timings = Timings()
+    return timings
+
+def timed(name):
+    return get_timings().section(name)
+
+def timed_section(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@st.cache_resource
+def get_snapshot_cache(path):
+    return SnapshotCache(path)
+
+@st.cache_resource
+def get_jsonbin_storage(api_key, bin_id, base_url=JSONBIN_BASE_URL, cache_path=None):
+    worker = CloudSyncWorker(api_key, bin_id, base_url=base_url).start()
+    return JsonBinStorage(worker, cache=get_snapshot_cache(cache_path) if cache_path else None)
+
+@st.cache_resource
+def get_sqlite_storage(path):
+    return SQLiteStorage(path)
+
+@st.cache_resource
+def get_delta_storage(url, doc_id, token=None, cache_path=None):
+    return DeltaStorage(DeltaSyncClient(url, doc_id, token=token), cache=get_snapshot_cache(cache_path) if cache_path else None)
+
+def get_storage_backend():
+    # STORAGE_BACKEND secret: "jsonbin" (default), "sqlite" for a local database file, or "delta" for a
+    # shared kentep_core.syncserver (SYNC_SERVER_URL, SYNC_DOC_ID, SYNC_TOKEN) that merges concurrent edits.
+    # Remote backends keep a local snapshot cache at LOCAL_CACHE_PATH ("" turns it off).
+    backend = st.secrets.get("STORAGE_BACKEND", "jsonbin")
+    cache_path = st.secrets.get("LOCAL_CACHE_PATH", DEFAULT_CACHE_PATH)
+    if backend == "sqlite":
+        return get_sqlite_storage(st.secrets.get("SQLITE_PATH", DEFAULT_SQLITE_PATH))
+    if backend == "delta" and st.secrets.get("SYNC_SERVER_URL"):
+        return get_delta_storage(st.secrets["SYNC_SERVER_URL"], st.secrets.get("SYNC_DOC_ID", DEFAULT_SYNC_DOC_ID), st.secrets.get("SYNC_TOKEN"), cache_path)
+    api_key = st.secrets.get("JSONBIN_API_KEY")
+    bin_id = st.secrets.get("JSONBIN_BIN_ID")
+    if api_key and bin_id:
+        return get_jsonbin_storage(api_key, bin_id, st.secrets.get("JSONBIN_BASE_URL", JSONBIN_BASE_URL), cache_path)
+    return None
+
+def build_state_snapshot():
+    return {k: st.session_state.get(k) for k in KEYS_TO_PERSIST}
+
+def mark_state_changed(*keys):
+    bump_revision(st.session_state, *keys)
 
-def save_state_to_cloud(api_key, bin_id):
-    if not api_key or not bin_id:
+@timed_section("state hash")
+def current_state_hash():
+    return cached_state_hash(st.session_state, build_state_snapshot)
+
+def refresh_cloud_sync_status(storage):
+    storage_status = storage.describe_status()
+    if storage_status:
+        st.session_state['cloud_sync_status'] = storage_status
+
+def save_state_to_storage(storage):
+    # jsonbin only queues the snapshot here (the PUT runs on the sync worker) and returns a ticket for
+    # storage.save_confirmed(); sqlite writes straight away.
+    st.session_state.cache_clean = False
+    if storage.supports_delta:
+        known_conflicts = len(st.session_state.sync_conflicts)
+        incoming = sync_state_delta(storage)
+        if incoming or len(st.session_state.sync_conflicts) > known_conflicts:
+            # Widget-backed keys can only be replaced before their widgets exist: apply (and show new
+            # conflicts) on a fresh run.
+            st.session_state.sync_incoming = incoming
+            st.rerun(scope="app")
         return
+    ticket = None
     try:
-        headers = {
-            'Content-Type': 'application/json',
-            'X-Master-Key': api_key,
-            'X-Bin-Name': f"Kentep Event - {st.session_state.event_date.isoformat()}"
-        }
-        snapshot = {}
-        for k in KEYS_TO_PERSIST:
-            val = st.session_state.get(k)
-            if isinstance(val, (datetime.date, datetime.time)):
-                snapshot[k] = val.isoformat()
-            else:
-                snapshot[k] = val
-        
-        requests.put(f"https://api.jsonbin.io/v3/b/{bin_id}", json=snapshot, headers=headers, timeout=10)
-        st.session_state['cloud_sync_status'] = f"✅ Last sync: {datetime.datetime.now().strftime('%H:%M:%S')}"
-    except requests.exceptions.RequestException:
-        st.session_state['cloud_sync_status'] = "⚠️ Sync failed"
+        ticket = storage.save(build_state_snapshot(), label=f"Kentep Event - {st.session_state.event_date.isoformat()}")
+    except sqlite3.Error:
+        pass  # surfaced through describe_status()
+    refresh_cloud_sync_status(storage)
+    return ticket
+
+def conflict_state_key(path):
+    key = split_path(path)[0]
+    return 'teams_data' if key.startswith('roster_') else key
 
-def load_state_from_cloud(api_key, bin_id):
-    if not api_key or not bin_id:
+def sync_state_delta(storage):
+    # Sends this session's changes against the revision it last saw. Returns the keys whose values
+    # changed on the server (other organizers' edits) so the caller can load them into the session.
+    ss = st.session_state
+    try:
+        result = storage.sync(ss.sync_base_revision, ss.sync_base, build_state_snapshot(), held_paths=[c['path'] for c in ss.sync_conflicts])
+    except (requests.exceptions.RequestException, RuntimeError) as exc:
+        ss.cloud_sync_status = f"⚠️ Sync failed: {exc}"
+        return {}
+    ss.sync_base_revision, ss.sync_base = result['revision'], result['base']
+    if result['conflicts']:
+        known = {c['path'] for c in ss.sync_conflicts}
+        ss.sync_conflicts = ss.sync_conflicts + [c for c in result['conflicts'] if c['path'] not in known]
+    refresh_cloud_sync_status(storage)
+    if not result['remote']:
+        return {}
+    current = to_json_record(build_state_snapshot())
+    return {k: v for k, v in result['local'].items() if k in KEYS_TO_PERSIST and current.get(k) != v}
+
+def apply_incoming_sync():
+    incoming = st.session_state.pop('sync_incoming', None)
+    if incoming:
+        apply_loaded_snapshot(incoming, merge_registry=False)
+        mark_synced(st.session_state, current_state_hash())
+
+def on_sync_now(storage):
+    incoming = sync_state_delta(storage)
+    if incoming:
+        apply_loaded_snapshot(incoming, merge_registry=False)
+    mark_synced(st.session_state, current_state_hash())
+
+def on_resolve_conflict(index, keep_mine):
+    ss = st.session_state
+    conflict = ss.sync_conflicts[index]
+    ss.sync_conflicts = ss.sync_conflicts[:index] + ss.sync_conflicts[index + 1:]
+    if keep_mine:
+        mark_state_changed(conflict_state_key(conflict['path']))  # sent with the next save
+        return
+    op = {'op': 'remove', 'path': conflict['path']} if conflict['theirs'] is None else {'op': 'replace', 'path': conflict['path'], 'value': conflict['theirs']}
+    resolved = snapshot_from_view(apply_ops(keyed_view(to_json_record(build_state_snapshot())), [op]))
+    key = conflict_state_key(conflict['path'])
+    apply_loaded_snapshot({key: resolved[key]}, merge_registry=False)
+
+@timed_section("autosave")
+def autosave_state(storage):
+    ss = st.session_state
+    if not storage or not has_unsynced_changes(ss):
+        return
+    # A queued jsonbin write only counts once the worker confirms it: a refused PUT leaves the state unsynced.
+    if confirm_queued(ss, storage.save_confirmed) and not has_unsynced_changes(ss):
+        return
+    state_hash = current_state_hash()
+    if not changed_since_sync(ss, state_hash):
+        mark_synced(ss, state_hash)
+    elif state_hash != queued_hash(ss):
+        ticket = save_state_to_storage(storage)
+        if storage.save_confirmed(ticket):
+            mark_synced(ss, state_hash)
+        else:
+            mark_queued(ss, ticket, state_hash)
+
+def on_retry_sync(storage):
+    storage.retry_failed_save()
+    refresh_cloud_sync_status(storage)
+
+def clear_roster_widget_state():
+    # Keyed roster widgets would otherwise keep showing values from the previous event.
+    for k in [k for k in st.session_state.keys() if k.startswith(ROSTER_WIDGET_KEY_PREFIXES)]:
+        del st.session_state[k]
+
+@timed_section("load")
+def load_state_from_storage(storage, event_key=None):
+    if storage is None:
         st.session_state['cloud_sync_status'] = "Not configured"
         return
     try:
-        headers = {'X-Master-Key': api_key}
-        response = requests.get(f"https://api.jsonbin.io/v3/b/{bin_id}/latest", headers=headers, timeout=10)
-        response.raise_for_status()
-        loaded_data = response.json().get('record', {})
-
-        for k, v in loaded_data.items():
-            if k in KEYS_TO_PERSIST:
-                if k == 'event_date' and v:
-                    try: st.session_state[k] = datetime.datetime.strptime(v, "%Y-%m-%d").date()
-                    except (ValueError, TypeError): pass
-                elif k in ('event_time_start', 'event_time_end', 'kick_off_time') and v:
-                    try: st.session_state[k] = datetime.datetime.strptime(v, "%H:%M:%S").time()
-                    except (ValueError, TypeError): pass
-                else:
-                    st.session_state[k] = v
-        
-        st.session_state['cloud_sync_status'] = "🔄 Loaded from cloud"
-    except requests.exceptions.RequestException:
+        if storage.supports_delta:
+            revision, view = storage.fetch()
+            if not view:
+                # New document: this session's state becomes its first revision, so later diffs are real edits.
+                seeded = storage.sync(revision, view, build_state_snapshot())
+                revision, view = seeded['revision'], seeded['base']
+            st.session_state.sync_base_revision, st.session_state.sync_base = revision, view
+            st.session_state.sync_conflicts = []
+            loaded_data = snapshot_from_view(st.session_state.sync_base)
+        else:
+            loaded_data = storage.load_latest() if event_key is None else storage.load_event(event_key)
+        apply_full_snapshot(loaded_data)
+        st.session_state.cache_revision, st.session_state.cache_clean = storage.cached_revision(), True
+        st.session_state['cloud_sync_status'] = {"jsonbin": "🔄 Loaded from cloud", "delta": "🔄 Loaded from sync server"}.get(storage.name, "🔄 Loaded from local database")
+    except (requests.exceptions.RequestException, sqlite3.Error, RuntimeError):
         st.session_state['cloud_sync_status'] = "⚠️ Load failed"
+    except ValueError as exc:  # unreadable snapshot (newer format, unknown payment kind): keep the current state
+        st.session_state['cloud_sync_status'] = f"⚠️ Load failed: {exc}"
 
-# --- Helper Functions ---
-def generate_team_id(index):
-    if index < 26: return chr(ord('A') + index)
-    return chr(ord('A') + (index // 26) - 1) + chr(ord('A') + (index % 26))
+def apply_full_snapshot(loaded_data):
+    apply_loaded_snapshot(loaded_data)
+    if 'payment_ledger' not in loaded_data:
+        st.session_state.payment_ledger = []  # older snapshots: rebuilt from the paid flags
+    if 'match_results' not in loaded_data:
+        st.session_state.match_results = {}
+    if 'match_log' not in loaded_data:
+        st.session_state.match_log = []
+    if loaded_data and 'event_id' not in loaded_data:
+        st.session_state.event_id = legacy_event_id(loaded_data)  # keeps the row and season results it was saved under
+    mark_synced(st.session_state, current_state_hash())
 
-def generate_random_basic_color_hex():
-    return random.choice(BASIC_COLOR_HEX_LIST)
+# --- Local snapshot cache (stale-while-revalidate) ---
+def load_state_from_cache(storage):
+    # New sessions render straight from the process-wide cache; a background conditional fetch checks
+    # the cloud and refresh_from_cache() swaps in anything newer. False when there is nothing cached.
+    try:
+        cached = storage.load_cached()
+    except ValueError:
+        return False  # unreadable cached copy: load from the backend instead
+    if cached is None:
+        return False
+    apply_cached_entry(storage, cached)
+    fetched_at = datetime.datetime.fromisoformat(cached['fetched_at']).strftime('%H:%M') if cached.get('fetched_at') else "?"
+    st.session_state.cloud_sync_status = f"📦 Cached copy from {fetched_at} · checking for updates..."
+    st.session_state.awaiting_revalidation = storage.revalidate()
+    return True
 
-def generate_simplified_team_name_and_color(team_id_char):
-    team_name_display = f"Team {team_id_char}"
-    return team_name_display, generate_random_basic_color_hex()
+def apply_cached_entry(storage, cached):
+    apply_full_snapshot(cached['snapshot'])
+    if storage.supports_delta:
+        st.session_state.sync_base_revision, st.session_state.sync_base = cached['revision'], cached['doc']
+        st.session_state.sync_conflicts = []
+    st.session_state.cache_revision, st.session_state.cache_clean = cached['revision'], True
 
-@st.cache_data
-def parse_player_list_from_raw_text(raw_text):
-    player_names = []
-    if raw_text:
-        raw_lines = raw_text.strip().split('\n')
-        for line in raw_lines:
-            line = line.strip()
-            if not line: continue
-            name_part = line
-            if '.' in line and line.split('.')[0].strip().isdigit():
-                name_part = '.'.join(line.split('.')[1:]).strip()
-            elif ')' in line and line.split(')')[0].strip().isdigit():
-                name_part = ')'.join(line.split(')')[1:]).strip()
-            if name_part:
-                player_names.append(name_part)
-    return player_names
-
-@st.cache_data
-def generate_round_robin_fixtures(team_data_for_fixtures, game_duration):
-    if len(team_data_for_fixtures) < 2: return []
-    teams_for_algo = [(team['id'], team['display_name_with_emoji']) for team in team_data_for_fixtures]
-    original_first_team_id = teams_for_algo[0][0] if teams_for_algo else None
-    local_team_ids_with_display = list(teams_for_algo)
-    is_odd_teams = len(local_team_ids_with_display) % 2 != 0
-    if is_odd_teams: local_team_ids_with_display.append(("BYE", "BYE"))
-    n = len(local_team_ids_with_display)
-    rounds = n - 1
-    fixtures_output_strings = []
-    game_num = 1
-    for r in range(rounds):
-        for i in range(n // 2):
-            home_team_tuple = local_team_ids_with_display[i]
-            away_team_tuple = local_team_ids_with_display[n - 1 - i]
-            if home_team_tuple[0] == "BYE" or away_team_tuple[0] == "BYE": continue
-
-            current_home_id = home_team_tuple[0]
-            current_home_display = home_team_tuple[1]
-            current_away_display = away_team_tuple[1]
-
-            if current_home_id == original_first_team_id and r % 2 != 0 and not is_odd_teams:
-                fixture_str = f"{game_num:02d}. (H) {current_away_display} vs {current_home_display} (A)"
+def refresh_from_cache(storage):
+    # The cache moved on (revalidation, or another session's save). Sessions without edits of their own
+    # follow it; sessions with edits keep theirs and their next save wins (jsonbin) or merges (delta).
+    ss = st.session_state
+    revision = storage.cached_revision()
+    if revision is None or revision == ss.cache_revision:
+        return
+    if not ss.cache_clean or has_unsynced_changes(ss):
+        ss.cache_revision = revision
+        return
+    try:
+        cached = storage.load_cached()
+    except ValueError as exc:
+        ss.cache_revision, ss.cloud_sync_status = revision, f"⚠️ Newer copy could not be read: {exc}"
+        return
+    if cached is not None:
+        apply_cached_entry(storage, cached)
+        ss.cloud_sync_status = "🔄 Updated from cloud"
+
+@st.fragment(run_every=REVALIDATE_POLL_SECONDS)
+def revalidation_watch(storage):
+    status = storage.revalidation_status()
+    if status is None or status['running']:
+        return
+    st.session_state.awaiting_revalidation = False
+    if status['error']:
+        st.session_state.cloud_sync_status = f"📴 Offline ({status['error']}): showing the cached copy"
+    elif status['note']:
+        st.session_state.cloud_sync_status = status['note']
+    elif storage.cached_revision() == st.session_state.cache_revision:
+        st.session_state.cloud_sync_status = "✅ Cached copy is up to date"
+    st.rerun(scope="app")
+
+def apply_loaded_snapshot(loaded_data, merge_registry=True):
+    for k, v in loaded_data.items():
+        if k in KEYS_TO_PERSIST:
+            if k == 'event_date' and v:
+                try: st.session_state[k] = datetime.datetime.strptime(v, "%Y-%m-%d").date()
+                except (ValueError, TypeError): pass
+            elif k in ('event_time_start', 'event_time_end', 'kick_off_time') and v:
+                try: st.session_state[k] = datetime.datetime.strptime(v, "%H:%M:%S").time()
+                except (ValueError, TypeError): pass
+            elif k == 'player_registry' and merge_registry:
+                # Canonical players outlive events: merge instead of replacing.
+                st.session_state[k] = {**(v or {}), **st.session_state.get(k, {})}
             else:
-                fixture_str = f"{game_num:02d}. (H) {current_home_display} vs {current_away_display} (A)"
-
-            fixtures_output_strings.append(fixture_str)
-            game_num += 1
-        if n > 2:
-            last_team_tuple = local_team_ids_with_display.pop()
-            local_team_ids_with_display.insert(1, last_team_tuple)
-    return fixtures_output_strings
-
-# --- Defaults ---
-DEFAULT_EVENT_TITLE = "MINISOCCER EVENT"
-DEFAULT_EVENT_DATE = datetime.date.today() + datetime.timedelta(days=7)
-DEFAULT_EVENT_TIME_START = datetime.time(17, 0)
-DEFAULT_EVENT_TIME_END = datetime.time(19, 0)
-DEFAULT_EVENT_PLACE = "Local Pitch"
-DEFAULT_EVENT_PUBLISHER = "Organizer"
-DEFAULT_EVENT_ORGANIZER = "You!"
-DEFAULT_KICK_OFF_TIME = datetime.time(17, 15)
-DEFAULT_PRICE_PLAYER = 50000.0
-DEFAULT_PRICE_GK = 25000.0
-DEFAULT_NUM_TEAMS = 2
-DEFAULT_GAME_DURATION = 10
+                st.session_state[k] = v
+    clear_roster_widget_state()
+    for k in POOL_FORM_WIDGET_KEYS: st.session_state.pop(k, None)
+    mark_state_changed(*loaded_data.keys())
+
+# --- Helper Functions ---
+@st.cache_data(max_entries=16)
+def parse_player_list_from_raw_text(raw_text):
+    return parse_player_list(raw_text)
+
+@st.cache_data(max_entries=32)
+def build_fixture_schedule(team_ids, event_date, kick_off_time, event_time_start, event_time_end, game_duration,
+                           num_pitches, min_rest_minutes, changeover_minutes, double_round_robin):
+    return schedule_event_fixtures(team_ids, event_date, kick_off_time, event_time_start, event_time_end, game_duration,
+                                   num_pitches, min_rest_minutes, changeover_minutes, double_round_robin)
+
+@st.cache_data(max_entries=32)
+def build_schedule_fixes(team_ids, event_date, kick_off_time, event_time_start, event_time_end, game_duration,
+                         num_pitches, min_rest_minutes, changeover_minutes, double_round_robin):
+    return schedule_fixes(team_ids, event_date, kick_off_time, event_time_start, event_time_end, game_duration,
+                          num_pitches, min_rest_minutes, changeover_minutes, double_round_robin)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_poster_cached(content_hash, fmt, _snapshot):
+    return render_poster(_snapshot, fmt)
+
+def current_poster_hash():
+    return cached_state_hash(st.session_state, lambda: poster_snapshot(build_state_snapshot()), cache_key='poster_hash_cache')
+
+def build_poster_batch(storage, event_keys, formats):
+    snapshots = {key: storage.load_event(key) for key in event_keys}
+    return render_batch(snapshots, formats, render=lambda snapshot, fmt: render_poster_cached(poster_hash(snapshot), fmt, snapshot))
+
+@timed_section("fixtures")
+def current_fixture_schedule(team_ids):
+    ss = st.session_state
+    return build_fixture_schedule(tuple(team_ids), ss.event_date, ss.kick_off_time, ss.event_time_start, ss.event_time_end, ss.game_duration,
+                                  ss.num_pitches, ss.min_rest_minutes, ss.changeover_minutes, ss.double_round_robin)
+
+def apply_schedule_fix(key, value):
+    st.session_state[key] = value
+    st.session_state.pop('form_game_duration_input', None)  # keyed form widget: rebuilt with the new duration
+    mark_state_changed(key)
+
+def schedule_fix_panel(team_ids, key_prefix):
+    # Errors out on a schedule that does not fit the event window and offers the changes that would fix it.
+    schedule = current_fixture_schedule(team_ids)
+    if schedule.error is None:
+        return
+    st.error(schedule.error)
+    ss = st.session_state
+    fixes = build_schedule_fixes(tuple(team_ids), ss.event_date, ss.kick_off_time, ss.event_time_start, ss.event_time_end, ss.game_duration,
+                                 ss.num_pitches, ss.min_rest_minutes, ss.changeover_minutes, ss.double_round_robin)
+    labels = {'kick_off_time': lambda v: f"Kick off jam {v.strftime('%H.%M')}", 'game_duration': lambda v: f"Game {v} menit",
+              'num_pitches': lambda v: f"Pakai {v} lapangan"}
+    for key, value in fixes.items():
+        st.button(labels[key](value), key=f"{key_prefix}_fix_{key}", on_click=apply_schedule_fix, args=(key, value))
+    if not fixes:
+        st.caption(f"Tidak cukup dengan game {MIN_GAME_DURATION} menit atau {MAX_PITCHES} lapangan: kurangi istirahat/jeda, atau mundurkan jam selesai.")
+
+def get_player_registry():
+    # Indexes are rebuilt only when the persisted records dict is swapped out (first run, load, reset).
+    registry = st.session_state.get('player_registry_index')
+    if registry is None or registry.records is not st.session_state.player_registry:
+        registry = PlayerRegistry(st.session_state.player_registry)
+        st.session_state.player_registry_index = registry
+    return registry
+
+@st.cache_data(max_entries=16)
+def detect_duplicate_names(names):
+    return find_duplicates(names)
+
+def refresh_parsed_teams_cache():
+    st.session_state.parsed_teams_for_output_cache = [
+        {"id": t['id'], "display_name": t['team_name_display'], "color_hex": t['team_color_hex'].upper(), "players": t['players'],
+         "player_count": sum(1 for p in t['players'] if not p['is_gk']), "gk_count": sum(1 for p in t['players'] if p['is_gk'])}
+        for t in st.session_state.teams_data
+    ]
+
+def get_payment_ledger():
+    ledger = st.session_state.get('payment_ledger_index')
+    if ledger is None or ledger.events is not st.session_state.payment_ledger:
+        ledger = PaymentLedger(st.session_state.payment_ledger)
+        st.session_state.payment_ledger_index = ledger
+    return ledger
+
+def get_ledger_summary():
+    # Rebuilt when the roster or the prices change; payments in between are applied one by one.
+    ss = st.session_state
+    ledger = get_payment_ledger()
+    signature = (key_revision(ss, 'teams_data'), ss.price_player, ss.price_gk, id(ledger))
+    summary = ss.get('ledger_summary')
+    if summary is None or ss.get('ledger_summary_signature') != signature:
+        if not ledger.events:
+            book_paid_flags(ledger, ss.teams_data, ss.price_player, ss.price_gk)
+        summary = LedgerSummary(ss.teams_data, ss.price_player, ss.price_gk, ledger)
+        ss.ledger_summary, ss.ledger_summary_signature = summary, signature
+        flags_changed = False
+        for _, player in index_players(ss.teams_data).values():
+            if bool(player.get('paid')) != summary.is_paid(player['id']):
+                player['paid'] = summary.is_paid(player['id']); flags_changed = True
+        if flags_changed: mark_state_changed('payment_ledger')
+    summary.catch_up()
+    return ledger, summary
+
+def record_payments(entries, source):
+    # entries: (player_id, amount, kind, note). Keeps each player's paid flag in step with the ledger.
+    ledger, summary = get_ledger_summary()
+    recorded = book_payments(ledger, summary, index_players(st.session_state.teams_data), entries, source)
+    if recorded:
+        mark_state_changed('payment_ledger')
+        st.session_state.finance_grid_generation += 1
+    return recorded
+
+def get_league_table():
+    # Rebuilt only when the persisted results dict is swapped out (load, reset, new distribution).
+    ss = st.session_state
+    table = ss.get('league_table')
+    if table is None or table.results is not ss.match_results:
+        table = LeagueTable(ss.match_results)
+        ss.league_table = table
+    table.team_names = {t['id']: t.get('team_name_display') or f"Team {t['id']}" for t in ss.teams_data}
+    return table
+
+def standings_frame(rows):
+    return pd.DataFrame([{"#": r['rank'], "Team": r['name'], "Main": r['played'], "M": r['won'], "S": r['drawn'], "K": r['lost'],
+                          "GM": r['goals_for'], "GK": r['goals_against'], "SG": r['goal_difference'], "Poin": r['points']} for r in rows])
+
+def format_clock(seconds):
+    return f"{int(seconds) // 60:02d}:{int(seconds) % 60:02d}"
+
+def record_match_result(match, home_goals, away_goals, scorers=None):
+    # None goals clears the result. Season aggregates are updated by the same delta, never recomputed.
+    ss = st.session_state
+    table = get_league_table()
+    key, result, season, event_key = record_match(table, match, home_goals, away_goals, scorers, ss.season_name.strip(), event_key_for(build_state_snapshot()))
+    mark_state_changed('match_results')
+    if season and storage is not None and storage.supports_seasons:
+        try:
+            storage.record_result(season, event_key, key, result, team_rosters(ss.teams_data), table.team_names, player_names(ss.teams_data))
+        except sqlite3.Error as exc:
+            ss.cloud_sync_status = f"⚠️ Season update failed: {exc}"
+
+def get_match_log():
+    log = st.session_state.get('match_log_index')
+    if log is None or log.events is not st.session_state.match_log:
+        log = MatchLog(st.session_state.match_log)
+        st.session_state.match_log_index = log
+    return log
+
+def append_match_log(*events):
+    # With sqlite the new rows are inserted on their own, so a goal or a kick-off does not rewrite the whole
+    # event; the other backends pick them up with the next autosave (delta sends them as one append op).
+    ss = st.session_state
+    log = get_match_log()
+    nothing_pending = not has_unsynced_changes(ss)
+    for event in events: log.append(event)
+    mark_state_changed('match_log')
+    if nothing_pending and storage is not None and storage.supports_log_append:
+        try:
+            if storage.append_match_log(event_key_for(build_state_snapshot()), list(events)):
+                mark_synced(ss)  # no hash: re-hashing the whole snapshot per goal is what this avoids
+        except sqlite3.Error as exc:
+            ss.cloud_sync_status = f"⚠️ Match log save failed: {exc}"
+    matches = current_fixture_schedule([t['id'] for t in ss.teams_data]).matches
+    for match, home_goals, away_goals, scorers in final_scores(log, matches, (e['match'] for e in events)):
+        record_match_result(match, home_goals, away_goals, scorers)
+        ss.results_grid_generation += 1
+
+@timed_section("duplicate check")
+def show_duplicate_warning():
+    all_names = tuple(p['name'] for t in st.session_state.teams_data for p in t['players'])
+    report = detect_duplicate_names(all_names)
+    duplicates = format_duplicate_report(report)
+    if duplicates: st.warning(f"Duplicate names detected: {duplicates}")
+    if report['truncated']: st.caption(f"Duplicate check: {report['truncated']} very common name(s) only partly checked.")
 
 # --- Initialize Session State ---
 def initialize_session_state(force_reset=False):
     defaults = {
-        'event_title': DEFAULT_EVENT_TITLE, 'event_date': DEFAULT_EVENT_DATE,
-        'event_time_start': DEFAULT_EVENT_TIME_START, 'event_time_end': DEFAULT_EVENT_TIME_END,
-        'event_place': DEFAULT_EVENT_PLACE, 'event_publisher': DEFAULT_EVENT_PUBLISHER,
-        'event_organizer': DEFAULT_EVENT_ORGANIZER, 'kick_off_time': DEFAULT_KICK_OFF_TIME,
-        'price_player': DEFAULT_PRICE_PLAYER, 'price_gk': DEFAULT_PRICE_GK,
-        'num_teams': DEFAULT_NUM_TEAMS, 'teams_data': [],
-        'game_duration': DEFAULT_GAME_DURATION,
-        'form_global_outfield_players': "", 'form_global_goalkeepers': "",
-        'players_distributed': False, 'poster_text_for_copy': "", 
+        **default_event_settings(), 'teams_data': [],
+        'form_global_outfield_players': "", 'form_global_goalkeepers': "", 'form_team_constraints': "",
+        'distribution_report': None, 'import_name_report': None, 'roster_grid_generation': 0,
+        'payment_ledger': [], 'finance_grid_generation': 0, 'match_results': {}, 'match_log': [], 'season_name': "", 'results_grid_generation': 0, 'finance_import_preview': None, 'finance_import_generation': 0, 'player_import_report': None,
+        'players_distributed': False,
         'parsed_teams_for_output_cache': [], 'cloud_sync_status': "Initializing...",
         'initial_load_done': False
     }
     for key, default_value in defaults.items():
         if force_reset or key not in st.session_state:
             st.session_state[key] = default_value
+    init_revision_tracking(st.session_state)
+    if 'player_registry' not in st.session_state:
+        st.session_state.player_registry = {}
+    if 'sync_base' not in st.session_state:
+        # What this session last saw on the delta sync server; kept across resets like the revision.
+        st.session_state.sync_base_revision, st.session_state.sync_base, st.session_state.sync_conflicts = 0, {}, []
+    if 'cache_revision' not in st.session_state:
+        # Which cached revision this session shows, and whether it has edits of its own since loading it.
+        st.session_state.cache_revision, st.session_state.cache_clean, st.session_state.awaiting_revalidation = None, True, False
+    if force_reset:
+        mark_state_changed(*KEYS_TO_PERSIST)
+
+def save_as_new_event():
+    # Same settings and roster under a fresh id; the current event stays in the history as it is.
+    # Results, the match log and payments belong to the old event, so the copy starts without them.
+    ss = st.session_state
+    ss.event_id = new_event_id()
+    ss.match_results, ss.match_log, ss.payment_ledger = {}, [], []
+    for team in ss.teams_data:
+        for player in team['players']: player['paid'] = False
+    ss.finance_grid_generation += 1; ss.results_grid_generation += 1
+    ss.cache_clean = False
+    mark_state_changed(*KEYS_TO_PERSIST)
+
+def on_pick_season():
+    if st.session_state.known_season_pick:
+        st.session_state.season_name = st.session_state.known_season_pick
+        st.session_state.known_season_pick = None
+        mark_state_changed('season_name')
+
+def reset_all_state():
+    initialize_session_state(force_reset=True)
+    st.session_state.cache_clean = False  # a reset is an edit: don't let the cache load back over it
+    # Don't let the next run pull the old snapshot back down over the reset.
+    st.session_state.initial_load_done = True
+
+# --- Public Viewer (?view=public) ---
+# Read-only page for players. It never touches the organizer session state: every viewer renders the one
+# process-wide SharedSnapshot, so a whole league opening the link costs one load per revision.
+def build_public_view(snapshot):
+    # Everything that only changes with the snapshot, computed once per revision and shared read-only.
+    settings = coerce_event_settings(snapshot)
+    teams = snapshot.get('teams_data') or []
+    team_ids = [t['id'] for t in teams]
+    names = {t['id']: t.get('team_name_display') or f"Team {t['id']}" for t in teams}
+    results = snapshot.get('match_results') or {}
+    log = MatchLog(list(snapshot.get('match_log') or []))
+    matches = []
+    if len(team_ids) >= 2:
+        matches = schedule_event_fixtures(team_ids, settings['event_date'], settings['kick_off_time'], settings['event_time_start'], settings['event_time_end'],
+                                          settings['game_duration'], settings['num_pitches'], settings['min_rest_minutes'], settings['changeover_minutes'],
+                                          settings['double_round_robin']).matches
+    fixture_rows = []
+    for m in matches:
+        state, result = log.match(match_key(m)), results.get(match_key(m))
+        score = f"{result['home_goals']} - {result['away_goals']}" if result else ("{} - {}".format(*state.score(m.home_id, m.away_id)) if state.status != NOT_STARTED else "")
+        fixture_rows.append({"No": m.number, "Jam": m.start.strftime('%H.%M'), "Lap": m.pitch, "Home": names.get(m.home_id, m.home_id), "Skor": score,
+                             "Away": names.get(m.away_id, m.away_id), "Status": "✅" if result else {RUNNING: "🔴 live", PAUSED: "⏸️ jeda"}.get(state.status, "")})
+    return {
+        'settings': settings, 'teams': teams, 'names': names, 'matches': matches, 'log': log,
+        'fixtures': pd.DataFrame(fixture_rows, columns=["No", "Jam", "Lap", "Home", "Skor", "Away", "Status"]),
+        'standings': standings_frame(LeagueTable(results, names).standings(team_ids)) if results else None,
+        'paid': sum(1 for t in teams for p in t['players'] if p.get('paid')), 'headcount': sum(len(t['players']) for t in teams),
+    }
+
+@st.cache_resource
+def get_shared_snapshot(source, _storage):
+    return SharedSnapshot(_storage.current_revision, _storage.load_current, build_public_view, check_seconds=VIEWER_REFRESH_SECONDS)
+
+@st.fragment(run_every=VIEWER_REFRESH_SECONDS)
+def public_viewer_panel(shared):
+    view = shared.current()
+    if view is None:
+        st.warning("Data event belum bisa dimuat. Coba lagi sebentar lagi.")
+        return
+    s, names = view['settings'], view['names']
+    st.title(f"⚽ {s['event_title']}")
+    st.caption(f"📅 {s['event_date'].strftime('%d %b %Y')} · ⏰ {s['event_time_start'].strftime('%H.%M')}-{s['event_time_end'].strftime('%H.%M')} · 📍 {s['event_place']} · Wasit: {s['event_organizer'] or '-'}")
+    if shared.last_error:
+        st.caption(f"⚠️ Data terakhir bisa jadi belum terbaru ({shared.last_error})")
+
+    live = [(m, view['log'].match(match_key(m))) for m in view['matches']]
+    live = [(m, state) for m, state in live if state.status in (RUNNING, PAUSED)]
+    if live:
+        for col, (m, state) in zip(st.columns(len(live)), live):
+            col.metric(f"🔴 Game {m.number:02d} · {names.get(m.home_id, m.home_id)} vs {names.get(m.away_id, m.away_id)}",
+                       "{} - {}".format(*state.score(m.home_id, m.away_id)),
+                       f"⏱️ {format_clock(state.remaining(s['game_duration']))}{' (jeda)' if state.status == PAUSED else ''}", delta_color="off")
+    if not view['teams']:
+        st.info("Tim belum dibagi.")
+        return
+
+    st.subheader("📅 Jadwal & Hasil")
+    st.dataframe(view['fixtures'], hide_index=True, width="stretch")
+    if view['standings'] is not None:
+        st.subheader("🏆 Klasemen")
+        st.dataframe(view['standings'], hide_index=True, width="stretch")
+    st.subheader(f"👥 Tim · 💰 {view['paid']}/{view['headcount']} sudah bayar")
+    for col, team in zip(st.columns(min(len(view['teams']), 4)) * ((len(view['teams']) + 3) // 4), view['teams']):
+        with col:
+            st.markdown(f"**{COLOR_TO_EMOJI_MAP.get((team.get('team_color_hex') or '').upper(), DEFAULT_COLOR_EMOJI)} {names[team['id']]}**")
+            st.markdown("\n".join(f"- {p['name']}{' 🧤' if p.get('is_gk') else ''} {'✅' if p.get('paid') else '⏳'}" for p in team['players']))
+    st.caption(f"✅ sudah bayar · ⏳ belum · diperbarui otomatis tiap {VIEWER_REFRESH_SECONDS} detik")
+
+def show_public_viewer():
+    st.set_page_config(layout="wide", page_title="Kentep · Info Event")
+    storage = get_storage_backend()
+    if storage is None:
+        st.info("Belum ada data event.")
+        return
+    public_viewer_panel(get_shared_snapshot(storage.cache_key, storage))
+
+if st.query_params.get("view") == VIEWER_QUERY_VALUE:
+    show_public_viewer()
+    st.stop()
 
 initialize_session_state()
+apply_incoming_sync()
+get_timings().begin_run()
+run_started = time.perf_counter()
 
 # --- Page Config ---
 st.set_page_config(layout="wide", page_title="Kentep League Manager")
 st.title("⚽ Kentep League Manager")
 
 # --- Cloud Sync Execution ---
-api_key = st.secrets.get("JSONBIN_API_KEY")
-bin_id = st.secrets.get("JSONBIN_BIN_ID")
+storage = get_storage_backend()
 
-if not st.session_state.initial_load_done and api_key and bin_id:
-    load_state_from_cloud(api_key, bin_id)
+if not st.session_state.initial_load_done and storage:
+    if not load_state_from_cache(storage):
+        load_state_from_storage(storage)
     st.session_state.initial_load_done = True
     st.rerun()
-
-state_before_run = copy.deepcopy({k: st.session_state.get(k) for k in KEYS_TO_PERSIST})
+if storage is not None and storage.cache is not None:
+    refresh_from_cache(storage)
 
 # --- Sidebar Controls ---
-with st.sidebar:
+with st.sidebar, timed("sidebar"):
     st.header("⚙️ Konfigurasi Event")
 
     # --- Cloud Storage ---
     with st.expander("☁️ Cloud Storage & Sync", expanded=True):
-        if not api_key or not bin_id:
+        if storage is None:
             st.info(
                 """
                 **Cloud Sync is not configured.**
                 To enable, add `JSONBIN_API_KEY` and `JSONBIN_BIN_ID` to your Streamlit Cloud app secrets.
                 You can get these from [jsonbin.io](https://jsonbin.io).
+                Or set `STORAGE_BACKEND = "sqlite"` (and optionally `SQLITE_PATH`) to keep events in a local database,
+                or `STORAGE_BACKEND = "delta"` with `SYNC_SERVER_URL` to share edits through `python -m kentep_core.syncserver`.
                 """
             )
+        else:
+            refresh_cloud_sync_status(storage)
+            st.caption(f"Backend: {storage.name}")
         st.caption(f"Status: {st.session_state.cloud_sync_status}")
+        if storage is not None and storage.save_failed():
+            st.button("🔁 Retry sync", key="retry_sync_button", on_click=on_retry_sync, args=(storage,))
+        if storage is not None:
+            st.caption(f"👀 Link untuk pemain (read-only): tambahkan `?view={VIEWER_QUERY_VALUE}` di URL app ini.")
+        if storage is not None and storage.queued_edits():
+            st.caption(f"📤 {storage.queued_edits()} edit(s) waiting to be sent")
+        if storage is not None and st.session_state.awaiting_revalidation:
+            revalidation_watch(storage)
+        if storage is not None and storage.supports_history:
+            past_events = storage.list_events()
+            if past_events:
+                event_labels = {e['event_key']: f"{e['event_date']} · {e['title']} ({e['player_count']} players)" for e in past_events}
+                selected_event_key = st.selectbox("Event History", options=list(event_labels), format_func=event_labels.get, key="history_event_key")
+                st.button("📂 Load Event", key="load_history_event_button", on_click=load_state_from_storage, args=(storage, selected_event_key))
+        if storage is not None and storage.supports_delta:
+            st.button("🔄 Tarik Perubahan", key="sync_pull_button", on_click=on_sync_now, args=(storage,), help="Send your changes and fetch the other organizers' edits now")
+            for i, conflict in enumerate(st.session_state.sync_conflicts):
+                st.warning(f"Conflict on `{conflict['path']}`\n\nServer: {conflict['theirs']!r}\n\nYours: {conflict['mine']!r}")
+                keep_col, take_col = st.columns(2)
+                keep_col.button("Keep mine", key=f"sync_keep_{i}", on_click=on_resolve_conflict, args=(i, True), width="stretch")
+                take_col.button("Take server", key=f"sync_take_{i}", on_click=on_resolve_conflict, args=(i, False), width="stretch")
     st.markdown("---")
 
     st.subheader("General Info")
-    st.text_input("Event Title", key="event_title")
-    st.date_input("Tanggal", key="event_date")
-    st.time_input("Start Time", key="event_time_start")
-    st.time_input("End Time", key="event_time_end")
-    st.text_input("Tempat", key="event_place")
-    st.text_input("Video/Photographer", key="event_publisher")
-    st.text_input("Wasit", key="event_organizer")
-    st.time_input("Kick Off Time", key="kick_off_time")
+    st.text_input("Event Title", key="event_title", on_change=mark_state_changed, args=("event_title",))
+    st.date_input("Tanggal", key="event_date", on_change=mark_state_changed, args=("event_date",))
+    st.time_input("Start Time", key="event_time_start", on_change=mark_state_changed, args=("event_time_start",))
+    st.time_input("End Time", key="event_time_end", on_change=mark_state_changed, args=("event_time_end",))
+    st.text_input("Tempat", key="event_place", on_change=mark_state_changed, args=("event_place",))
+    st.text_input("Video/Photographer", key="event_publisher", on_change=mark_state_changed, args=("event_publisher",))
+    st.text_input("Wasit", key="event_organizer", on_change=mark_state_changed, args=("event_organizer",))
+    st.time_input("Kick Off Time", key="kick_off_time", on_change=mark_state_changed, args=("kick_off_time",))
+
+    st.subheader("Jadwal")
+    st.number_input("Jumlah Lapangan", min_value=1, max_value=MAX_PITCHES, step=1, key="num_pitches", on_change=mark_state_changed, args=("num_pitches",))
+    st.number_input("Istirahat Minimal Tim (menit)", min_value=0, step=5, key="min_rest_minutes", on_change=mark_state_changed, args=("min_rest_minutes",))
+    st.number_input("Jeda Antar Game (menit)", min_value=0, step=1, key="changeover_minutes", on_change=mark_state_changed, args=("changeover_minutes",))
+    st.checkbox("Home & Away (2 putaran)", key="double_round_robin", on_change=mark_state_changed, args=("double_round_robin",))
+    if st.session_state.players_distributed and len(st.session_state.teams_data) >= 2:
+        schedule_fix_panel([t['id'] for t in st.session_state.teams_data], "sidebar")
+    st.text_input("Season / Liga", key="season_name", on_change=mark_state_changed, args=("season_name",), help="Kosongkan untuk event lepas. Dengan backend sqlite, hasil pertandingan masuk klasemen season.")
+    known_seasons = storage.list_seasons() if storage is not None and storage.supports_seasons else []
+    if known_seasons:
+        st.selectbox("Season tersimpan", [None] + known_seasons, key="known_season_pick", format_func=lambda s: "Pilih season..." if s is None else s,
+                     on_change=on_pick_season, help="Lanjutkan klasemen season yang sudah ada.")
 
     st.subheader("Pricing (HTM)")
-    st.number_input("Price per Player (IDR)", min_value=0.0, key="price_player", step=1000.0, format="%.0f")
-    st.number_input("Price per Goalkeeper (IDR)", min_value=0.0, key="price_gk", step=1000.0, format="%.0f")
+    st.number_input("Price per Player (IDR)", min_value=0.0, key="price_player", step=1000.0, format="%.0f", on_change=mark_state_changed, args=("price_player",))
+    st.number_input("Price per Goalkeeper (IDR)", min_value=0.0, key="price_gk", step=1000.0, format="%.0f", on_change=mark_state_changed, args=("price_gk",))
     st.markdown("---")
 
     st.subheader("Actions")
-    if st.button("⚠️ Reset All Inputs & Data", key="reset_all_button"):
-        initialize_session_state(force_reset=True)
+    st.toggle("🩺 Diagnostics", key="show_diagnostics", help="Timings per section, rerun count, snapshot size and sync latency.")
+    # Runs as a callback so the widget-backed keys can be reset before the widgets are rebuilt.
+    st.button("🆕 Simpan sebagai Event Baru", key="save_as_new_event_button", on_click=save_as_new_event,
+              help="Salin pengaturan & roster ke event baru (tanpa hasil, log dan pembayaran). Event ini tetap ada di riwayat.")
+    if st.button("⚠️ Reset All Inputs & Data", key="reset_all_button", on_click=reset_all_state):
         st.success("All inputs and data have been reset.")
-        st.rerun()
+
+# --- Player Import ---
+def on_import_players():
+    ss = st.session_state
+    uploaded = ss.get('player_import_file')
+    if uploaded is None: return
+    extension = uploaded.name.rsplit('.', 1)[-1].lower()
+    replace = ss.player_import_mode == "Ganti"
+    outfield_pool = [] if replace else parse_player_list(ss.form_global_outfield_players)
+    gk_pool = [] if replace else parse_player_list(ss.form_global_goalkeepers)
+    try:
+        uploaded.seek(0)
+        outfield, goalkeepers, errors = split_into_pools(IMPORTERS[extension](uploaded), existing_names=outfield_pool + gk_pool)
+    except (ImportError, ValueError, KeyError, zipfile.BadZipFile) as exc:
+        ss.player_import_report = {'file': uploaded.name, 'failed': str(exc) or type(exc).__name__}
+        return
+    # Appending keeps the pasted text (numbering, markers) as the organiser typed it.
+    ss.form_global_outfield_players = "\n".join(([] if replace else [ss.form_global_outfield_players.strip()]) + outfield).strip()
+    ss.form_global_goalkeepers = "\n".join(([] if replace else [ss.form_global_goalkeepers.strip()]) + goalkeepers).strip()
+    for k in POOL_FORM_WIDGET_KEYS: ss.pop(k, None)
+    mark_state_changed('form_global_outfield_players', 'form_global_goalkeepers')
+    ss.player_import_report = {'file': uploaded.name, 'outfield': len(outfield), 'gk': len(goalkeepers), 'errors': errors}
+
+def show_player_import():
+    with st.expander("📥 Import Pemain (CSV / XLSX / WhatsApp)", expanded=False):
+        st.file_uploader("File", type=list(IMPORTERS), key="player_import_file",
+                         help="CSV/XLSX: kolom Nama (wajib), GK, Posisi, Rating. TXT: daftar nama atau export chat WhatsApp (\"+1\", \"Budi +1\", \"+1 gk\", \"-1\").")
+        import_cols = st.columns([2, 1])
+        import_cols[0].radio("Mode", ["Tambah", "Ganti"], horizontal=True, key="player_import_mode", help="Tambah: append to the current lists. Ganti: replace them.")
+        import_cols[1].button("📥 Import", key="player_import_button", on_click=on_import_players, disabled=st.session_state.get('player_import_file') is None)
+        report = st.session_state.player_import_report
+        if report and report.get('failed'):
+            st.error(f"{report['file']}: {report['failed']}")
+        elif report:
+            st.success(f"{report['file']}: {report['outfield']} players, {report['gk']} goalkeepers imported.")
+            if report['errors']:
+                st.warning(f"{len(report['errors'])} line(s) skipped")
+                st.dataframe(pd.DataFrame(report['errors'][:IMPORT_ERROR_ROWS], columns=["Baris", "Nama", "Error"]), hide_index=True, width="stretch")
+
+# --- Player Identity ---
+NEW_PLAYER_CHOICE = "__new__"
+
+def on_pick_identity(player_id, choice_key):
+    teams, registry = st.session_state.teams_data, get_player_registry()
+    player = index_players(teams)[player_id][1]
+    choice = st.session_state[choice_key]
+    uid = registry.register(player['name'], new=True) if choice == NEW_PLAYER_CHOICE else choice
+    # Whoever held that uid in this event is linked again (the next known player of that name, or a new one).
+    holders = {p['id'] for t in teams for p in t['players'] if p.get('player_uid') == uid and p is not player}
+    player['player_uid'] = uid
+    register_team_players(teams, registry, holders)
+    st.session_state.pop(choice_key, None)
+    mark_state_changed('teams_data', 'player_registry')
+
+def player_identity_panel():
+    # Same name, different person: the registry links names to known players, so the organizer can say
+    # which known player this is, or that it is someone new.
+    registry = get_player_registry()
+    players = [p for t in st.session_state.teams_data for p in t['players'] if p['name'].strip()]
+    team_names = {p['id']: t.get('team_name_display') or f"Team {t['id']}" for t in st.session_state.teams_data for p in t['players']}
+    ambiguous = {p['id'] for p in players if len(registry.candidates(p['name'])) > 1}
+    with st.expander(f"🪪 Identitas Pemain{f' ({len(ambiguous)} nama kembar)' if ambiguous else ''}"):
+        st.caption("Nama yang sama dianggap pemain yang sama di semua event. Pilih siapa pemain ini, atau tandai sebagai pemain baru.")
+        by_id = {p['id']: p for p in sorted(players, key=lambda p: (p['id'] not in ambiguous, p['name'].lower()))}
+        player_id = st.selectbox("Pemain", list(by_id), key="identity_player",
+                                 format_func=lambda pid: f"{'⚠️ ' if pid in ambiguous else ''}{by_id[pid]['name']} ({team_names[pid]}) · #{pid[-6:]}")
+        if player_id is None or player_id not in by_id:
+            return
+        player = by_id[player_id]
+        used_by = {p.get('player_uid'): f"{p['name']}, {team_names[p['id']]}" for p in players if p is not player}
+        options = registry.candidates(player['name']) + [NEW_PLAYER_CHOICE]
+        def label(uid):
+            if uid == NEW_PLAYER_CHOICE: return "➕ Pemain baru (bukan yang di atas)"
+            return f"{registry.display_name(uid)} · #{uid[-6:]}" + (f" (dipakai {used_by[uid]})" if uid in used_by else "")
+        current = player.get('player_uid')
+        choice_key = f"identity_uid_{player_id}"
+        st.radio("Identitas", options, index=options.index(current) if current in options else None, key=choice_key,
+                 format_func=label, on_change=on_pick_identity, args=(player_id, choice_key))
+
+# --- Roster Grid Editor ---
+def on_roster_changed(touched_ids=None):
+    register_team_players(st.session_state.teams_data, get_player_registry(), touched_ids)
+    mark_state_changed('teams_data', 'player_registry')
+    # A fresh editor key drops the editor's pending deltas, which are now part of teams_data.
+    st.session_state.roster_grid_generation += 1
+
+def on_roster_grid_change(editor_key, refs, default_team_id):
+    touched = apply_grid_changes(st.session_state.teams_data, refs, st.session_state[editor_key], default_team_id, new_player_id)
+    on_roster_changed(touched)
+
+def on_team_grid_change(editor_key):
+    for row, edits in st.session_state[editor_key].get('edited_rows', {}).items():
+        team = st.session_state.teams_data[int(row)]
+        if (edits.get('team_name_display') or '').strip():
+            team['team_name_display'] = edits['team_name_display'].strip()
+        color = (edits.get('team_color_hex') or '').strip()
+        if len(color) == 7 and color.startswith('#'):
+            team['team_color_hex'] = color.upper()
+    mark_state_changed('teams_data')
+    st.session_state.roster_grid_generation += 1
+
+def on_bulk_move():
+    moved = move_players(st.session_state.teams_data, st.session_state.roster_move_players, st.session_state.roster_move_target)
+    st.session_state.roster_move_players = []
+    if moved: on_roster_changed(set())
+
+def on_swap_players():
+    first, second = st.session_state.roster_swap_first, st.session_state.roster_swap_second
+    if first and second and swap_players(st.session_state.teams_data, first, second):
+        on_roster_changed(set())
+
+@st.fragment
+@timed_section("roster grid")
+def roster_grid_editor():
+    # Edits here only rerun this fragment; the rest of the app catches up on the next full run.
+    teams = st.session_state.teams_data
+    team_ids = [t['id'] for t in teams]
+    team_labels = {t['id']: f"{t['id']} · {t.get('team_name_display') or 'Team ' + t['id']}" for t in teams}
+    generation = st.session_state.roster_grid_generation
+
+    with st.expander("🎨 Nama & Warna Team", expanded=False):
+        team_grid_key = f"team_grid_{generation}"
+        st.data_editor(
+            pd.DataFrame([{'id': t['id'], 'team_name_display': t['team_name_display'], 'team_color_hex': t['team_color_hex'], 'players': len(t['players'])} for t in teams]),
+            key=team_grid_key, hide_index=True, disabled=['id', 'players'], on_change=on_team_grid_change, args=(team_grid_key,),
+            column_config={
+                'id': st.column_config.TextColumn("Team"), 'team_name_display': st.column_config.TextColumn("Nama Team", required=True),
+                'team_color_hex': st.column_config.TextColumn("Warna (hex)", validate=r"^#[0-9A-Fa-f]{6}$"), 'players': st.column_config.NumberColumn("Pemain"),
+            }
+        )
+
+    filter_cols = st.columns([2, 2, 1, 1])
+    team_filter = filter_cols[0].selectbox("Filter Team", [None] + team_ids, format_func=lambda t: "Semua Team" if t is None else team_labels[t], key="roster_grid_team_filter")
+    name_filter = filter_cols[1].text_input("Cari Nama", key="roster_grid_name_filter")
+    page_size = filter_cols[2].selectbox("Per Halaman", ROSTER_PAGE_SIZES, index=1, key="roster_grid_page_size")
+    rows, refs = roster_rows(teams, team_filter, name_filter)
+    page_count = max(1, math.ceil(len(rows) / page_size))
+    if st.session_state.get('roster_grid_page', 1) > page_count:
+        st.session_state.roster_grid_page = page_count
+    page = filter_cols[3].number_input("Halaman", min_value=1, max_value=page_count, step=1, key="roster_grid_page")
+    start = (page - 1) * page_size
+
+    roster_grid_key = f"roster_grid_{generation}_{team_filter}_{page}_{page_size}"
+    st.data_editor(
+        pd.DataFrame(rows[start:start + page_size], columns=GRID_COLUMNS),
+        key=roster_grid_key, num_rows="dynamic", hide_index=True, width="stretch",
+        on_change=on_roster_grid_change, args=(roster_grid_key, refs[start:start + page_size], team_filter or team_ids[0]),
+        column_config={
+            'team_id': st.column_config.SelectboxColumn("Team", options=team_ids, required=True),
+            'name': st.column_config.TextColumn("Nama", required=True),
+            'is_gk': st.column_config.CheckboxColumn("GK"), 'paid': st.column_config.CheckboxColumn("Paid", disabled=True, help="Catat pembayaran di tab Finance"),
+            'rating': st.column_config.NumberColumn("Rating", min_value=0, max_value=10, step=0.5),
+            'position': st.column_config.SelectboxColumn("Posisi", options=list(POSITIONS)),
+        }
+    )
+    st.caption(f"{len(rows)} pemain · halaman {page}/{page_count} · ganti kolom Team untuk memindahkan pemain")
+
+    player_labels = {p['id']: f"{p['name']} ({t['id']})" for t in teams for p in t['players']}
+    bulk_cols = st.columns(2)
+    with bulk_cols[0]:
+        st.multiselect("Pindahkan Pemain", list(player_labels), format_func=player_labels.get, key="roster_move_players")
+        st.selectbox("Ke Team", team_ids, format_func=team_labels.get, key="roster_move_target")
+        st.button("↔️ Pindahkan", key="roster_move_button", on_click=on_bulk_move, disabled=not st.session_state.roster_move_players)
+    with bulk_cols[1]:
+        st.selectbox("Tukar Pemain", [None] + list(player_labels), format_func=lambda p: "-" if p is None else player_labels[p], key="roster_swap_first")
+        st.selectbox("Dengan", [None] + list(player_labels), format_func=lambda p: "-" if p is None else player_labels[p], key="roster_swap_second")
+        st.button("🔁 Tukar", key="roster_swap_button", on_click=on_swap_players)
+
+    show_duplicate_warning()
+    refresh_parsed_teams_cache()
+    autosave_state(storage)
+
+# --- Finance ---
+def format_idr(amount):
+    return f"IDR {amount:,.0f}"
+
+def on_mark_selected_paid(editor_key, refs):
+    selected = [refs[int(row)] for row, edits in st.session_state[editor_key].get('edited_rows', {}).items() if edits.get('select')]
+    record_payments(outstanding_entries(get_ledger_summary()[1], selected, "lunas (pilihan)"), source='bulk')
+
+def on_mark_team_paid():
+    team = next((t for t in st.session_state.teams_data if t['id'] == st.session_state.finance_bulk_team), None)
+    if team: record_payments(outstanding_entries(get_ledger_summary()[1], [p['id'] for p in team['players']], f"lunas (team {team['id']})"), source='bulk')
+
+def on_manual_payment():
+    ss = st.session_state
+    player_id, kind = ss.finance_payment_player, ss.finance_payment_kind
+    _, summary = get_ledger_summary()
+    # 0 means "the rest of the bill" for a payment and "everything paid so far" for a refund.
+    amount = ss.finance_payment_amount or (summary.outstanding(player_id) if kind == PAYMENT else get_payment_ledger().balance(player_id))
+    record_payments([(player_id, amount, kind, ss.finance_payment_note.strip())], source='manual')
+    ss.finance_payment_amount, ss.finance_payment_note = 0.0, ""
+
+def on_match_payment_import():
+    ss = st.session_state
+    lines = ss.finance_import_text.splitlines()
+    if ss.get('finance_import_file') is not None:
+        ss.finance_import_file.seek(0)
+        lines = itertools.chain(lines, (raw.decode('utf-8', errors='replace') for raw in ss.finance_import_file))
+    matcher = roster_name_matcher(ss.teams_data, get_player_registry())
+    ss.finance_import_preview = list(iter_payment_matches(lines, matcher))
+    ss.finance_import_generation += 1
+
+def on_apply_payment_import(editor_key):
+    # Exact matches are pre-ticked; fuzzy ones are only booked when the organizer ticked them.
+    choices = {int(row): edits for row, edits in (st.session_state.get(editor_key) or {}).get('edited_rows', {}).items()}
+    record_payments(import_entries(st.session_state.finance_import_preview or [], get_ledger_summary()[1], choices), source='import')
+    st.session_state.finance_import_preview = None
+    st.session_state.finance_import_text = ""
+
+@st.fragment
+@timed_section("finance")
+def finance_panel():
+    ledger, summary = get_ledger_summary()
+    teams = st.session_state.teams_data
+    team_labels = {t['id']: t.get('team_name_display') or f"Team {t['id']}" for t in teams}
+    players = index_players(teams)
+
+    st.subheader("Financial Summary")
+    metric_cols = st.columns(3)
+    metric_cols[0].metric("Collected Income", format_idr(summary.collected_total))
+    metric_cols[1].metric("Expected", format_idr(summary.expected_total))
+    metric_cols[2].metric("Outstanding", format_idr(max(0.0, summary.expected_total - summary.collected_total)))
+    if summary.expected_total > 0:
+        st.progress(min(1.0, max(0.0, summary.collected_total / summary.expected_total)))
+    else:
+        st.caption("No players to calculate income from.")
+    role_labels = {'player': "Player", 'gk': "Goalkeeper"}
+    summary_cols = st.columns(2)
+    for col, axis, labels, title in ((summary_cols[0], 'team', team_labels, "Team"), (summary_cols[1], 'role', role_labels, "Role")):
+        col.dataframe(
+            pd.DataFrame([{title: labels.get(r['key'], r['key']), "Lunas": f"{r['paid']}/{r['players']}", "Collected": r['collected'],
+                           "Expected": r['expected'], "Outstanding": r['outstanding']} for r in summary.rows(axis)]),
+            hide_index=True, width="stretch",
+            column_config={c: st.column_config.NumberColumn(c, format="%,.0f") for c in ("Collected", "Expected", "Outstanding")}
+        )
+    st.markdown("---")
+
+    st.subheader("Player Payment Status")
+    filter_cols = st.columns([2, 1])
+    team_filter = filter_cols[0].selectbox("Filter Team", [None] + list(team_labels), format_func=lambda t: "Semua Team" if t is None else team_labels[t], key="finance_team_filter")
+    unpaid_only = filter_cols[1].checkbox("Belum lunas saja", key="finance_unpaid_only")
+    rows, refs = [], []
+    for team in teams:
+        if team_filter and team['id'] != team_filter: continue
+        for player in team['players']:
+            paid = summary.is_paid(player['id'])
+            if unpaid_only and paid: continue
+            rows.append({'select': False, 'team': team['id'], 'name': ("🧤 " if player.get('is_gk') else "") + player['name'],
+                         'paid_amount': ledger.balance(player['id']), 'outstanding': summary.outstanding(player['id']), 'status': "✅" if paid else "⏳"})
+            refs.append(player['id'])
+    finance_grid_key = f"finance_grid_{st.session_state.finance_grid_generation}_{team_filter}_{unpaid_only}"
+    st.data_editor(
+        pd.DataFrame(rows, columns=['select', 'team', 'name', 'paid_amount', 'outstanding', 'status']),
+        key=finance_grid_key, hide_index=True, width="stretch", disabled=['team', 'name', 'paid_amount', 'outstanding', 'status'],
+        column_config={
+            'select': st.column_config.CheckboxColumn("Pilih"), 'team': st.column_config.TextColumn("Team"), 'name': st.column_config.TextColumn("Nama"),
+            'paid_amount': st.column_config.NumberColumn("Dibayar", format="%,.0f"), 'outstanding': st.column_config.NumberColumn("Sisa", format="%,.0f"),
+            'status': st.column_config.TextColumn("Status"),
+        }
+    )
+    bulk_cols = st.columns([1, 2, 1])
+    bulk_cols[0].button("✅ Tandai Terpilih Lunas", key="finance_mark_selected_button", on_click=on_mark_selected_paid, args=(finance_grid_key, refs))
+    bulk_cols[1].selectbox("Team", list(team_labels), format_func=team_labels.get, key="finance_bulk_team", label_visibility="collapsed")
+    bulk_cols[2].button("✅ Tandai Team Lunas", key="finance_mark_team_button", on_click=on_mark_team_paid)
+
+    player_labels = {pid: f"{p['name']} ({t['id']})" for pid, (t, p) in players.items()}
+    with st.expander("💵 Catat Pembayaran / Refund"):
+        st.selectbox("Pemain", list(player_labels), format_func=player_labels.get, key="finance_payment_player")
+        payment_cols = st.columns(2)
+        payment_cols[0].number_input("Jumlah (0 = sisa tagihan)", min_value=0.0, step=5000.0, format="%.0f", key="finance_payment_amount")
+        payment_cols[1].radio("Jenis", [PAYMENT, REFUND], format_func={PAYMENT: "Bayar", REFUND: "Refund"}.get, horizontal=True, key="finance_payment_kind")
+        st.text_input("Catatan", key="finance_payment_note")
+        st.button("💾 Simpan", key="finance_payment_button", on_click=on_manual_payment, disabled=not player_labels)
+
+    with st.expander("📥 Import Bukti Transfer (bank / WhatsApp)"):
+        st.text_area("Tempel mutasi rekening atau chat WhatsApp", height=150, key="finance_import_text",
+                     help="Satu transfer per baris, contoh:\n12/10/24, 19.20 - Budi: tf 50rb\nTRSF E-BANKING CR 50.000,00 ANDI PRATAMA")
+        st.file_uploader("atau upload file (.txt/.csv)", type=["txt", "csv"], key="finance_import_file")
+        st.button("🔍 Cocokkan", key="finance_import_match_button", on_click=on_match_payment_import)
+        preview = st.session_state.finance_import_preview
+        if preview is not None:
+            import_grid_key = f"finance_import_grid_{st.session_state.finance_import_generation}"
+            st.data_editor(
+                pd.DataFrame([{'book': r['score'] >= EXACT_MATCH, 'line': r['line'], 'raw': r['raw'], 'player_id': r['player_id'], 'amount': r['amount'],
+                               'score': r['score'], 'error': r['error'] or ""} for r in preview],
+                             columns=['book', 'line', 'raw', 'player_id', 'amount', 'score', 'error']),
+                key=import_grid_key, hide_index=True, width="stretch", disabled=['line', 'raw', 'amount', 'score', 'error'],
+                column_config={
+                    'book': st.column_config.CheckboxColumn("Catat"), 'line': st.column_config.NumberColumn("Baris"), 'raw': st.column_config.TextColumn("Teks"),
+                    'player_id': st.column_config.SelectboxColumn("Pemain", options=list(player_labels), format_func=player_labels.get),
+                    'amount': st.column_config.NumberColumn("Jumlah", format="%,.0f", help="Kosong = sisa tagihan"),
+                    'score': st.column_config.NumberColumn("Skor", format="%.2f"), 'error': st.column_config.TextColumn("Error"),
+                }
+            )
+            exact = sum(1 for r in preview if r['player_id'] and r['score'] >= EXACT_MATCH)
+            fuzzy = sum(1 for r in preview if r['player_id'] and r['score'] < EXACT_MATCH)
+            st.caption(f"{exact}/{len(preview)} baris cocok persis dan sudah dicentang · {fuzzy} baris mirip: cek pemainnya lalu centang 'Catat' untuk ikut dicatat. "
+                       "Baris tanpa jumlah dianggap melunasi sisa tagihan.")
+            st.button("✅ Terapkan", key="finance_import_apply_button", on_click=on_apply_payment_import, args=(import_grid_key,), disabled=not (exact or fuzzy))
+
+    with st.expander(f"🧾 Riwayat Pembayaran ({len(ledger.events)})"):
+        recent = ledger.events[-PAYMENT_HISTORY_ROWS:][::-1]
+        if recent:
+            st.dataframe(pd.DataFrame([
+                {"Waktu": e['at'], "Pemain": player_labels.get(e['player_id'], e['player_id']), "Jenis": e['kind'],
+                 "Jumlah": e['amount'], "Sumber": e['source'], "Catatan": e['note']} for e in recent
+            ]), hide_index=True, width="stretch")
+        else:
+            st.caption("Belum ada pembayaran.")
+
+    refresh_parsed_teams_cache()
+    autosave_state(storage)
+
+# --- Results & Standings ---
+def on_results_grid_change(editor_key, matches):
+    results = st.session_state.match_results
+    changed = False
+    for row, edits in st.session_state[editor_key].get('edited_rows', {}).items():
+        match = matches[int(row)]
+        current = results.get(match_key(match)) or {}
+        home_goals = edits.get('home_goals', current.get('home_goals'))
+        away_goals = edits.get('away_goals', current.get('away_goals'))
+        if (home_goals is None) != (away_goals is None): continue  # only one side filled in (yet)
+        if current and (home_goals, away_goals) == (current['home_goals'], current['away_goals']): continue
+        record_match_result(match, home_goals, away_goals, current.get('scorers'))
+        changed = True
+    if changed: st.session_state.results_grid_generation += 1
+
+def on_scorers_grid_change(editor_key, match, refs):
+    result = st.session_state.match_results.get(match_key(match))
+    if not result: return
+    scorers = dict(result.get('scorers', {}))
+    for row, edits in st.session_state[editor_key].get('edited_rows', {}).items():
+        if 'goals' in edits: scorers[refs[int(row)]] = int(edits['goals'] or 0)
+    record_match_result(match, result['home_goals'], result['away_goals'], scorers)
+    st.session_state.results_grid_generation += 1
+
+@st.fragment
+@timed_section("results & standings")
+def season_panel():
+    ss = st.session_state
+    teams = ss.teams_data
+    table = get_league_table()
+    team_ids = [t['id'] for t in teams]
+    if len(team_ids) < 2:
+        st.info("Butuh minimal 2 team untuk jadwal pertandingan.")
+        return
+    matches = current_fixture_schedule(team_ids).matches
+    results = ss.match_results
+    names = table.team_names
+    generation = ss.results_grid_generation
+
+    st.subheader("📝 Hasil Pertandingan")
+    results_grid_key = f"results_grid_{generation}"
+    st.data_editor(
+        pd.DataFrame([{'no': m.number, 'time': m.start.strftime('%H.%M'), 'home': names.get(m.home_id, m.home_id),
+                       'home_goals': (results.get(match_key(m)) or {}).get('home_goals'), 'away_goals': (results.get(match_key(m)) or {}).get('away_goals'),
+                       'away': names.get(m.away_id, m.away_id)} for m in matches], columns=['no', 'time', 'home', 'home_goals', 'away_goals', 'away']),
+        key=results_grid_key, hide_index=True, width="stretch", disabled=['no', 'time', 'home', 'away'],
+        on_change=on_results_grid_change, args=(results_grid_key, matches),
+        column_config={
+            'no': st.column_config.NumberColumn("No"), 'time': st.column_config.TextColumn("Jam"),
+            'home': st.column_config.TextColumn("Home"), 'away': st.column_config.TextColumn("Away"),
+            'home_goals': st.column_config.NumberColumn("Gol H", min_value=0, max_value=99, step=1),
+            'away_goals': st.column_config.NumberColumn("Gol A", min_value=0, max_value=99, step=1),
+        }
+    )
+    st.caption(f"{sum(1 for m in matches if match_key(m) in results)}/{len(matches)} pertandingan selesai · kosongkan kedua skor untuk menghapus hasil")
+
+    played = [m for m in matches if match_key(m) in results]
+    if played:
+        with st.expander("⚽ Pencetak Gol"):
+            match_labels = {match_key(m): f"{m.number:02d}. {names.get(m.home_id, m.home_id)} {results[match_key(m)]['home_goals']}-{results[match_key(m)]['away_goals']} {names.get(m.away_id, m.away_id)}" for m in played}
+            selected_key = st.selectbox("Pertandingan", list(match_labels), format_func=match_labels.get, key="scorers_match")
+            match = next(m for m in played if match_key(m) == selected_key)
+            scorers = results[selected_key].get('scorers', {})
+            rows, refs, team_goals = [], [], dict.fromkeys(match.team_ids, 0)
+            for t in teams:
+                if t['id'] not in team_goals: continue
+                for p in t['players']:
+                    uid = p.get('player_uid') or p['id']
+                    rows.append({'team': names.get(t['id'], t['id']), 'name': p['name'], 'goals': scorers.get(uid, 0)}); refs.append(uid)
+                    team_goals[t['id']] += scorers.get(uid, 0)
+            scorers_grid_key = f"scorers_grid_{generation}_{selected_key}"
+            st.data_editor(
+                pd.DataFrame(rows, columns=['team', 'name', 'goals']), key=scorers_grid_key, hide_index=True, width="stretch", disabled=['team', 'name'],
+                on_change=on_scorers_grid_change, args=(scorers_grid_key, match, refs),
+                column_config={'team': st.column_config.TextColumn("Team"), 'name': st.column_config.TextColumn("Nama"),
+                               'goals': st.column_config.NumberColumn("Gol", min_value=0, max_value=99, step=1)}
+            )
+            result = results[selected_key]
+            if team_goals[match.home_id] > result['home_goals'] or team_goals[match.away_id] > result['away_goals']:
+                st.warning("Jumlah gol pemain melebihi skor pertandingan.")
+
+    st.subheader("🏆 Klasemen Hari Ini")
+    st.dataframe(standings_frame(table.standings(team_ids)), hide_index=True, width="stretch")
+    season = ss.season_name.strip()
+    if season and storage is not None and storage.supports_seasons:
+        st.subheader(f"📅 Klasemen Season: {season}")
+        season_rows = storage.season_standings(season)
+        if season_rows:
+            st.dataframe(standings_frame(season_rows), hide_index=True, width="stretch")
+            st.dataframe(pd.DataFrame([{"Nama": r['name'] or r['player_uid'], "Hadir": r['attended'], "Main": r['appearances'], "Gol": r['goals']}
+                                       for r in storage.season_player_stats(season, SEASON_PLAYER_ROWS)]), hide_index=True, width="stretch")
+        else:
+            st.caption("Belum ada hasil di season ini.")
+    elif season:
+        st.info("Klasemen season lintas event butuh backend sqlite (`STORAGE_BACKEND = \"sqlite\"`).")
+    st.caption("Urutan: poin, head-to-head (poin, selisih gol, gol) antar tim yang sama poin, selisih gol, gol.")
+
+    autosave_state(storage)
+
+# --- Live Match Day ---
+def on_live_event(key, kind, team_id=None, player_key=None):
+    player = st.session_state.get(player_key) if player_key else None
+    append_match_log(log_event(key, kind, team=team_id, player=player))
+
+def on_live_void(key, select_key):
+    ref = st.session_state.get(select_key)
+    if ref: append_match_log(log_event(key, VOID, ref=ref))
+
+def live_console_state():
+    ss = st.session_state
+    matches = current_fixture_schedule([t['id'] for t in ss.teams_data]).matches
+    log = get_match_log()
+    on_console = pitch_queue(matches, log, ss.match_results)
+    running = any(log.match(match_key(m)).status == RUNNING for m in on_console.values())
+    return log, on_console, running
+
+def live_game_card(match, state, names, rosters, show_pitch):
+    key = match_key(match)
+    duration = st.session_state.game_duration
+    st.markdown(f"**{'Lapangan ' + str(match.pitch) + ' · ' if show_pitch else ''}Game {match.number:02d}** · jadwal {match.start.strftime('%H.%M')}")
+    home_goals, away_goals = state.score(match.home_id, match.away_id)
+    score_cols = st.columns([3, 2, 3])
+    score_cols[0].markdown(f"### {names.get(match.home_id, match.home_id)}")
+    score_cols[1].markdown(f"## {home_goals} - {away_goals}")
+    score_cols[2].markdown(f"### {names.get(match.away_id, match.away_id)}")
+    label = {NOT_STARTED: "Belum mulai", RUNNING: "Berjalan", PAUSED: "Jeda"}.get(state.status, "Selesai")
+    st.metric(f"⏱️ Sisa waktu ({label})", format_clock(state.remaining(duration)), help=f"{duration} menit per game")
+
+    control_cols = st.columns(2)
+    if state.status == NOT_STARTED:
+        control_cols[0].button("▶️ Kick-off", key=f"live_kickoff_{key}", on_click=on_live_event, args=(key, KICKOFF), type="primary", width="stretch")
+        return
+    if state.status == RUNNING:
+        control_cols[0].button("⏸️ Jeda", key=f"live_pause_{key}", on_click=on_live_event, args=(key, PAUSE), width="stretch")
+    else:
+        control_cols[0].button("▶️ Lanjut", key=f"live_resume_{key}", on_click=on_live_event, args=(key, RESUME), width="stretch")
+    control_cols[1].button("🏁 Akhiri", key=f"live_end_{key}", on_click=on_live_event, args=(key, END), width="stretch")
+
+    for team_id in match.team_ids:
+        player_key = f"live_player_{key}_{team_id}"
+        players = rosters.get(team_id, {})
+        team_cols = st.columns([3, 1, 1, 1])
+        team_cols[0].selectbox(names.get(team_id, team_id), [None, *players], format_func=lambda uid: "-" if uid is None else players[uid], key=player_key)
+        team_cols[1].button("⚽", key=f"live_goal_{key}_{team_id}", on_click=on_live_event, args=(key, GOAL, team_id, player_key), help="Gol")
+        team_cols[2].button("🟨", key=f"live_yellow_{key}_{team_id}", on_click=on_live_event, args=(key, YELLOW, team_id, player_key), help="Kartu kuning")
+        team_cols[3].button("🟥", key=f"live_red_{key}_{team_id}", on_click=on_live_event, args=(key, RED, team_id, player_key), help="Kartu merah")
+
+    if state.events:
+        player_names = {uid: name for team in rosters.values() for uid, name in team.items()}
+        labels = {e['id']: f"{e['at'][11:16]} {LIVE_EVENT_ICONS[e['type']]} {player_names.get(e.get('player'), '')} ({names.get(e['team'], e['team'])})"
+                  for e in reversed(state.events)}
+        st.caption(" · ".join(labels.values()))
+        void_key = f"live_void_select_{key}"
+        void_cols = st.columns([3, 1])
+        void_cols[0].selectbox("Koreksi", list(labels), format_func=labels.get, key=void_key, label_visibility="collapsed")
+        void_cols[1].button("↩️ Batal", key=f"live_void_{key}", on_click=on_live_void, args=(key, void_key), help="Batalkan gol/kartu ini (tetap tercatat di log)")
+
+@timed_section("live console")
+def live_console_body(ticking):
+    ss = st.session_state
+    log, on_console, running = live_console_state()
+    duration = ss.game_duration
+    states = {match_key(m): log.match(match_key(m)) for m in on_console.values()}
+    expired = [key for key, state in states.items() if state.status == RUNNING and state.remaining(duration) <= 0]
+    if expired:
+        # Time is up: the game ends at the exact whistle time and the pitch rolls over to its next game.
+        append_match_log(*(log_event(key, END, at=states[key].started + datetime.timedelta(seconds=duration * 60 + states[key].paused_seconds))
+                           for key in expired))
+        st.rerun(scope="app")
+    if running != ticking:
+        st.rerun(scope="app")  # switch between the ticking and the idle fragment
+
+    st.caption(f"Wasit: {ss.event_organizer or '-'} · {duration} menit per game · ⏱️ jam berjalan otomatis saat game berlangsung")
+    names = get_league_table().team_names
+    rosters = {t['id']: {p.get('player_uid') or p['id']: p['name'] for p in t['players']} for t in ss.teams_data}
+    if not on_console:
+        st.success("Semua pertandingan sudah selesai 🎉 Cek klasemen di tab 'Hasil & Klasemen'.")
+    for col, match in zip(st.columns(len(on_console)) if on_console else [], on_console.values()):
+        with col, st.container(border=True):
+            live_game_card(match, states[match_key(match)], names, rosters, ss.num_pitches > 1)
+
+    if log.events:
+        with st.expander("📜 Log Pertandingan"):
+            player_names = {uid: name for team in rosters.values() for uid, name in team.items()}
+            numbers = {match_key(m): m.number for m in current_fixture_schedule(list(rosters)).matches}
+            st.dataframe(pd.DataFrame([{"Jam": e['at'][11:19], "Game": numbers.get(e['match']), "Event": f"{LIVE_EVENT_ICONS.get(e['type'], '')} {e['type']}",
+                                        "Team": names.get(e.get('team'), e.get('team')), "Pemain": player_names.get(e.get('player'), e.get('player'))}
+                                       for e in reversed(log.events[-LIVE_LOG_ROWS:])]), hide_index=True, width="stretch")
+    autosave_state(storage)
+
+@st.fragment
+def live_console():
+    live_console_body(False)
+
+@st.fragment(run_every=LIVE_TICK_SECONDS)
+def live_console_ticking():
+    live_console_body(True)
 
 # --- Main Tabs ---
-tab1, tab2, tab3, tab4 = st.tabs(["👤 Player Pool & Setup Team", "👥 Team Rosters & Edit", "📋 Poster Output", "💰 Finance"])
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["👤 Player Pool & Setup Team", "👥 Team Rosters & Edit", "📋 Poster Output", "💰 Finance", "🏆 Hasil & Klasemen", "⏱️ Live"])
 
-with tab1:
+with tab1, timed("player pool tab"):
     st.header("Enter Player Pool and Define Teams")
+    show_player_import()
     with st.form(key="player_pool_form"):
         st.markdown("Masukin Nama Player Dan Goalkeeper .")
-        form_num_teams = st.number_input("Jumlah Team", min_value=1, max_value=26, value=st.session_state.num_teams, step=1, key="form_num_teams_input")
-        form_game_duration = st.number_input("Durasi Per Game (menit)", min_value=5, value=st.session_state.game_duration, step=1, key="form_game_duration_input")
+        form_num_teams = st.number_input("Jumlah Team", min_value=1, max_value=100, value=st.session_state.num_teams, step=1, key="form_num_teams_input")
+        form_game_duration = st.number_input("Durasi Per Game (menit)", min_value=MIN_GAME_DURATION, value=st.session_state.game_duration, step=1, key="form_game_duration_input")
         cols_form = st.columns(2)
         with cols_form[0]:
             global_outfield_players_input = st.text_area("ALL Players", value=st.session_state.form_global_outfield_players, height=200, key="form_outfield_input", help="Example:\n1. John Doe\nPlayer Two\n3) Third Player")
         with cols_form[1]:
             global_goalkeepers_input = st.text_area("ALL Goalkeepers", value=st.session_state.form_global_goalkeepers, height=200, key="form_gk_input", help="Example:\nGK Mike\n2. Keeper Sue")
+        form_balance_teams = st.checkbox("⚖️ Seimbangkan Tim (rating & posisi)", value=True, key="form_balance_teams_input", help="Optional rating and position after the name, e.g. `Budi (8) [MF]`. Positions: GK, DF, MF, FW. Players without a rating count as 5.")
+        with st.expander("Aturan Tim & Seed"):
+            team_constraints_input = st.text_area("Aturan (satu per baris)", value=st.session_state.form_team_constraints, height=100, key="form_constraints_input", help="`Budi = Andi` keeps two players together, `Budi != Andi` keeps them apart.")
+            form_distribution_seed = st.number_input("Seed (0 = random)", min_value=0, value=0, step=1, key="form_seed_input")
         submit_distribute_button = st.form_submit_button(label="🎲 Bagikan Pemain Secara Random")
 
     if submit_distribute_button:
@@ -251,10 +1275,10 @@ with tab1:
         st.session_state.game_duration = form_game_duration
         st.session_state.form_global_outfield_players = global_outfield_players_input
         st.session_state.form_global_goalkeepers = global_goalkeepers_input
-        st.session_state.poster_text_for_copy = ""
+        st.session_state.form_team_constraints = team_constraints_input
         st.session_state.parsed_teams_for_output_cache = []
-        outfield_player_names = parse_player_list_from_raw_text(st.session_state.form_global_outfield_players)
-        goalkeeper_names = parse_player_list_from_raw_text(st.session_state.form_global_goalkeepers)
+        outfield_player_names = [parse_player_entry(n) for n in parse_player_list_from_raw_text(st.session_state.form_global_outfield_players)]
+        goalkeeper_names = [parse_player_entry(n) for n in parse_player_list_from_raw_text(st.session_state.form_global_goalkeepers)]
 
         if st.session_state.num_teams < 1:
             st.error("Number of teams must be at least 1.")
@@ -264,29 +1288,29 @@ with tab1:
             if len(outfield_player_names) < st.session_state.num_teams and st.session_state.num_teams > 0:
                 st.warning(f"There are fewer outfield players ({len(outfield_player_names)}) than teams ({st.session_state.num_teams}).")
             
-            random.shuffle(outfield_player_names)
-            random.shuffle(goalkeeper_names)
-            temp_teams_data = []
-            for i in range(st.session_state.num_teams):
-                team_id_char = generate_team_id(i)
-                team_display_name, team_color = generate_simplified_team_name_and_color(team_id_char)
-                temp_teams_data.append({"id": team_id_char, "team_name_display": team_display_name, "team_color_hex": team_color, "players": []})
-            
-            for idx, player_name in enumerate(outfield_player_names):
-                team_index = idx % st.session_state.num_teams
-                player_id = f"player_{team_index}_{len(temp_teams_data[team_index]['players'])}"
-                temp_teams_data[team_index]['players'].append({'id': player_id, 'name': player_name, 'is_gk': False, 'paid': False})
-            
-            assigned_gks_count = 0
-            for i in range(st.session_state.num_teams):
-                if assigned_gks_count < len(goalkeeper_names):
-                    gk_name = goalkeeper_names[assigned_gks_count]
-                    player_id = f"player_{i}_{len(temp_teams_data[i]['players'])}"
-                    temp_teams_data[i]['players'].append({'id': player_id, 'name': gk_name, 'is_gk': True, 'paid': False})
-                    assigned_gks_count += 1
-            
+            together_rules, apart_rules, constraint_errors = parse_constraints(st.session_state.form_team_constraints)
+            with timed("distribution"):
+                temp_teams_data, distribution_report = form_teams(outfield_player_names, goalkeeper_names, st.session_state.num_teams, form_balance_teams,
+                                                                  together_rules, apart_rules, seed=form_distribution_seed or None)
+            if distribution_report is not None:
+                distribution_report['constraint_errors'] = constraint_errors
+            with timed("player registry"):
+                registry_hints = register_team_players(temp_teams_data, get_player_registry())
+
+            st.session_state.distribution_report = distribution_report
+            duplicate_report = detect_duplicate_names(tuple(p['name'] for p in outfield_player_names + goalkeeper_names))
+            st.session_state.import_name_report = {
+                'duplicates': format_duplicate_report(duplicate_report), 'duplicates_truncated': duplicate_report['truncated'],
+                'registry_hints': registry_hints,
+                'extra_goalkeepers': [p['name'] for t in temp_teams_data for p in t['players'] if p.get('position') == 'GK' and not p['is_gk']],
+            }
+            clear_roster_widget_state()
             st.session_state.teams_data = temp_teams_data
+            st.session_state.payment_ledger = []
+            st.session_state.match_results = {}
+            st.session_state.match_log = []
             st.session_state.players_distributed = True
+            mark_state_changed('num_teams', 'game_duration', 'form_global_outfield_players', 'form_global_goalkeepers', 'form_team_constraints', 'teams_data', 'players_distributed', 'player_registry', 'payment_ledger', 'match_results', 'match_log')
             st.success(f"Players Terdistribusi Ke {st.session_state.num_teams} team! Cek Tab 'Team Rosters & Edits'.")
             total_players = len(outfield_player_names) + len(goalkeeper_names)
             st.info(f"✅ {total_players} Players | {len(goalkeeper_names)} Goalkeepers | {st.session_state.num_teams} Teams")
@@ -294,68 +1318,101 @@ with tab1:
 
     if not st.session_state.players_distributed:
          st.info("Masukin Nama Player Diatas Lalu Klik 'Bagikan Pemain Secara Random.'")
+    if st.session_state.players_distributed and st.session_state.import_name_report:
+        name_report = st.session_state.import_name_report
+        if name_report['duplicates']:
+            st.warning(f"Possible duplicate players in the list: {name_report['duplicates']}")
+        if name_report.get('duplicates_truncated'):
+            st.caption(f"Duplicate check: {name_report['duplicates_truncated']} very common name(s) only partly checked.")
+        if name_report.get('extra_goalkeepers'):
+            st.warning(f"Kiper lebih banyak dari jumlah team: {', '.join(name_report['extra_goalkeepers'])} main sebagai pemain lapangan (posisi GK).")
+        if name_report['registry_hints']:
+            hints = name_report['registry_hints']
+            st.info("New names that look like known players: " + ", ".join(f"{new} → {known}?" for new, known in hints[:DUPLICATE_REPORT_LIMIT])
+                    + (f" (top {DUPLICATE_REPORT_LIMIT} of {len(hints)})" if len(hints) > DUPLICATE_REPORT_LIMIT else ""))
+    if st.session_state.players_distributed and st.session_state.distribution_report:
+        report = st.session_state.distribution_report
+        st.caption(f"⚖️ Selisih rating antar tim: {report['rating_spread']:.1f} | Aturan dilanggar: {report['violations']} | {report['elapsed'] * 1000:.0f} ms")
+        if report['unknown_constraint_names']:
+            st.warning(f"Unknown names in team rules: {', '.join(report['unknown_constraint_names'])}")
+        if report['constraint_errors']:
+            st.warning("Team rules ignored: " + "; ".join(report['constraint_errors']))
 
-with tab2:
+with tab2, timed("roster tab"):
     st.header("Preview Dan Edit Roster Team")
     if st.session_state.players_distributed and st.session_state.teams_data:
         st.markdown("_Player Dibagi Secara Acak Tapi Masih Bisa Diedit Manual._")
-        num_roster_cols = min(len(st.session_state.teams_data), 2)
-        cols_roster = st.columns(num_roster_cols) if num_roster_cols > 0 else [st]
-        col_idx_roster = 0
-        parsed_teams_for_cache = []
-        needs_rerun = False
-        for i in range(len(st.session_state.teams_data)):
-            with cols_roster[col_idx_roster % num_roster_cols]:
-                team_data_ref = st.session_state.teams_data[i]
-                team_id = team_data_ref['id']
-                with st.expander(f"{team_data_ref.get('team_name_display', f'Team {team_id}')}", expanded=True):
-                    team_data_ref['team_name_display'] = st.text_input("Nama Team", value=team_data_ref.get('team_name_display'), key=f"team_name_display_{team_id}")
-                    team_data_ref['team_color_hex'] = st.color_picker(f"Team {team_id} Color", value=team_data_ref.get('team_color_hex', generate_random_basic_color_hex()), key=f"team_color_hex_{team_id}")
-                    st.markdown(f"<span style='font-size: 12px; color: {team_data_ref['team_color_hex']}; background-color: {team_data_ref['team_color_hex']}; border-radius: 3px;'>    </span> Selected Color", unsafe_allow_html=True)
-                    st.markdown("---")
-                    st.markdown("**Roster**")
-                    header_cols = st.columns([5, 1]); header_cols[0].markdown("_Player Name_")
-                    
-                    players_to_remove_indices = []
-                    for p_idx, player in enumerate(team_data_ref['players']):
-                        p_cols = st.columns([5, 1])
-                        with p_cols[0]:
-                            display_name, gk_prefix = (player['name'], "🧤 GK: ")
-                            if player['is_gk']: display_name = f"{gk_prefix}{display_name}"
-                            new_name_input = st.text_input("Player Name", value=display_name, key=f"p_name_{team_id}_{player['id']}", label_visibility="collapsed")
-                            cleaned_new_name = new_name_input
-                            if player['is_gk'] and cleaned_new_name.startswith(gk_prefix): cleaned_new_name = cleaned_new_name[len(gk_prefix):]
-                            if cleaned_new_name != player['name']: player['name'] = cleaned_new_name
-                        with p_cols[1]:
-                            if st.button("x", key=f"p_rem_{team_id}_{player['id']}", help=f"Remove {player['name']}"):
-                                players_to_remove_indices.append(p_idx); needs_rerun = True
-                    if players_to_remove_indices:
-                        for p_idx in sorted(players_to_remove_indices, reverse=True): team_data_ref['players'].pop(p_idx)
-                        needs_rerun = True
+        roster_editor_mode = st.radio("Mode Edit", ["📊 Grid", "📝 Per Pemain"], horizontal=True, key="roster_editor_mode")
+        if roster_editor_mode == "📊 Grid":
+            roster_grid_editor()
+        else:
+            num_roster_cols = min(len(st.session_state.teams_data), 2)
+            cols_roster = st.columns(num_roster_cols) if num_roster_cols > 0 else [st]
+            col_idx_roster = 0
+            needs_rerun = False
+            for i in range(len(st.session_state.teams_data)):
+                with cols_roster[col_idx_roster % num_roster_cols]:
+                    team_data_ref = st.session_state.teams_data[i]
+                    team_id = team_data_ref['id']
+                    with st.expander(f"{team_data_ref.get('team_name_display', f'Team {team_id}')}", expanded=True):
+                        new_team_name = st.text_input("Nama Team", value=team_data_ref.get('team_name_display'), key=f"team_name_display_{team_id}")
+                        new_team_color = st.color_picker(f"Team {team_id} Color", value=team_data_ref.get('team_color_hex', generate_random_basic_color_hex()), key=f"team_color_hex_{team_id}")
+                        if new_team_name != team_data_ref.get('team_name_display') or new_team_color != team_data_ref.get('team_color_hex'):
+                            team_data_ref['team_name_display'], team_data_ref['team_color_hex'] = new_team_name, new_team_color
+                            mark_state_changed('teams_data')
+                        st.markdown(f"<span style='font-size: 12px; color: {team_data_ref['team_color_hex']}; background-color: {team_data_ref['team_color_hex']}; border-radius: 3px;'>    </span> Selected Color", unsafe_allow_html=True)
+                        st.markdown("---")
+                        st.markdown("**Roster**")
+                        header_cols = st.columns([5, 1]); header_cols[0].markdown("_Player Name_")
                     
-                    add_player_cols = st.columns(2)
-                    with add_player_cols[0]:
-                        if st.button("➕ Add Player", key=f"add_player_{team_id}"):
-                            team_data_ref['players'].append({'id': f"player_{team_id}_{len(team_data_ref['players'])}_{random.randint(1000,9999)}", 'name': 'New Player', 'is_gk': False, 'paid': False}); needs_rerun = True
-                    with add_player_cols[1]:
-                        if st.button("🧤 Add GK", key=f"add_gk_{team_id}"):
-                            team_data_ref['players'].append({'id': f"player_{team_id}_{len(team_data_ref['players'])}_{random.randint(1000,9999)}", 'name': 'New GK', 'is_gk': True, 'paid': False}); needs_rerun = True
+                        players_to_remove_indices = []
+                        for p_idx, player in enumerate(team_data_ref['players']):
+                            p_cols = st.columns([5, 1])
+                            with p_cols[0]:
+                                display_name, gk_prefix = (player['name'], "🧤 GK: ")
+                                if player['is_gk']: display_name = f"{gk_prefix}{display_name}"
+                                new_name_input = st.text_input("Player Name", value=display_name, key=f"p_name_{team_id}_{player['id']}", label_visibility="collapsed")
+                                cleaned_new_name = new_name_input
+                                if player['is_gk'] and cleaned_new_name.startswith(gk_prefix): cleaned_new_name = cleaned_new_name[len(gk_prefix):]
+                                if cleaned_new_name != player['name']:
+                                    player['name'] = cleaned_new_name
+                                    register_team_players(st.session_state.teams_data, get_player_registry(), {player['id']})
+                                    mark_state_changed('teams_data', 'player_registry')
+                            with p_cols[1]:
+                                if st.button("x", key=f"p_rem_{team_id}_{player['id']}", help=f"Remove {player['name']}"):
+                                    players_to_remove_indices.append(p_idx); needs_rerun = True
+                        if players_to_remove_indices:
+                            for p_idx in sorted(players_to_remove_indices, reverse=True): team_data_ref['players'].pop(p_idx)
+                            mark_state_changed('teams_data'); needs_rerun = True
                     
-                    outfield_players = [p for p in team_data_ref['players'] if not p['is_gk']]
-                    goalkeepers = [p for p in team_data_ref['players'] if p['is_gk']]
-                    parsed_teams_for_cache.append({"id": team_id, "display_name": team_data_ref['team_name_display'], "color_hex": team_data_ref['team_color_hex'].upper(), "players": team_data_ref['players'], "player_count": len(outfield_players), "gk_count": len(goalkeepers)})
-            col_idx_roster += 1
+                        add_player_cols = st.columns(2)
+                        with add_player_cols[0]:
+                            if st.button("➕ Add Player", key=f"add_player_{team_id}"):
+                                team_data_ref['players'].append({'id': new_player_id(index_players(st.session_state.teams_data)), 'name': 'New Player', 'is_gk': False, 'paid': False}); mark_state_changed('teams_data'); needs_rerun = True
+                        with add_player_cols[1]:
+                            if st.button("🧤 Add GK", key=f"add_gk_{team_id}"):
+                                team_data_ref['players'].append({'id': new_player_id(index_players(st.session_state.teams_data)), 'name': 'New GK', 'is_gk': True, 'paid': False}); mark_state_changed('teams_data'); needs_rerun = True
+
+                col_idx_roster += 1
         
-        if needs_rerun: st.rerun()
-        st.session_state.parsed_teams_for_output_cache = parsed_teams_for_cache
-        if parsed_teams_for_cache:
-            all_names = [p['name'] for t in parsed_teams_for_cache for p in t['players']]
-            duplicates = {n: all_names.count(n) for n in set(all_names) if all_names.count(n) > 1}
-            if duplicates: st.warning(f"Duplicate names detected: {', '.join([f'{k} (x{v})' for k,v in duplicates.items()])}")
+            if needs_rerun: st.rerun()
+            refresh_parsed_teams_cache()
+            show_duplicate_warning()
+        player_identity_panel()
+        if storage is not None and storage.supports_history:
+            with st.expander("🕘 Riwayat Pemain"):
+                history_names = sorted({p['name'] for t in st.session_state.teams_data for p in t['players'] if p['name'].strip()}, key=str.lower)
+                history_name = st.selectbox("Pemain", history_names, key="player_history_name")
+                history_rows = storage.find_player_history(history_name) if history_name else []
+                if history_rows:
+                    st.dataframe(pd.DataFrame([{"Tanggal": r['event_date'], "Event": r['title'], "Team": r['team_name'] or f"Team {r['team_id']}",
+                                                "GK": bool(r['is_gk']), "Lunas": bool(r['paid'])} for r in history_rows]), hide_index=True, width="stretch")
+                else:
+                    st.caption("Belum ada event tersimpan untuk pemain ini.")
     else:
         st.info("Player Belum Dibagiin. Balik ke Player Pool & Setup Team Tab.")
 
-with tab3:
+with tab3, timed("poster tab"):
     st.header("Event Poster Output")
     final_teams_for_poster = st.session_state.get('parsed_teams_for_output_cache', [])
     if not final_teams_for_poster:
@@ -365,110 +1422,85 @@ with tab3:
         for idx, t in enumerate(final_teams_for_poster):
             with summary_cols[idx]:
                 st.markdown(f"**{t['display_name']}**"); st.markdown(f"Players: {t['player_count']} | GK: {t['gk_count']}"); st.markdown(f"<div style='width:18px;height:18px;background:{t['color_hex']};border-radius:4px;'></div>", unsafe_allow_html=True)
-        
-        if st.button("📝 Prepare Poster Text for Copying", key="prepare_poster_button"):
-            output_lines = []
-            output_lines.append(f"*{st.session_state.event_title.upper()}*"); output_lines.append(f"{st.session_state.event_date.strftime('%d/%m/%Y')}"); output_lines.append(f"Pkl. {st.session_state.event_time_start.strftime('%H.%M')} - {st.session_state.event_time_end.strftime('%H.%M')}"); output_lines.append("")
-            output_lines.append(f"⛳ *{st.session_state.event_place.upper()}*")
-            if st.session_state.event_publisher: output_lines.append(f"📽 {st.session_state.event_publisher}")
-            if st.session_state.event_organizer: output_lines.append(f"👮 {st.session_state.event_organizer}")
-            output_lines.append(""); output_lines.append(f"*KICK OFF {st.session_state.kick_off_time.strftime('%H.%M')}*"); output_lines.append("")
-            output_lines.append(f"HTM Player : {st.session_state.price_player:,.0f}"); output_lines.append(f"HTM GK : {st.session_state.price_gk:,.0f}"); output_lines.append("\n")
-            
-            teams_for_fixtures_generation_with_emoji = []
-            for team_info in final_teams_for_poster:
-                if not team_info['display_name'].strip(): continue
-                color_emoji = COLOR_TO_EMOJI_MAP.get(team_info.get('color_hex', ''), DEFAULT_COLOR_EMOJI)
-                display_name_with_emoji = f"{team_info['display_name']} {color_emoji}"
-                output_lines.append(f"*{display_name_with_emoji}:*")
-                teams_for_fixtures_generation_with_emoji.append({"id": team_info['id'], "display_name_with_emoji": display_name_with_emoji})
-                
-                player_display_number = 1
-                sorted_players = sorted(team_info['players'], key=lambda p: p.get('is_gk', False))
-                for player_detail in sorted_players:
-                    gk_marker = " (GK)" if player_detail.get('is_gk') else ""
-                    paid_marker = " (Paid ✅)" if player_detail.get('paid') else ""
-                    output_lines.append(f"{player_display_number}. {player_detail['name']}{gk_marker}{paid_marker}")
-                    player_display_number += 1
-                output_lines.append("")
-            
-            output_lines.append("*Game Fixtures :*"); output_lines.append(f"{st.session_state.game_duration} menit/Game"); output_lines.append("Home (H) Kiri"); output_lines.append("Away (A) Kanan"); output_lines.append("")
-            if len(teams_for_fixtures_generation_with_emoji) >= 2:
-                fixture_strings = generate_round_robin_fixtures(teams_for_fixtures_generation_with_emoji, st.session_state.game_duration)
-                output_lines.extend(fixture_strings if fixture_strings else ["Not enough teams for fixtures (minimum 2)."])
+
+        # Rendered outputs are cached by content hash, so an unchanged event never re-renders.
+        poster_key = current_poster_hash()
+        poster_state = build_state_snapshot()
+        fixture_team_ids = [t['id'] for t in final_teams_for_poster if t['display_name'].strip()]
+        if len(fixture_team_ids) >= 2:
+            schedule_fix_panel(fixture_team_ids, "poster")
+
+        st.subheader("📋 Poster Text (Select All & Copy)")
+        st.text_area("Copy the text below:", value=render_poster_cached(poster_key, 'txt', poster_state), height=300, key=f"poster_copy_area_{poster_key}", help="Click inside, Ctrl+A (or Cmd+A) to select all, then Ctrl+C to copy.")
+        poster_file_stem = f"poster-{st.session_state.event_date.isoformat()}"
+        download_cols = st.columns(3)
+        for col, (fmt, label) in zip(download_cols, (('txt', "⬇️ WhatsApp (.txt)"), ('png', "🖼️ Gambar (.png)"), ('pdf', "📄 PDF"))):
+            col.download_button(
+                label, data=lambda fmt=fmt: render_poster_cached(poster_key, fmt, poster_state), file_name=f"{poster_file_stem}.{fmt}",
+                mime=POSTER_FORMATS[fmt], key=f"poster_download_{fmt}", on_click="ignore", disabled=fmt != 'txt' and not image_output_available(),
+                help=None if fmt == 'txt' or image_output_available() else "Install Pillow for image/PDF output."
+            )
+        st.markdown("---")
+        st.markdown("**Color legend:** " + " | ".join([f"{COLOR_TO_EMOJI_MAP.get(v,DEFAULT_COLOR_EMOJI)} {k}" for k,v in BASIC_COLORS_LIMITED.items()]))
+
+    if storage is not None and storage.supports_history:
+        with st.expander("📦 Batch Poster (Event History)"):
+            past_events = storage.list_events()
+            if past_events:
+                batch_labels = {e['event_key']: f"{e['event_date']} · {e['title']}" for e in past_events}
+                batch_formats = [f for f in POSTER_FORMATS if f == 'txt' or image_output_available()]
+                batch_event_keys = st.multiselect("Events", list(batch_labels), format_func=batch_labels.get, key="poster_batch_events")
+                batch_selected_formats = st.multiselect("Format", batch_formats, default=[f for f in ('txt', 'pdf') if f in batch_formats], key="poster_batch_formats")
+                st.download_button(
+                    "⬇️ Download ZIP", data=lambda: build_poster_batch(storage, tuple(batch_event_keys), tuple(batch_selected_formats)),
+                    file_name="kentep-posters.zip", mime="application/zip", key="poster_batch_download", on_click="ignore",
+                    disabled=not batch_event_keys or not batch_selected_formats
+                )
             else:
-                output_lines.append("Only one or zero teams defined, cannot generate fixtures.")
-            
-            st.session_state.poster_text_for_copy = "\n".join(output_lines)
-            st.success("Poster is ready! You can now copy the text below.")
-
-        if st.session_state.poster_text_for_copy:
-            st.subheader("📋 Poster Text (Select All & Copy)")
-            st.text_area("Copy the text below:", value=st.session_state.poster_text_for_copy, height=300, key="poster_copy_area", help="Click inside, Ctrl+A (or Cmd+A) to select all, then Ctrl+C to copy.")
-            st.markdown("---")
-            st.markdown("**Color legend:** " + " | ".join([f"{COLOR_TO_EMOJI_MAP.get(v,DEFAULT_COLOR_EMOJI)} {k}" for k,v in BASIC_COLORS_LIMITED.items()]))
-        else:
-            st.info("Generate poster first to see the output.")
+                st.caption("No stored events yet.")
 
 with tab4:
     st.header("💰 Financial Overview")
-    
-    st.subheader("Financial Summary")
-    total_players = 0
-    total_gks = 0
-    paid_players = 0
-    paid_gks = 0
-    teams_source = st.session_state.get('parsed_teams_for_output_cache', [])
-    if not teams_source and st.session_state.get('players_distributed'):
-        teams_source = st.session_state.get('teams_data', [])
-    if teams_source:
-        all_players_list = [p for team in teams_source for p in team.get('players', [])]
-        for player in all_players_list:
-            if player.get('is_gk'):
-                total_gks += 1
-                if player.get('paid'): paid_gks += 1
-            else:
-                total_players += 1
-                if player.get('paid'): paid_players += 1
-    price_player = st.session_state.get('price_player', 0.0)
-    price_gk = st.session_state.get('price_gk', 0.0)
-    collected_income = (paid_players * price_player) + (paid_gks * price_gk)
-    expected_income = (total_players * price_player) + (total_gks * price_gk)
-    st.metric(label="Collected Income", value=f"IDR {collected_income:,.0f}")
-    if expected_income > 0:
-        try:
-            st.progress(collected_income / expected_income)
-        except ZeroDivisionError:
-            st.progress(0.0)
-        st.caption(f"Expected: IDR {expected_income:,.0f}")
+    if st.session_state.get('players_distributed') and st.session_state.get('teams_data'):
+        finance_panel()
     else:
-        st.caption("No players to calculate income from.")
-    st.markdown("---")
+        st.info("No players to display. Distribute players in the 'Player Pool' tab first.")
 
-    st.header("Player Payment Status")
+with tab5:
+    st.header("🏆 Hasil & Klasemen")
     if st.session_state.get('players_distributed') and st.session_state.get('teams_data'):
-        for team_data_ref in st.session_state.teams_data:
-            team_name = team_data_ref.get('team_name_display', f"Team {team_data_ref['id']}")
-            st.subheader(team_name)
-
-            for player in team_data_ref['players']:
-                cols = st.columns([4, 1])
-                with cols[0]:
-                    display_name = player['name']
-                    if player.get('is_gk'):
-                        display_name = f"🧤 GK: {display_name}"
-                    st.markdown(display_name)
-                with cols[1]:
-                    is_paid = st.checkbox("Paid", value=player.get('paid', False), key=f"finance_p_paid_{team_data_ref['id']}_{player['id']}", label_visibility="collapsed")
-                    if is_paid != player.get('paid', False):
-                        player['paid'] = is_paid
+        season_panel()
     else:
-        st.info("No players to display. Distribute players in the 'Player Pool' tab first.")
+        st.info("Bagikan pemain dulu untuk membuat jadwal pertandingan.")
+
+with tab6:
+    st.header("⏱️ Live Match Day")
+    if st.session_state.get('players_distributed') and len(st.session_state.get('teams_data') or []) >= 2:
+        (live_console_ticking if live_console_state()[2] else live_console)()
+    else:
+        st.info("Bagikan pemain dulu untuk membuat jadwal pertandingan.")
 
 st.markdown("---")
 st.caption("Kentep FC Jaya!")
 
 # --- Auto-save on change ---
-state_after_run = {k: st.session_state.get(k) for k in KEYS_TO_PERSIST}
-if state_before_run != state_after_run and api_key and bin_id:
-    save_state_to_cloud(api_key, bin_id)
+autosave_state(storage)
+get_timings().record("full run", time.perf_counter() - run_started)
+
+# --- Diagnostics Panel ---
+if st.session_state.get('show_diagnostics'):
+    with st.sidebar.expander("🩺 Diagnostics", expanded=True):
+        timings = get_timings()
+        diag_cols = st.columns(3)
+        diag_cols[0].metric("Reruns", timings.runs)
+        diag_cols[1].metric("Run (ms)", f"{timings.current.get('full run', 0.0) * 1000:.0f}")
+        diag_cols[2].metric("Snapshot", f"{snapshot_size(st.session_state, build_state_snapshot) / 1024:.1f} KB")
+        if storage is not None:
+            st.caption(" · ".join(f"{label}: {'-' if seconds is None else f'{seconds * 1000:.0f} ms'}" for label, seconds in storage.latency().items()))
+        st.dataframe(
+            pd.DataFrame(timings.rows(), columns=['section', 'run_ms', 'last_ms', 'avg_ms', 'max_ms', 'calls']), hide_index=True, width="stretch",
+            column_config={'section': st.column_config.TextColumn("Section"), 'calls': st.column_config.NumberColumn("Calls"),
+                           **{c: st.column_config.NumberColumn(c.replace('_ms', ' ms'), format="%.1f") for c in ('run_ms', 'last_ms', 'avg_ms', 'max_ms')}}
+        )
+        st.caption("run = this rerun (fragment reruns add to it); tabs include the sections inside them.")
+        st.button("Reset timings", key="diagnostics_reset_button", on_click=lambda: get_timings().reset())
@@ -0,0 +1,27 @@
+# Kentep League Manager - core (no Streamlit imports in here)
+# Submodules load on first attribute access, so `import kentep_core` stays cheap; numpy, requests,
+# Pillow and openpyxl are only imported by the modules (or functions) that need them.
+import importlib
+
+_EXPORTS = {
+    'build_event': 'event', 'coerce_event_settings': 'event', 'default_event_settings': 'event',
+    'form_teams': 'teams', 'register_team_players': 'teams',
+    'parse_player_entry': 'players', 'parse_constraints': 'players',
+    'distribute_balanced': 'distribution', 'assign_goalkeepers': 'distribution',
+    'schedule_fixtures': 'fixtures', 'schedule_event_fixtures': 'fixtures', 'format_fixture_lines': 'fixtures',
+    'render_poster': 'poster', 'render_batch': 'poster',
+    'PlayerRegistry': 'registry', 'find_duplicates': 'registry',
+    'PaymentLedger': 'ledger', 'LedgerSummary': 'ledger', 'event_finance': 'ledger',
+    'Event': 'model', 'compact_record': 'model', 'snapshot_from_record': 'model', 'pack': 'model', 'unpack': 'model',
+    'IMPORTERS': 'importer', 'parse_player_list': 'importer', 'split_into_pools': 'importer',
+}
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'kentep_core' has no attribute '{name}'")
+    value = getattr(importlib.import_module(f"kentep_core.{module}"), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,113 @@
+# Kentep League Manager - on-disk snapshot cache shared by every session of the app process
+#
+# One entry per storage source (a jsonbin bin, a sync server document):
+#
+#   {'revision': ..., 'doc': <what the backend stores>, 'etag': str | None, 'fetched_at': iso,
+#    'outbox': None | {'seq': n, 'doc': ..., 'edits': n, 'queued_at': iso, ...backend extras}}
+#
+# `doc` is the last copy the backend confirmed; `outbox` is the newest local state it has not confirmed
+# yet (edits made offline, or still in flight). Every backend writes whole snapshots or diffs against a
+# base, so queued edits coalesce into one outbox entry instead of a growing list.
+import atexit
+import datetime
+import json
+import os
+import threading
+import time
+
+FLUSH_DELAY_SECONDS = 1.0
+REVALIDATE_INTERVAL_SECONDS = 30.0
+
+
+class SnapshotCache:
+    def __init__(self, path, flush_delay=FLUSH_DELAY_SECONDS):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.entries = {}
+        self.checks = {}  # source -> {'running', 'checked_at', 'error', 'note'}
+        self._timer = None
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as fh:
+                    self.entries = json.load(fh)
+            except (OSError, ValueError):
+                self.entries = {}  # torn or foreign file: it is only a cache, start empty
+        atexit.register(self.flush)
+
+    def get(self, source):
+        with self.lock:
+            entry = self.entries.get(source)
+            return dict(entry) if entry else None
+
+    def confirm(self, source, revision, doc, etag=None, outbox_seq=None):
+        # `doc` is what the backend now holds. Clears the outbox if it was the write being confirmed.
+        with self.lock:
+            entry = self.entries.setdefault(source, {'outbox': None})
+            older = isinstance(revision, int) and isinstance(entry.get('revision'), int) and revision < entry['revision']
+            if not older:  # another session may already have confirmed a newer revision
+                if etag is None and revision == entry.get('revision'):
+                    etag = entry.get('etag')  # same content: the ETag we already have still matches
+                entry.update(revision=revision, doc=doc, etag=etag, fetched_at=datetime.datetime.now().isoformat(timespec='seconds'))
+            if outbox_seq is not None and entry['outbox'] and entry['outbox']['seq'] == outbox_seq:
+                entry['outbox'] = None
+            self._schedule_flush()
+
+    def queue(self, source, doc, **extra):
+        # Records `doc` as not yet confirmed; returns the seq to pass to confirm() once it is.
+        with self.lock:
+            entry = self.entries.setdefault(source, {'outbox': None})
+            previous = entry['outbox'] or {'seq': 0, 'edits': 0}
+            entry['outbox'] = dict(extra, seq=previous['seq'] + 1, doc=doc, edits=previous['edits'] + 1,
+                                   queued_at=datetime.datetime.now().isoformat(timespec='seconds'))
+            self._schedule_flush()
+            return entry['outbox']['seq']
+
+    # --- Background revalidation ---
+    def revalidate(self, source, check, min_interval=REVALIDATE_INTERVAL_SECONDS):
+        # Runs check() (conditional fetch + outbox replay, returns an optional note) on a background thread,
+        # at most one at a time per source and not more often than `min_interval` for all sessions together.
+        with self.lock:
+            state = self.checks.setdefault(source, {'running': False, 'checked_at': None, 'error': None, 'note': None})
+            if state['running'] or (state['checked_at'] is not None and time.monotonic() - state['checked_at'] < min_interval):
+                return False
+            state['running'] = True
+        threading.Thread(target=self._run_check, args=(source, check), name=f"revalidate-{source}", daemon=True).start()
+        return True
+
+    def _run_check(self, source, check):
+        note, error = None, None
+        try:
+            note = check()
+        except Exception as exc:  # reported to the sessions; the cached copy stays usable
+            error = str(exc) or type(exc).__name__
+        with self.lock:
+            self.checks[source].update(running=False, checked_at=time.monotonic(), error=error, note=note)
+
+    def check_status(self, source):
+        with self.lock:
+            state = self.checks.get(source)
+            return dict(state) if state else None
+
+    # --- Disk ---
+    def _schedule_flush(self):
+        # Called with the lock held. Bursts of edits become one file write.
+        if self.path and self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._write_lock:  # serializes writers so an older payload never lands after a newer one
+            with self.lock:
+                self._timer = None
+                if not self.path: return
+                payload = json.dumps(self.entries, ensure_ascii=False, separators=(',', ':'))
+            tmp = f"{self.path}.tmp"
+            try:
+                with open(tmp, 'w', encoding='utf-8') as fh:
+                    fh.write(payload)
+                os.replace(tmp, self.path)
+            except OSError:
+                pass  # read-only deploys still get the in-memory cache
@@ -0,0 +1,168 @@
+# Kentep League Manager - command line: player list -> teams, fixtures and poster, without Streamlit
+#
+#   python -m kentep_core event players.txt --teams 4 --goalkeepers keepers.txt --out out/
+#   python -m kentep_core batch events/*.json --jobs 4 --out out/
+#
+# A batch spec is a JSON object with any event setting (event_title, event_date "2024-10-12",
+# kick_off_time "17:15", num_teams, game_duration, ...) plus "players" (and optionally
+# "goalkeepers") pointing at a txt/csv/xlsx file relative to the spec, "rules", "seed", "balance".
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+
+from kentep_core.event import coerce_event_settings, build_event
+from kentep_core.importer import IMPORTERS, split_into_pools
+from kentep_core.players import parse_player_entry
+from kentep_core.state import json_default
+
+DEFAULT_FORMATS = ('txt',)
+
+
+def read_player_file(path, all_goalkeepers=False):
+    # -> (outfield entries, goalkeeper entries, [(line, name, error)])
+    extension = os.path.splitext(path)[1].lstrip('.').lower() or 'txt'
+    if extension not in IMPORTERS:
+        raise ValueError(f"{path}: unsupported file type '.{extension}' (use {', '.join(IMPORTERS)})")
+    with open(path, 'rb') as stream:
+        rows = list(IMPORTERS[extension](stream))
+    if all_goalkeepers:
+        for row in rows: row['is_gk'] = True
+    outfield, goalkeepers, errors = split_into_pools(rows)
+    return [parse_player_entry(n) for n in outfield], [parse_player_entry(n) for n in goalkeepers], errors
+
+
+def event_folder_name(snapshot):
+    return f"{snapshot['event_date'].isoformat()}_{snapshot['event_title']}".replace('/', '-').replace(' ', '_')
+
+
+def run_event(spec, out_dir=None, formats=DEFAULT_FORMATS, base_dir='.'):
+    # Builds one event from a spec dict and writes event.json plus the posters. Returns a summary dict
+    # (safe to send back from a worker process).
+    from kentep_core.ledger import event_finance
+    from kentep_core.poster import render_poster
+
+    resolve = lambda path: path if os.path.isabs(path) else os.path.join(base_dir, path)
+    outfield, goalkeepers, errors = read_player_file(resolve(spec['players']))
+    if spec.get('goalkeepers'):
+        _, extra_goalkeepers, gk_errors = read_player_file(resolve(spec['goalkeepers']), all_goalkeepers=True)
+        goalkeepers += extra_goalkeepers; errors += gk_errors
+    settings = coerce_event_settings(spec)
+    snapshot, report = build_event(settings, outfield, goalkeepers, balance=spec.get('balance', True), rules_text=spec.get('rules', ''),
+                                   seed=spec.get('seed'), time_budget=spec.get('time_budget'))
+    summary = {'event': f"{settings['event_date'].isoformat()} {settings['event_title']}", 'players': len(outfield), 'goalkeepers': len(goalkeepers),
+               'teams': settings['num_teams'], 'skipped_lines': errors, 'rating_spread': report and report['rating_spread'],
+               'violations': report and report['violations'], 'finance': event_finance(snapshot), 'files': []}
+    if out_dir is None:
+        summary['poster'] = render_poster(snapshot, 'txt')
+        return summary
+    folder = os.path.join(out_dir, event_folder_name(snapshot))
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, 'event.json'), 'w', encoding='utf-8') as fh:
+        json.dump(snapshot, fh, default=json_default, ensure_ascii=False, indent=1)
+    summary['files'].append(os.path.join(folder, 'event.json'))
+    for fmt in formats:
+        data = render_poster(snapshot, fmt)
+        path = os.path.join(folder, f"poster.{fmt}")
+        with open(path, 'w' if isinstance(data, str) else 'wb', **({'encoding': 'utf-8'} if isinstance(data, str) else {})) as fh:
+            fh.write(data)
+        summary['files'].append(path)
+    return summary
+
+
+def _run_spec_file(path, out_dir, formats):
+    with open(path, encoding='utf-8') as fh:
+        spec = json.load(fh)
+    return run_event(spec, out_dir, formats, base_dir=os.path.dirname(os.path.abspath(path)))
+
+
+def _print_summary(summary, stream=sys.stdout):
+    finance = summary['finance']
+    spread = "" if summary['rating_spread'] is None else f", spread {summary['rating_spread']:.1f}, {summary['violations']} rule(s) broken"
+    print(f"{summary['event']}: {summary['players']} players + {summary['goalkeepers']} GK in {summary['teams']} teams{spread}; "
+          f"HTM expected IDR {finance['expected']:,.0f}", file=stream)
+    for line, name, error in summary['skipped_lines']:
+        print(f"  skipped line {line} ({name or '-'}): {error}", file=stream)
+    for path in summary['files']:
+        print(f"  wrote {path}", file=stream)
+
+
+def _parse_formats(value):
+    formats = tuple(f.strip() for f in value.split(',') if f.strip())
+    unknown = [f for f in formats if f not in ('txt', 'png', 'pdf')]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown format(s): {', '.join(unknown)}")
+    return formats
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m kentep_core", description="Kentep League Manager without the web app.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    event = commands.add_parser('event', help="build teams, fixtures and a poster for one event")
+    event.add_argument('players', help="player list (.txt, .csv, .xlsx, or a WhatsApp chat export)")
+    event.add_argument('-g', '--goalkeepers', help="separate goalkeeper list")
+    event.add_argument('-n', '--teams', type=_positive_int, dest='num_teams', default=2)
+    event.add_argument('--title', dest='event_title')
+    event.add_argument('--date', dest='event_date', help="YYYY-MM-DD")
+    event.add_argument('--start', dest='event_time_start', help="HH:MM")
+    event.add_argument('--end', dest='event_time_end', help="HH:MM")
+    event.add_argument('--kick-off', dest='kick_off_time', help="HH:MM")
+    event.add_argument('--place', dest='event_place')
+    event.add_argument('--duration', type=_positive_int, dest='game_duration', help="minutes per game")
+    event.add_argument('--pitches', type=_positive_int, dest='num_pitches')
+    event.add_argument('--double-round-robin', action='store_true', default=None, dest='double_round_robin')
+    event.add_argument('--price-player', type=float, dest='price_player')
+    event.add_argument('--price-gk', type=float, dest='price_gk')
+    event.add_argument('--rules', help="file with 'A = B' / 'A != B' team rules")
+    event.add_argument('--seed', type=int)
+    event.add_argument('--no-balance', action='store_false', dest='balance')
+    event.add_argument('-o', '--out', help="output folder (default: print the poster)")
+    event.add_argument('-f', '--formats', type=_parse_formats, default=DEFAULT_FORMATS, help="comma separated: txt,png,pdf")
+
+    batch = commands.add_parser('batch', help="build many events from JSON specs in parallel")
+    batch.add_argument('specs', nargs='+', help="event spec .json files")
+    batch.add_argument('-o', '--out', required=True)
+    batch.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="worker processes")
+    batch.add_argument('-f', '--formats', type=_parse_formats, default=DEFAULT_FORMATS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'event':
+        spec = {k: v for k, v in vars(args).items() if v is not None and k not in ('command', 'out', 'formats', 'rules')}
+        if args.rules:
+            with open(args.rules, encoding='utf-8') as fh:
+                spec['rules'] = fh.read()
+        try:
+            summary = run_event(spec, args.out, args.formats)
+        except (OSError, ValueError, ImportError) as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 1
+        if args.out is None:
+            print(summary['poster'])
+            _print_summary(summary, sys.stderr)
+        else:
+            _print_summary(summary)
+        return 0
+
+    # Each event is independent (own RNG, own files), so they run in separate processes.
+    failures = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, args.jobs or 1)) as pool:
+        futures = {pool.submit(_run_spec_file, path, args.out, args.formats): path for path in args.specs}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                _print_summary(future.result())
+            except (OSError, ValueError, ImportError, KeyError) as exc:
+                failures += 1
+                print(f"{futures[future]}: error: {exc}", file=sys.stderr)
+    return 1 if failures else 0
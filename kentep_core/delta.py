@@ -0,0 +1,186 @@
+# Kentep League Manager - JSON-patch style deltas, conflict detection and merging
+#
+# Diffs run on a "keyed view" of the snapshot record in which the roster is addressed by id instead of
+# list position, so edits to different players/teams/keys never touch the same path:
+#
+#   /event_place                       plain keys as they are
+#   /roster_order                      [team id, ...]
+#   /roster_teams/A/players            [player id, ...] (roster order; replaced as a whole)
+#   /roster_players/p3f9.../paid       one field of one player
+#   /payment_ledger                    append-only: concurrent payments are both kept and renumbered
+#   /match_log                         append-only as well (string ids, so nothing is renumbered)
+#
+# An op is {'op': 'add' | 'replace' | 'remove' | 'append', 'path': '/a/b', 'value': ...}.
+import collections
+import copy
+
+APPEND_ONLY_PATHS = ('/payment_ledger', '/match_log')
+DEFAULT_LOG_SIZE = 500
+_MISSING = object()
+
+
+def escape_segment(key):
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def split_path(path):
+    return [s.replace('~1', '/').replace('~0', '~') for s in path.split('/')[1:]]
+
+
+def paths_overlap(a, b):
+    return a == b or a.startswith(b + '/') or b.startswith(a + '/')
+
+
+# --- Keyed view ---
+def keyed_view(record):
+    # record: JSON-ready snapshot (KEYS_TO_PERSIST dict with ISO dates).
+    teams = record.get('teams_data') or []
+    view = {k: v for k, v in record.items() if k != 'teams_data'}
+    view['roster_order'] = [t['id'] for t in teams]
+    view['roster_teams'] = {t['id']: dict({k: v for k, v in t.items() if k not in ('id', 'players')}, players=[p['id'] for p in t['players']]) for t in teams}
+    view['roster_players'] = {p['id']: {k: v for k, v in p.items() if k != 'id'} for t in teams for p in t['players']}
+    return view
+
+
+def snapshot_from_view(view):
+    if not view:
+        return {}
+    record = {k: v for k, v in view.items() if k not in ('roster_order', 'roster_teams', 'roster_players')}
+    teams, players = view.get('roster_teams') or {}, view.get('roster_players') or {}
+    record['teams_data'] = [
+        dict({'id': tid}, **{k: v for k, v in teams[tid].items() if k != 'players'},
+             players=[dict({'id': pid}, **players[pid]) for pid in teams[tid]['players'] if pid in players])
+        for tid in view.get('roster_order') or [] if tid in teams
+    ]
+    return record
+
+
+# --- Diff / apply ---
+def diff(base, current, path=''):
+    ops = []
+    if isinstance(base, dict) and isinstance(current, dict):
+        for key in base:
+            if key not in current:
+                ops.append({'op': 'remove', 'path': f"{path}/{escape_segment(key)}"})
+        for key, value in current.items():
+            child = f"{path}/{escape_segment(key)}"
+            if key not in base:
+                ops.append({'op': 'add', 'path': child, 'value': value})
+            elif base[key] != value:
+                ops += diff(base[key], value, child)
+    elif (path in APPEND_ONLY_PATHS and isinstance(base, list) and isinstance(current, list)
+          and len(current) > len(base) and current[:len(base)] == base):
+        ops.append({'op': 'append', 'path': path, 'value': current[len(base):]})
+    elif base != current:
+        ops.append({'op': 'replace', 'path': path, 'value': current})
+    return ops
+
+
+def get_path(doc, path, default=None):
+    node = doc
+    for segment in split_path(path):
+        if not isinstance(node, dict) or segment not in node:
+            return default
+        node = node[segment]
+    return node
+
+
+def _apply_one(node, segments, op):
+    # Copies only the containers along the path; everything else stays shared with the input.
+    node = dict(node) if isinstance(node, dict) else {}
+    key = segments[0]
+    if len(segments) > 1:
+        node[key] = _apply_one(node.get(key), segments[1:], op)
+    elif op['op'] == 'remove':
+        node.pop(key, None)
+    elif op['op'] == 'append':
+        items = list(node.get(key) or [])
+        for item in op['value']:
+            if isinstance(item, dict) and isinstance(item.get('id'), int):
+                item = dict(item, id=len(items) + 1)
+            items.append(item)
+        node[key] = items
+    else:
+        node[key] = copy.deepcopy(op['value'])
+    return node
+
+
+def apply_ops(doc, ops):
+    for op in ops:
+        segments = split_path(op['path'])
+        doc = _apply_one(doc, segments, op) if segments else copy.deepcopy(op.get('value') or {})
+    return doc
+
+
+def find_conflicts(theirs_ops, mine_ops, theirs_doc):
+    # Paths of `mine_ops` that overlap a change in `theirs_ops` and would not end up with the same value.
+    conflicts = []
+    for op in mine_ops:
+        for other in theirs_ops:
+            if not paths_overlap(op['path'], other['path']): continue
+            if op['op'] == 'append' and other['op'] == 'append': continue
+            current = get_path(theirs_doc, op['path'], _MISSING)
+            if op['op'] == 'remove' and current is _MISSING: continue
+            if op['op'] in ('add', 'replace') and current == op['value']: continue
+            conflicts.append({'path': op['path'], 'theirs': None if current is _MISSING else current})
+            break
+    return conflicts
+
+
+# --- Server side ---
+class DeltaDocument:
+    # One revisioned document. A patch is accepted when it does not overlap anything written since
+    # its base revision; the response carries those other writes so the client can fold them in.
+    def __init__(self, doc=None, revision=0, log_size=DEFAULT_LOG_SIZE):
+        self.doc = doc or {}
+        self.revision = revision
+        self.log = collections.deque(maxlen=log_size)  # (revision, ops)
+
+    def ops_since(self, revision):
+        # None when the log no longer reaches back to `revision` (the client needs the full document).
+        if revision == self.revision:
+            return []
+        if revision > self.revision or revision < self.revision - len(self.log):
+            return None
+        return [op for rev, ops in self.log if rev > revision for op in ops]
+
+    def patch(self, base_revision, ops):
+        since = self.ops_since(base_revision)
+        if since is None:
+            return {'status': 'stale', 'revision': self.revision, 'doc': self.doc}
+        conflicts = find_conflicts(since, ops, self.doc)
+        if conflicts:
+            return {'status': 'conflict', 'revision': self.revision, 'ops': since, 'conflicts': conflicts}
+        if ops:
+            self.doc = apply_ops(self.doc, ops)
+            self.revision += 1
+            self.log.append((self.revision, ops))
+        return {'status': 'ok', 'revision': self.revision, 'ops': since}
+
+
+# --- Client side ---
+def rebase(base_revision, base_view, view, send, held_paths=(), max_attempts=3):
+    # Sends the local changes (view vs. base_view) through `send(base_revision, ops)` (-> DeltaDocument.patch
+    # style dict), folding in other writers' changes. Changes under `held_paths` (unresolved conflicts) are
+    # not sent. Returns {'revision', 'base' (server view), 'local' (server view + held/conflicting local
+    # changes), 'conflicts': [{'path', 'mine', 'theirs'}], 'sent': op count, 'remote': other writers' op count}.
+    local_ops = diff(base_view, view)
+    held = list(held_paths)
+    conflicts, remote = [], 0
+    for _ in range(max_attempts):
+        mine = [op for op in local_ops if not any(paths_overlap(op['path'], h) for h in held)]
+        result = send(base_revision, mine)
+        if result['status'] == 'ok':
+            remote += len(result['ops'])
+            base_view = apply_ops(apply_ops(base_view, result['ops']), mine)
+            kept = [op for op in local_ops if any(paths_overlap(op['path'], h) for h in held)]
+            return {'revision': result['revision'], 'base': base_view, 'local': apply_ops(base_view, kept),
+                    'conflicts': conflicts, 'sent': len(mine), 'remote': remote}
+        theirs = result['doc'] if result['status'] == 'stale' else apply_ops(base_view, result['ops'])
+        theirs_ops = diff(base_view, theirs)
+        remote += len(theirs_ops)
+        for conflict in find_conflicts(theirs_ops, mine, theirs):
+            conflicts.append(dict(conflict, mine=get_path(view, conflict['path'])))
+            held.append(conflict['path'])
+        base_revision, base_view = result['revision'], theirs
+    raise RuntimeError("sync kept conflicting with concurrent writes; try again")
@@ -0,0 +1,59 @@
+# Kentep League Manager - lightweight timing hooks for the diagnostics panel
+import contextlib
+import json
+import time
+
+from kentep_core.state import REVISION_KEY, json_default
+
+SIZE_CACHE_KEY = 'snapshot_size_cache'
+
+
+class Timings:
+    # Per-session section timings. A section costs two perf_counter() calls and a dict update,
+    # so the hooks stay in place whether or not the panel is shown.
+    def __init__(self):
+        self.runs = 0
+        self.stats = {}      # name -> {'calls', 'last', 'total', 'max'}
+        self.current = {}    # name -> seconds spent in the running script run
+
+    def begin_run(self):
+        self.runs += 1
+        self.current = {}
+
+    def record(self, name, seconds):
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = {'calls': 0, 'last': 0.0, 'total': 0.0, 'max': 0.0}
+        stat['calls'] += 1
+        stat['last'] = seconds
+        stat['total'] += seconds
+        if seconds > stat['max']: stat['max'] = seconds
+        self.current[name] = self.current.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def section(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def rows(self):
+        # Sections of the current run first (biggest first), then everything seen earlier.
+        names = sorted(self.stats, key=lambda n: (n not in self.current, -self.current.get(n, 0.0), -self.stats[n]['total']))
+        return [{'section': n, 'run_ms': self.current.get(n, 0.0) * 1000, 'last_ms': self.stats[n]['last'] * 1000,
+                 'avg_ms': self.stats[n]['total'] / self.stats[n]['calls'] * 1000, 'max_ms': self.stats[n]['max'] * 1000,
+                 'calls': self.stats[n]['calls']} for n in names]
+
+    def reset(self):
+        self.stats, self.current = {}, {}
+
+
+def snapshot_size(state, build_snapshot):
+    # Serialized size in bytes, computed once per state revision.
+    revision = state.get(REVISION_KEY, 0)
+    cached_revision, size = state.get(SIZE_CACHE_KEY) or (None, None)
+    if cached_revision != revision:
+        size = len(json.dumps(build_snapshot(), default=json_default).encode('utf-8'))
+        state[SIZE_CACHE_KEY] = (revision, size)
+    return size
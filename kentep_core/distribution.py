@@ -0,0 +1,201 @@
+# Kentep League Manager - balanced team distribution
+import time
+
+import numpy as np
+
+from kentep_core.players import POSITIONS, UNKNOWN_POSITION, DEFAULT_RATING
+
+DEFAULT_TIME_BUDGET = 0.5
+CANDIDATE_SAMPLE_SIZE = 256
+
+
+def _resolve_pairs(pairs, index_by_name):
+    resolved, unknown = [], []
+    for left, right in pairs:
+        i, j = index_by_name.get(left.casefold()), index_by_name.get(right.casefold())
+        if i is None or j is None:
+            unknown.extend(n for n, idx in ((left, i), (right, j)) if idx is None)
+        elif i != j:
+            resolved.append((i, j))
+    return resolved, unknown
+
+
+def _adjacency(pairs, n):
+    adj = [[] for _ in range(n)]
+    for i, j in pairs:
+        adj[i].append(j); adj[j].append(i)
+    return [np.array(a, dtype=np.int64) for a in adj]
+
+
+class _Problem:
+    def __init__(self, ratings, positions, num_teams, together, apart, position_weight, constraint_weight):
+        self.n = len(ratings)
+        self.k = num_teams
+        self.ratings = ratings
+        self.positions = positions
+        self.num_positions = int(positions.max()) + 1 if self.n else 1
+        self.together = _adjacency(together, self.n)
+        self.apart = _adjacency(apart, self.n)
+        self.together_pairs = np.array(together, dtype=np.int64).reshape(-1, 2)
+        self.apart_pairs = np.array(apart, dtype=np.int64).reshape(-1, 2)
+        self.constrained = np.array([len(t) + len(a) > 0 for t, a in zip(self.together, self.apart)], dtype=bool)
+        self.constrained_idx = np.flatnonzero(self.constrained)
+        # Every constraint in both directions: (player, partner, is_together).
+        both = np.concatenate([self.together_pairs, self.apart_pairs])
+        kinds = np.concatenate([np.ones(len(self.together_pairs), dtype=bool), np.zeros(len(self.apart_pairs), dtype=bool)])
+        self.edge_from = np.concatenate([both[:, 0], both[:, 1]])
+        self.edge_to = np.concatenate([both[:, 1], both[:, 0]])
+        self.edge_together = np.concatenate([kinds, kinds])
+        self._slot = np.full(self.n, -1, dtype=np.int64)
+        self.has_constraints = bool(self.constrained.any())
+        self.position_weight = position_weight
+        self.constraint_weight = constraint_weight
+
+    def totals(self, team):
+        sums = np.bincount(team, weights=self.ratings, minlength=self.k)
+        counts = np.zeros((self.k, self.num_positions))
+        np.add.at(counts, (team, self.positions), 1)
+        return sums, counts
+
+    def violations(self, team):
+        t, a = self.together_pairs, self.apart_pairs
+        return int(np.count_nonzero(team[t[:, 0]] != team[t[:, 1]]) + np.count_nonzero(team[a[:, 0]] == team[a[:, 1]]))
+
+    def objective(self, team):
+        sums, counts = self.totals(team)
+        rating_term = float(((sums - sums.mean()) ** 2).sum())
+        position_term = float(((counts - counts.mean(axis=0)) ** 2).sum())
+        return rating_term + self.position_weight * position_term + self.constraint_weight * self.violations(team)
+
+    def constraint_delta(self, team, i, js):
+        a, b = team[i], team[js]
+        delta = np.zeros(len(js))
+        for partners, violated in ((self.together[i], np.not_equal), (self.apart[i], np.equal)):
+            if not len(partners): continue
+            before = violated(a, team[partners]).sum()
+            after = violated(b[:, None], team[partners][None, :])
+            # A partner that is itself the swap candidate ends up in team a, not in its old team.
+            is_partner = js[:, None] == partners[None, :]
+            after = np.where(is_partner, violated(b, a)[:, None], after).sum(axis=1)
+            delta += after - before
+        # Constraints of the candidates themselves (the pair with i was counted above).
+        self._slot[js] = np.arange(len(js))
+        slots = self._slot[self.edge_from]
+        edges = (slots >= 0) & (self.edge_to != i)
+        if edges.any():
+            partner_team = team[self.edge_to[edges]]
+            together = self.edge_together[edges]
+            before = (team[self.edge_from[edges]] != partner_team) == together
+            after = (a != partner_team) == together
+            np.add.at(delta, slots[edges], after.astype(np.int64) - before)
+        self._slot[js] = -1
+        return delta
+
+
+def _snake_start(problem, rng):
+    # Snake draft within each position group (strongest first), so sizes and position counts differ by at most one.
+    n, k = problem.n, problem.k
+    order = np.lexsort((rng.random(n), -problem.ratings, problem.positions))
+    round_no, pick = np.divmod(np.arange(n), k)
+    slot = np.where(round_no % 2 == 0, pick, k - 1 - pick)
+    team = np.empty(n, dtype=np.int64)
+    team[order] = rng.permutation(k)[slot]
+    return team
+
+
+def _local_search(problem, team, rng, deadline, max_stall):
+    n = problem.n
+    sums, counts = problem.totals(team)
+    pw, cw = problem.position_weight, problem.constraint_weight
+    everyone = np.arange(n)
+    iterations = stall = 0
+    while stall < max_stall and time.perf_counter() < deadline:
+        iterations += 1
+        # Constrained players are rare in big pools, so give them half of the picks.
+        if problem.has_constraints and iterations % 2:
+            i = int(problem.constrained_idx[rng.integers(len(problem.constrained_idx))])
+        else:
+            i = int(rng.integers(n))
+        a = team[i]
+        js = np.unique(rng.integers(n, size=CANDIDATE_SAMPLE_SIZE)) if n > CANDIDATE_SAMPLE_SIZE else everyone
+        js = js[team[js] != a]
+        if not len(js):
+            stall += 1; continue
+        b = team[js]
+        d = problem.ratings[js] - problem.ratings[i]
+        delta = 2 * d * (sums[a] - sums[b]) + 2 * d * d
+        pi, pj = problem.positions[i], problem.positions[js]
+        delta_pos = 2 * (counts[a, pj] - counts[a, pi] + 1) + 2 * (counts[b, pi] - counts[b, pj] + 1)
+        delta = delta + pw * np.where(pj == pi, 0.0, delta_pos)
+        if problem.has_constraints:
+            delta = delta + cw * problem.constraint_delta(team, i, js)
+        best = int(np.argmin(delta))
+        if delta[best] >= -1e-9:
+            stall += 1; continue
+        j, bj = int(js[best]), int(b[best])
+        team[i], team[j] = bj, a
+        sums[a] += d[best]; sums[bj] -= d[best]
+        counts[a, pi] -= 1; counts[a, pj[best]] += 1; counts[bj, pj[best]] -= 1; counts[bj, pi] += 1
+        stall = 0
+    return iterations
+
+
+def distribute_balanced(players, num_teams, together=(), apart=(), time_budget=DEFAULT_TIME_BUDGET, seed=None,
+                        restarts=3, position_weight=None, constraint_weight=None):
+    # players: dicts with 'name' and optional 'rating'/'position'. Returns (team index per player, report).
+    # together/apart: (name, name) pairs, matched case-insensitively. Team sizes always differ by at most one.
+    started = time.perf_counter()
+    n = len(players)
+    if num_teams < 1:
+        raise ValueError("num_teams must be at least 1")
+    report = {'iterations': 0, 'restarts': 0, 'unknown_constraint_names': []}
+    if n == 0:
+        report.update(objective=0.0, violations=0, team_totals=[0.0] * num_teams, rating_spread=0.0, elapsed=0.0)
+        return [], report
+
+    ratings = np.array([DEFAULT_RATING if p.get('rating') is None else float(p['rating']) for p in players])
+    position_codes = {pos: idx for idx, pos in enumerate(POSITIONS + (UNKNOWN_POSITION,))}
+    positions = np.array([position_codes.get(p.get('position') or UNKNOWN_POSITION, position_codes[UNKNOWN_POSITION]) for p in players])
+    index_by_name = {}
+    for idx, p in enumerate(players):
+        index_by_name.setdefault(p['name'].casefold(), idx)
+    together_idx, unknown_t = _resolve_pairs(together, index_by_name)
+    apart_idx, unknown_a = _resolve_pairs(apart, index_by_name)
+    report['unknown_constraint_names'] = sorted(set(unknown_t + unknown_a))
+
+    # One rating point of imbalance should outweigh a stray position; a broken constraint outweighs both.
+    if position_weight is None:
+        position_weight = max(1.0, float(ratings.std()) ** 2)
+    if constraint_weight is None:
+        constraint_weight = 10.0 * (float(ratings.max()) ** 2 + position_weight) * max(1, n // num_teams)
+    problem = _Problem(ratings, positions, num_teams, together_idx, apart_idx, position_weight, constraint_weight)
+
+    rng = np.random.default_rng(seed)
+    best_team, best_objective = None, np.inf
+    deadline = started + time_budget
+    # Each restart runs until it stops improving; later restarts only use time the earlier ones left over.
+    for _ in range(max(1, restarts)):
+        team = _snake_start(problem, rng)
+        if num_teams > 1:
+            report['iterations'] += _local_search(problem, team, rng, deadline, max_stall=max(200, 2 * n))
+        report['restarts'] += 1
+        objective = problem.objective(team)
+        if objective < best_objective:
+            best_team, best_objective = team.copy(), objective
+        if time.perf_counter() >= deadline or best_objective == 0:
+            break
+
+    sums, _ = problem.totals(best_team)
+    report.update(
+        objective=best_objective, violations=problem.violations(best_team), team_totals=sums.tolist(),
+        rating_spread=float(sums.max() - sums.min()), elapsed=time.perf_counter() - started
+    )
+    return best_team.tolist(), report
+
+
+def assign_goalkeepers(goalkeepers, team_totals):
+    # One keeper per team, as before: the best keeper goes to the weakest outfield side.
+    ratings = [DEFAULT_RATING if gk.get('rating') is None else gk['rating'] for gk in goalkeepers]
+    keeper_order = sorted(range(len(goalkeepers)), key=lambda idx: -ratings[idx])
+    team_order = sorted(range(len(team_totals)), key=lambda t: team_totals[t])
+    return [(team_idx, goalkeepers[gk_idx]) for team_idx, gk_idx in zip(team_order, keeper_order)]
@@ -0,0 +1,65 @@
+# Kentep League Manager - event settings and building a whole event outside the app
+import datetime
+import random
+
+from kentep_core.importer import format_pool_line
+from kentep_core.players import parse_constraints
+from kentep_core.teams import form_teams
+
+DEFAULT_EVENT_LEAD_DAYS = 7
+EVENT_SETTING_DEFAULTS = {
+    'event_title': "MINISOCCER EVENT",
+    'event_time_start': datetime.time(17, 0), 'event_time_end': datetime.time(19, 0),
+    'event_place': "Local Pitch", 'event_publisher': "Organizer", 'event_organizer': "You!",
+    'kick_off_time': datetime.time(17, 15),
+    'price_player': 50000.0, 'price_gk': 25000.0,
+    'num_teams': 2, 'game_duration': 10, 'num_pitches': 1,
+    'min_rest_minutes': 0, 'changeover_minutes': 0, 'double_round_robin': False,
+}
+
+
+def new_event_id(rng=random):
+    # Assigned once when an event is created and carried in its snapshot: renaming or moving the event
+    # keeps its history (stored row, season results, attendance) attached.
+    return f"evt_{rng.getrandbits(48):012x}"
+
+
+def default_event_settings(today=None):
+    settings = dict(EVENT_SETTING_DEFAULTS, event_id=new_event_id())
+    settings['event_date'] = (today or datetime.date.today()) + datetime.timedelta(days=DEFAULT_EVENT_LEAD_DAYS)
+    return settings
+
+
+def coerce_event_settings(values, today=None):
+    # Defaults plus `values`, with ISO strings (JSON specs, stored snapshots) turned into dates, times and numbers.
+    settings = default_event_settings(today)
+    for key, value in values.items():
+        if key not in settings or value is None: continue
+        default = settings[key]
+        if isinstance(default, datetime.date) and isinstance(value, str):
+            value = datetime.date.fromisoformat(value)
+        elif isinstance(default, datetime.time) and isinstance(value, str):
+            value = datetime.time.fromisoformat(value)
+        elif isinstance(default, bool):
+            value = bool(value)
+        elif isinstance(default, (int, float)):
+            value = type(default)(value)
+        settings[key] = value
+    for key in ('num_teams', 'game_duration', 'num_pitches'):
+        if settings[key] < 1: raise ValueError(f"{key} must be at least 1, got {settings[key]}")
+    return settings
+
+
+def build_event(settings, outfield, goalkeepers, balance=True, rules_text='', seed=None, time_budget=None, rng=None):
+    # outfield/goalkeepers: parse_player_entry() dicts. Returns (snapshot in the app's persisted format, report).
+    together, apart, errors = parse_constraints(rules_text)
+    teams, report = form_teams(outfield, goalkeepers, settings['num_teams'], balance, together, apart, seed=seed,
+                               time_budget=time_budget, rng=rng)
+    if report is not None:
+        report['constraint_errors'] = errors
+    snapshot = dict(
+        settings, teams_data=teams, players_distributed=True, form_team_constraints=rules_text or "",
+        form_global_outfield_players="\n".join(map(format_pool_line, outfield)),
+        form_global_goalkeepers="\n".join(map(format_pool_line, goalkeepers)),
+    )
+    return snapshot, report
@@ -0,0 +1,185 @@
+# Kentep League Manager - fixture scheduling
+import collections
+import datetime
+from dataclasses import dataclass, field
+
+BYE = "BYE"
+LOOKAHEAD_PER_PITCH = 4
+MAX_PITCHES = 20
+MIN_GAME_DURATION = 5
+
+
+@dataclass(slots=True)
+class Match:
+    number: int
+    round: int
+    leg: int
+    home_id: str
+    away_id: str
+    pitch: int = 0
+    start: datetime.datetime | None = None
+    end: datetime.datetime | None = None
+
+    @property
+    def team_ids(self):
+        return (self.home_id, self.away_id)
+
+
+@dataclass(slots=True)
+class Schedule:
+    matches: list = field(default_factory=list)
+    pitches: int = 1
+    game_duration: int = 0
+    kick_off: datetime.datetime | None = None
+    window_start: datetime.datetime | None = None
+    window_end: datetime.datetime | None = None
+    idle_slots: int = 0
+
+    @property
+    def end(self):
+        return max((m.end for m in self.matches), default=None)
+
+    @property
+    def overflow(self):
+        # Games that would still be running after the event window closes.
+        if self.window_end is None:
+            return []
+        return [m for m in self.matches if m.end > self.window_end]
+
+    @property
+    def kick_off_outside(self):
+        return self.kick_off is not None and ((self.window_start is not None and self.kick_off < self.window_start)
+                                              or (self.window_end is not None and self.kick_off >= self.window_end))
+
+    @property
+    def error(self):
+        # Why this schedule does not fit the event window, or None when it does.
+        if self.kick_off_outside:
+            window = f"{self.window_start.strftime('%H.%M') if self.window_start else '?'}-{self.window_end.strftime('%H.%M') if self.window_end else '?'}"
+            return f"Kick off {self.kick_off.strftime('%H.%M')} is outside the event time ({window})."
+        if self.overflow:
+            return (f"{len(self.overflow)} game(s) run past the end time ({self.window_end.strftime('%H.%M')}); "
+                    f"last game ends {self.end.strftime('%H.%M')}.")
+        return None
+
+
+def round_robin_pairings(team_ids, double_round_robin=False):
+    # Circle method, one list of (home, away) per round; the first team alternates home/away
+    # on even team counts. The second leg replays every round with sides swapped.
+    if len(team_ids) < 2:
+        return []
+    ids = list(team_ids)
+    first_team_id = ids[0]
+    is_odd_teams = len(ids) % 2 != 0
+    if is_odd_teams: ids.append(BYE)
+    n = len(ids)
+    rounds = []
+    for r in range(n - 1):
+        pairs = []
+        for i in range(n // 2):
+            home, away = ids[i], ids[n - 1 - i]
+            if home == BYE or away == BYE: continue
+            if home == first_team_id and r % 2 != 0 and not is_odd_teams:
+                home, away = away, home
+            pairs.append((home, away))
+        rounds.append(pairs)
+        if n > 2:
+            ids.insert(1, ids.pop())
+    if double_round_robin:
+        rounds += [[(away, home) for home, away in pairs] for pairs in rounds]
+    return rounds
+
+
+def schedule_fixtures(team_ids, kick_off, game_duration, pitches=1, min_rest_minutes=0, changeover_minutes=0,
+                      double_round_robin=False, window_start=None, window_end=None):
+    # kick_off/window_start/window_end are datetimes. Games are placed in time slots of game_duration + changeover,
+    # up to `pitches` at a time, in round order; a team never plays twice in a slot and gets at least
+    # min_rest_minutes between the end of one game and the kick-off of the next.
+    #
+    # The placement is greedy: each slot takes the first games within the lookahead whose teams are free and
+    # never holds one back to fill a later slot better. With a rest period that spans several slots this can
+    # leave pitches idle that an exact schedule would use. Example: 8 teams, 3 pitches, 10-minute games and
+    # 15 minutes of rest need 23 slots for 28 games, so 41 of the 69 pitch-slots are idle and 9 slots are
+    # empty. The rest rule alone allows 19 slots. `idle_slots` counts the empty slots.
+    # A zero-length slot would never move the clock past a rest period: reject it instead of looping.
+    if game_duration <= 0:
+        raise ValueError(f"game duration must be at least 1 minute, got {game_duration}")
+    if changeover_minutes < 0 or min_rest_minutes < 0:
+        raise ValueError("changeover and rest minutes cannot be negative")
+    pitches = max(1, int(pitches))
+    schedule = Schedule(pitches=pitches, game_duration=game_duration, kick_off=kick_off, window_start=window_start, window_end=window_end)
+    rounds = round_robin_pairings(team_ids, double_round_robin)
+    per_leg = len(rounds) // 2 if double_round_robin else len(rounds)
+    pending = collections.deque(
+        (r, r // per_leg + 1 if per_leg else 1, home, away) for r, pairs in enumerate(rounds) for home, away in pairs
+    )
+    slot_length = datetime.timedelta(minutes=game_duration + changeover_minutes)
+    duration = datetime.timedelta(minutes=game_duration)
+    rest = datetime.timedelta(minutes=min_rest_minutes)
+    available_from = {}
+    lookahead = LOOKAHEAD_PER_PITCH * pitches
+    slot_start = kick_off
+    while pending:
+        busy = set()
+        picked = []
+        # Only look a few games ahead so a big league stays linear in the number of games.
+        for idx, (r, leg, home, away) in enumerate(pending):
+            if idx >= lookahead or len(picked) == pitches: break
+            if home in busy or away in busy: continue
+            if available_from.get(home, slot_start) > slot_start or available_from.get(away, slot_start) > slot_start: continue
+            busy.update((home, away))
+            picked.append(idx)
+        if not picked:
+            schedule.idle_slots += 1
+        for pitch, idx in enumerate(picked):
+            r, leg, home, away = pending[idx - pitch]
+            del pending[idx - pitch]
+            match = Match(len(schedule.matches) + 1, r + 1, leg, home, away, pitch + 1, slot_start, slot_start + duration)
+            available_from[home] = available_from[away] = match.end + rest
+            schedule.matches.append(match)
+        slot_start += slot_length
+    return schedule
+
+
+def schedule_event_fixtures(team_ids, event_date, kick_off_time, event_time_start, event_time_end, game_duration,
+                            pitches=1, min_rest_minutes=0, changeover_minutes=0, double_round_robin=False):
+    # An end time before the start time means the event runs past midnight; a kick-off before the start
+    # time is then taken as after midnight as well.
+    window_start = datetime.datetime.combine(event_date, event_time_start)
+    kick_off = datetime.datetime.combine(event_date, kick_off_time)
+    window_end = datetime.datetime.combine(event_date, event_time_end)
+    if event_time_end <= event_time_start:
+        window_end += datetime.timedelta(days=1)
+        if kick_off_time < event_time_start: kick_off += datetime.timedelta(days=1)
+    return schedule_fixtures(list(team_ids), kick_off, game_duration, pitches=pitches, min_rest_minutes=min_rest_minutes, changeover_minutes=changeover_minutes,
+                             double_round_robin=double_round_robin, window_start=window_start, window_end=window_end)
+
+
+def schedule_fixes(team_ids, event_date, kick_off_time, event_time_start, event_time_end, game_duration,
+                   pitches=1, min_rest_minutes=0, changeover_minutes=0, double_round_robin=False):
+    # Ways to make an overrunning schedule fit its window, each on its own: {'kick_off_time': event start}
+    # when the kick-off is outside the window, else the longest shorter game and/or the fewest extra pitches
+    # that fit (absent when none does). Empty when the schedule already fits.
+    def fits(duration, count):
+        return schedule_event_fixtures(team_ids, event_date, kick_off_time, event_time_start, event_time_end, duration,
+                                       count, min_rest_minutes, changeover_minutes, double_round_robin).error is None
+    schedule = schedule_event_fixtures(team_ids, event_date, kick_off_time, event_time_start, event_time_end, game_duration,
+                                       pitches, min_rest_minutes, changeover_minutes, double_round_robin)
+    if schedule.error is None:
+        return {}
+    if schedule.kick_off_outside:
+        return {'kick_off_time': event_time_start}
+    fixes = {}
+    duration = next((d for d in range(game_duration - 1, MIN_GAME_DURATION - 1, -1) if fits(d, pitches)), None)
+    if duration is not None: fixes['game_duration'] = duration
+    count = next((n for n in range(pitches + 1, MAX_PITCHES + 1) if fits(game_duration, n)), None)
+    if count is not None: fixes['num_pitches'] = count
+    return fixes
+
+
+def format_fixture_lines(schedule, display_names):
+    lines = []
+    for m in schedule.matches:
+        pitch = f" [L{m.pitch}]" if schedule.pitches > 1 else ""
+        lines.append(f"{m.number:02d}. {m.start.strftime('%H.%M')}{pitch} (H) {display_names.get(m.home_id, m.home_id)} vs {display_names.get(m.away_id, m.away_id)} (A)")
+    return lines
@@ -0,0 +1,226 @@
+# Kentep League Manager - bulk player import (pasted lists, CSV, XLSX, WhatsApp chat exports)
+import codecs
+import csv
+import functools
+import itertools
+import re
+
+from kentep_core.players import POSITIONS, parse_player_entry
+from kentep_core.registry import normalize_name
+
+LINE_CACHE_SIZE = 4096
+CSV_SNIFF_BYTES = 4096
+CHAT_SNIFF_LINES = 20
+
+NAME_HEADERS = {'name', 'nama', 'player', 'pemain', 'nama pemain'}
+GK_HEADERS = {'gk', 'kiper', 'keeper', 'goalkeeper'}
+POSITION_HEADERS = {'posisi', 'position', 'pos', 'role'}
+RATING_HEADERS = {'rating', 'skill', 'nilai'}
+_TRUE_VALUES = {'1', 'y', 'yes', 'ya', 'true', 'x', 'v', 'gk', 'kiper'}
+
+_WHATSAPP_MESSAGE = re.compile(
+    r'^\[?(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}),?\s+(\d{1,2}[.:]\d{2}(?:[.:]\d{2})?(?:\s?[APap][Mm])?)\]?\s*(?:-\s*)?([^:]+?):\s?(.*)$'
+)
+_LIST_ENTRY = re.compile(r'^\s*(\d+)\s*[.)]\s*(.*)$')
+_SIGN_UP = re.compile(r'(?:^|\s)([+-])\s?1\b')
+_GK_WORDS = re.compile(r'\b(gk|kiper|keeper)\b', re.IGNORECASE)
+# Chatter around a "+1" that is not a name ("ikut ya +1" is the sender signing up).
+_FILLER_WORDS = re.compile(r'\b(ikut|join|hadir|ya|yak|saya|aku|gw|gue|sy|dong|bro|min|om|siap|otw)\b', re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=LINE_CACHE_SIZE)
+def parse_list_line(line):
+    # "1. Budi", "2) Andi" or just "Budi" -> name ('' for blank lines). Cached per line, so editing
+    # one line of a long pasted list only re-parses that line.
+    line = line.strip()
+    if not line: return ''
+    if '.' in line and line.split('.')[0].strip().isdigit():
+        return '.'.join(line.split('.')[1:]).strip()
+    if ')' in line and line.split(')')[0].strip().isdigit():
+        return ')'.join(line.split(')')[1:]).strip()
+    return line
+
+
+def parse_player_list(raw_text):
+    return [name for name in map(parse_list_line, (raw_text or '').strip().split('\n')) if name]
+
+
+def _row(line, name, is_gk=False, rating=None, position=None, error=None):
+    return {'line': line, 'name': name, 'is_gk': is_gk, 'rating': rating, 'position': position, 'error': error}
+
+
+def _entry_row(line_no, text, is_gk=False, rating=None, position=None):
+    # Inline "(8) [MF]" markers still work inside CSV/XLSX/chat cells; explicit columns win.
+    entry = parse_player_entry(text)
+    position = position or entry['position']
+    if position == 'GK': is_gk = True
+    if not entry['name']:
+        return _row(line_no, '', error="missing name")
+    return _row(line_no, entry['name'], is_gk, rating if rating is not None else entry['rating'], position)
+
+
+# --- Tables (CSV / XLSX) ---
+def _header_map(cells):
+    headers = [normalize_name(str(c or '')) for c in cells]
+    if not NAME_HEADERS & set(headers):
+        return None
+    mapping = {}
+    for idx, header in enumerate(headers):
+        for field, names in (('name', NAME_HEADERS), ('gk', GK_HEADERS), ('position', POSITION_HEADERS), ('rating', RATING_HEADERS)):
+            if header in names: mapping.setdefault(field, idx)
+    return mapping
+
+
+def _parse_rating(value):
+    if value is None or str(value).strip() == '':
+        return None
+    return float(str(value).strip().replace(',', '.'))
+
+
+def iter_table_rows(rows):
+    # rows: iterable of cell sequences. With a header row (Nama/Name/...) the GK/Posisi/Rating columns are
+    # picked up by name; without one the first column is the name and an optional second is rating or position.
+    mapping = None
+    for line_no, cells in enumerate(rows, start=1):
+        cells = ['' if c is None else str(c).strip() for c in cells]
+        if not any(cells): continue
+        if line_no == 1:
+            mapping = _header_map(cells)
+            if mapping is not None: continue
+        get = lambda field: cells[mapping[field]] if mapping and field in mapping and mapping[field] < len(cells) else ''
+        name = get('name') if mapping else cells[0]
+        if not name:
+            yield _row(line_no, '', error="missing name"); continue
+        try:
+            if mapping:
+                rating, position = _parse_rating(get('rating')), get('position').upper() or None
+                is_gk = get('gk').casefold() in _TRUE_VALUES
+            else:
+                extra = cells[1] if len(cells) > 1 else ''
+                position = extra.upper() if extra.upper() in POSITIONS else None
+                rating = None if position or not extra else _parse_rating(extra)
+                is_gk = False
+        except ValueError:
+            yield _row(line_no, name, error="rating is not a number"); continue
+        if position and position not in POSITIONS:
+            yield _row(line_no, name, error=f"unknown position '{position}'"); continue
+        yield _entry_row(line_no, name, is_gk, rating, position)
+
+
+def iter_text_lines(stream, encoding='utf-8-sig'):
+    # Decodes an uploaded binary file line by line instead of reading it into one string.
+    return codecs.iterdecode(stream, encoding, errors='replace')
+
+
+def iter_csv_rows(stream):
+    head = stream.read(CSV_SNIFF_BYTES).decode('utf-8-sig', errors='replace')
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(head, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    return iter_table_rows(csv.reader(iter_text_lines(stream), dialect))
+
+
+def iter_xlsx_rows(stream):
+    try:
+        import openpyxl
+    except ImportError as exc:
+        raise ImportError("Reading .xlsx needs openpyxl (pip install openpyxl)") from exc
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from iter_table_rows(workbook.active.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+# --- WhatsApp chat export ---
+def iter_whatsapp_signups(lines):
+    # Reads a WhatsApp "Export chat" text. Sign-ups are "+1" from the sender, "Budi +1" / "+1 Budi" for
+    # someone else, "-1" cancels, and "+1 gk" puts a keeper on the list. A message that restates the
+    # numbered list ("1. Budi\n2. Andi ...") replaces the list so far, like it does in the group.
+    # Yields the final list in order, after the whole export has been read.
+    signed_up = {}  # normalized -> row
+    sender, list_rows = None, None
+
+    def close_list():
+        nonlocal list_rows
+        if list_rows:
+            signed_up.clear()
+            signed_up.update((normalize_name(r['name']), r) for r in list_rows)
+        list_rows = None
+
+    def sign_up(line_no, text, is_gk):
+        row = _entry_row(line_no, text, is_gk)
+        if row['error'] is None:
+            signed_up.setdefault(normalize_name(row['name']), row)
+
+    for line_no, line in enumerate(lines, start=1):
+        line = line.rstrip('\r\n')
+        message = _WHATSAPP_MESSAGE.match(line)
+        if message:
+            close_list()
+            sender, text = message.group(3).strip(), message.group(4)
+        elif sender is None:
+            continue  # export header or a line before the first message
+        else:
+            text = line  # continuation of a multi-line message
+        entry = _LIST_ENTRY.match(text)
+        if entry:
+            if list_rows is None: list_rows = []
+            name = entry.group(2).strip()
+            if name:
+                list_rows.append(_entry_row(line_no, _GK_WORDS.sub('', name).strip() or name, bool(_GK_WORDS.search(name))))
+            continue
+        vote = _SIGN_UP.search(text)
+        if not vote: continue
+        who = (text[:vote.start()] + ' ' + text[vote.end():]).strip()
+        is_gk = bool(_GK_WORDS.search(who))
+        who = _FILLER_WORDS.sub('', _GK_WORDS.sub('', who)).strip(' ,.:-!') or sender
+        if vote.group(1) == '+':
+            sign_up(line_no, who, is_gk)
+        else:
+            signed_up.pop(normalize_name(who), None)
+    close_list()
+    yield from signed_up.values()
+
+
+def iter_text_rows(lines):
+    # .txt uploads are either a WhatsApp export or a plain (optionally numbered) list; peek to tell which.
+    lines = iter(lines)
+    head = list(itertools.islice(lines, CHAT_SNIFF_LINES))
+    lines = itertools.chain(head, lines)
+    if any(_WHATSAPP_MESSAGE.match(line) for line in head):
+        yield from iter_whatsapp_signups(lines)
+        return
+    for line_no, line in enumerate(lines, start=1):
+        name = parse_list_line(line)
+        if name: yield _entry_row(line_no, name)
+
+
+# --- Pools ---
+def format_pool_line(row):
+    text = row['name']
+    if row['rating'] is not None: text += f" ({row['rating']:g})"
+    if row['position'] and row['position'] != 'GK': text += f" [{row['position']}]"
+    return text
+
+
+def split_into_pools(rows, existing_names=()):
+    # -> (outfield lines, goalkeeper lines, [(line, name, error)]). Names already in the pools or earlier
+    # in the file are reported instead of being added twice.
+    seen = {normalize_name(parse_player_entry(parse_list_line(n))['name']): None for n in existing_names}
+    outfield, goalkeepers, errors = [], [], []
+    for row in rows:
+        if row['error']:
+            errors.append((row['line'], row['name'], row['error'])); continue
+        key = normalize_name(row['name'])
+        if key in seen:
+            where = "already in the list" if seen[key] is None else f"duplicate of line {seen[key]}"
+            errors.append((row['line'], row['name'], where)); continue
+        seen[key] = row['line']
+        (goalkeepers if row['is_gk'] else outfield).append(format_pool_line(row))
+    return outfield, goalkeepers, errors
+
+
+IMPORTERS = {'csv': iter_csv_rows, 'xlsx': iter_xlsx_rows, 'txt': lambda stream: iter_text_rows(iter_text_lines(stream))}
@@ -0,0 +1,257 @@
+# Kentep League Manager - payment ledger
+import collections
+import datetime
+import re
+
+from kentep_core.registry import normalize_name
+
+PAYMENT = 'payment'
+REFUND = 'refund'
+ROLE_PLAYER = 'player'
+ROLE_GK = 'gk'
+EXACT_MATCH = 1.0       # exact name or canonical uid: booked without asking
+PREFIX_MATCH_SCORE = 0.95
+
+_AMOUNT = re.compile(r'(?:rp\.?|idr)?\s*(\d{1,3}(?:[.,]\d{3})+|\d+(?:[.,]\d+)?)\s*(rb|ribu|k|jt|juta)?\b', re.IGNORECASE)
+_WHATSAPP_PREFIX = re.compile(r'^\[?\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4},?\s+\d{1,2}[.:]\d{2}(?:[.:]\d{2})?(?:\s?[ap]m)?\]?\s*(?:-\s*)?')
+_NOISE_WORDS = {'transfer', 'trf', 'trsf', 'tf', 'bayar', 'byr', 'lunas', 'paid', 'dari', 'from', 'rp', 'idr', 'htm', 'sudah',
+                'udah', 'done', 'ok', 'ya', 'yg', 'ini', 'buat', 'untuk', 'gk', 'kiper', 'e', 'banking', 'mbanking', 'cr', 'db',
+                'bca', 'bni', 'bri', 'mandiri', 'ovo', 'gopay', 'dana', 'shopeepay', 'qris'}
+_MULTIPLIERS = {'rb': 1_000, 'ribu': 1_000, 'k': 1_000, 'jt': 1_000_000, 'juta': 1_000_000}
+
+
+def player_role(player):
+    return ROLE_GK if player.get('is_gk') else ROLE_PLAYER
+
+
+def amount_due(player, price_player, price_gk):
+    return float(price_gk if player.get('is_gk') else price_player)
+
+
+def _signed_amount(event):
+    return -event['amount'] if event['kind'] == REFUND else event['amount']
+
+
+class PaymentLedger:
+    # Append-only list of payment/refund events (the persisted part) plus a per-player balance
+    # that is updated as events are recorded.
+    def __init__(self, events=None):
+        self.events = events if events is not None else []
+        self.balances = collections.defaultdict(float)
+        for event in self.events:
+            self._apply(event)
+
+    def _apply(self, event):
+        self.balances[event['player_id']] += _signed_amount(event)
+
+    def record(self, player_id, amount, kind=PAYMENT, note='', source='manual', at=None):
+        event = {
+            'id': len(self.events) + 1, 'player_id': player_id, 'amount': float(amount), 'kind': kind,
+            'note': note, 'source': source, 'at': (at or datetime.datetime.now()).isoformat(timespec='seconds'),
+        }
+        self.events.append(event)
+        self._apply(event)
+        return event
+
+    def balance(self, player_id):
+        return self.balances.get(player_id, 0.0)
+
+
+class LedgerSummary:
+    # Collected/expected per team and per role. Built once per roster/price change, then
+    # kept current by apply() for every new ledger event.
+    def __init__(self, teams, price_player, price_gk, ledger):
+        self.ledger = ledger
+        self.players = {}
+        self.expected = {'team': collections.defaultdict(float), 'role': collections.defaultdict(float)}
+        self.collected = {'team': collections.defaultdict(float), 'role': collections.defaultdict(float)}
+        self.headcount = {'team': collections.Counter(), 'role': collections.Counter()}
+        self.paid_count = {'team': collections.Counter(), 'role': collections.Counter()}
+        self.expected_total = self.collected_total = 0.0
+        for team in teams:
+            for player in team['players']:
+                role, due = player_role(player), amount_due(player, price_player, price_gk)
+                self.players[player['id']] = (team['id'], role, due)
+                for axis, bucket in (('team', team['id']), ('role', role)):
+                    self.expected[axis][bucket] += due
+                    self.headcount[axis][bucket] += 1
+                self.expected_total += due
+                self._add(player['id'], ledger.balance(player['id']), was_paid=False)
+        self.applied = len(ledger.events)
+
+    def is_paid(self, player_id, balance=None):
+        info = self.players.get(player_id)
+        balance = self.ledger.balance(player_id) if balance is None else balance
+        return info is not None and balance >= info[2] and balance > 0
+
+    def outstanding(self, player_id):
+        info = self.players.get(player_id)
+        return max(0.0, info[2] - self.ledger.balance(player_id)) if info else 0.0
+
+    def _add(self, player_id, signed_amount, was_paid, balance=None):
+        info = self.players.get(player_id)
+        if info is None:
+            return
+        team_id, role, _ = info
+        now_paid = self.is_paid(player_id, balance)
+        for axis, bucket in (('team', team_id), ('role', role)):
+            self.collected[axis][bucket] += signed_amount
+            self.paid_count[axis][bucket] += int(now_paid) - int(was_paid)
+        self.collected_total += signed_amount
+
+    def apply(self, event, balance=None):
+        # Call after ledger.record(); the ledger balance already includes `event`. balance: the player's
+        # balance right after `event` when later events are already in the ledger too.
+        signed = _signed_amount(event)
+        after = self.ledger.balance(event['player_id']) if balance is None else balance
+        self._add(event['player_id'], signed, self.is_paid(event['player_id'], after - signed), after)
+        self.applied += 1
+
+    def catch_up(self):
+        # Events recorded without apply(): each is judged against the balance right after it, not the final one.
+        pending = self.ledger.events[self.applied:]
+        later, balances = collections.defaultdict(float), []
+        for event in reversed(pending):
+            balances.append(self.ledger.balance(event['player_id']) - later[event['player_id']])
+            later[event['player_id']] += _signed_amount(event)
+        for event, balance in zip(pending, reversed(balances)):
+            self.apply(event, balance)
+
+    def rows(self, axis):
+        return [
+            {'key': bucket, 'players': self.headcount[axis][bucket], 'paid': self.paid_count[axis][bucket],
+             'expected': self.expected[axis][bucket], 'collected': self.collected[axis][bucket],
+             'outstanding': max(0.0, self.expected[axis][bucket] - self.collected[axis][bucket])}
+            for bucket in self.headcount[axis]
+        ]
+
+
+def book_paid_flags(ledger, teams, price_player, price_gk):
+    # Events saved before the ledger existed only have paid flags: book those as full payments.
+    for team in teams:
+        for player in team['players']:
+            due = amount_due(player, price_player, price_gk)
+            if player.get('paid') and due > 0:
+                ledger.record(player['id'], due, note="paid flag", source='legacy')
+
+
+def book_payments(ledger, summary, players, entries, source):
+    # entries: (player_id, amount, kind, note); players: rosters.index_players() map. Keeps each player's
+    # paid flag in step with the ledger. Returns how many entries were recorded.
+    recorded = 0
+    for player_id, amount, kind, note in entries:
+        if player_id not in players or not amount or amount <= 0: continue
+        summary.apply(ledger.record(player_id, amount, kind=kind, note=note, source=source))
+        players[player_id][1]['paid'] = summary.is_paid(player_id)
+        recorded += 1
+    return recorded
+
+
+def outstanding_entries(summary, player_ids, note):
+    return [(pid, summary.outstanding(pid), PAYMENT, note) for pid in player_ids if summary.outstanding(pid) > 0]
+
+
+def import_entries(rows, summary, choices=None):
+    # iter_payment_matches() rows -> payment entries; a row without an amount settles the rest of the bill.
+    # Only exact matches are booked by default. choices: {row index: {'book': bool, 'player_id': id}} from
+    # the organizer, who has to tick every fuzzy match (a wrong payment can only be undone with a refund).
+    entries = []
+    for idx, row in enumerate(rows):
+        choice = (choices or {}).get(idx, {})
+        player_id = choice.get('player_id', row['player_id'])
+        if player_id and choice.get('book', row['score'] >= EXACT_MATCH):
+            entries.append((player_id, row['amount'] or summary.outstanding(player_id), PAYMENT, row['raw'][:80]))
+    return entries
+
+
+def event_finance(snapshot):
+    # Totals for a stored or freshly built event snapshot.
+    ledger = PaymentLedger(list(snapshot.get('payment_ledger') or []))
+    teams = snapshot.get('teams_data') or []
+    if not ledger.events:
+        book_paid_flags(ledger, teams, snapshot['price_player'], snapshot['price_gk'])
+    summary = LedgerSummary(teams, snapshot['price_player'], snapshot['price_gk'], ledger)
+    return {'players': len(summary.players), 'paid': sum(summary.paid_count['role'].values()), 'expected': summary.expected_total,
+            'collected': summary.collected_total, 'outstanding': max(0.0, summary.expected_total - summary.collected_total)}
+
+
+def parse_amount(text):
+    # "50.000", "50,000", "Rp 50rb", "50k", "1,5jt" -> float. Returns None when there is no amount.
+    best = None
+    for match in _AMOUNT.finditer(text):
+        digits, unit = match.group(1), (match.group(2) or '').lower()
+        if re.fullmatch(r'\d{1,3}(?:[.,]\d{3})+', digits):
+            value = float(re.sub(r'[.,]', '', digits))
+        else:
+            value = float(digits.replace(',', '.'))
+        value *= _MULTIPLIERS.get(unit, 1)
+        if best is None or value > best:
+            best = value
+    return best
+
+
+def parse_payment_line(line):
+    # One bank-statement or WhatsApp line -> (name guess, sender or None, amount or None).
+    text = _WHATSAPP_PREFIX.sub('', line.strip())
+    sender = None
+    if ':' in text:
+        head, tail = text.split(':', 1)
+        if head.strip() and len(head.split()) <= 5:
+            sender, text = head.strip(), tail
+    amount = parse_amount(text)
+    words = [w for w in re.split(r'[^\w]+', _AMOUNT.sub(' ', text)) if w and w.casefold() not in _NOISE_WORDS and not w.isdigit()]
+    return ' '.join(words).strip(), sender, amount
+
+
+def iter_payment_matches(lines, match_player):
+    # Streams over pasted lines; match_player(name) -> (player_id, score) or (None, 0).
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        name, sender, amount = parse_payment_line(line)
+        player_id, score, matched_name = None, 0.0, name or sender
+        # Whole text first, then the WhatsApp sender, then single words ("TRSF ... ANDI PRATAMA"); the best
+        # score wins, so a fuzzy hit on the text does not hide an exact one on the sender.
+        for candidate in [name, sender] + sorted(name.split(), key=len, reverse=True)[:4]:
+            if candidate:
+                candidate_id, candidate_score = match_player(candidate)
+                if candidate_id is not None and candidate_score > score:
+                    player_id, score, matched_name = candidate_id, candidate_score, candidate
+                    if score >= EXACT_MATCH: break
+        name = matched_name
+        yield {'line': line_no, 'raw': line.strip(), 'name': name, 'amount': amount, 'player_id': player_id,
+               'score': round(score, 2), 'error': None if player_id else "no matching player"}
+
+
+def roster_name_matcher(teams, registry):
+    # Exact normalized name or canonical uid first (score 1.0), then a first name plus optional word prefixes
+    # that only one player in the roster has ("Budi", "Budi S" -> "Budi Santoso"), then the registry's fuzzy index.
+    by_name, by_uid, by_first = {}, {}, collections.defaultdict(list)
+    for team in teams:
+        for player in team['players']:
+            normalized = normalize_name(player['name'])
+            by_name.setdefault(normalized, player['id'])
+            if normalized:
+                tokens = normalized.split()
+                by_first[tokens[0]].append((tokens, player['id']))
+            if player.get('player_uid'):
+                by_uid.setdefault(player['player_uid'], player['id'])
+
+    def match(name):
+        normalized = normalize_name(name)
+        if normalized in by_name:
+            return by_name[normalized], EXACT_MATCH
+        uid = registry.lookup(name)
+        if uid in by_uid:
+            return by_uid[uid], EXACT_MATCH
+        query = normalized.split()
+        if query:
+            prefixed = {pid for tokens, pid in by_first.get(query[0], ()) if len(tokens) >= len(query)
+                        and all(t.startswith(q) for q, t in zip(query[1:], tokens[1:]))}
+            if len(prefixed) == 1:
+                return prefixed.pop(), PREFIX_MATCH_SCORE
+        for uid, score in registry.similar(name):
+            if uid in by_uid:
+                return by_uid[uid], score
+        return None, 0.0
+    return match
@@ -0,0 +1,125 @@
+# Kentep League Manager - live match-day console: append-only match log, game clock and score
+#
+# The log is a persisted list that is only ever appended to; corrections are 'void' events:
+#
+#   {'id': 'a1b2c3d4', 'match': match_key, 'type': 'kickoff' | 'pause' | 'resume' | 'end' | 'goal' | 'yellow' | 'red' | 'void',
+#    'at': ISO time, 'team': team id, 'player': player uid, 'ref': id of the voided goal/card}
+#
+# Ids are random strings rather than list positions, so logs appended by two organizers at once merge
+# without renumbering (delta sync) and void events keep pointing at the right entry.
+import datetime
+import random
+from dataclasses import dataclass, field
+
+from kentep_core.season import match_key
+
+KICKOFF, PAUSE, RESUME, END = 'kickoff', 'pause', 'resume', 'end'
+GOAL, YELLOW, RED, VOID = 'goal', 'yellow', 'red', 'void'
+CARD_TYPES = (YELLOW, RED)
+NOT_STARTED, RUNNING, PAUSED, FINISHED = 'not_started', 'running', 'paused', 'finished'
+
+
+def log_event(match, kind, at=None, rng=random, **fields):
+    event = {'id': f"{rng.getrandbits(32):08x}", 'match': match, 'type': kind,
+             'at': (at or datetime.datetime.now()).isoformat(timespec='seconds')}
+    event.update({k: v for k, v in fields.items() if v is not None})
+    return event
+
+
+@dataclass(slots=True)
+class MatchState:
+    status: str = NOT_STARTED
+    started: datetime.datetime | None = None
+    paused_at: datetime.datetime | None = None
+    ended: datetime.datetime | None = None
+    paused_seconds: float = 0.0
+    goals: dict = field(default_factory=dict)      # team id -> goals
+    scorers: dict = field(default_factory=dict)    # player uid -> goals
+    events: list = field(default_factory=list)     # goals and cards still standing, in log order
+
+    def elapsed(self, now=None):
+        if self.started is None:
+            return 0.0
+        until = self.ended or self.paused_at or now or datetime.datetime.now()
+        return max(0.0, (until - self.started).total_seconds() - self.paused_seconds)
+
+    def remaining(self, duration_minutes, now=None):
+        return max(0.0, duration_minutes * 60 - self.elapsed(now))
+
+    def score(self, home_id, away_id):
+        return self.goals.get(home_id, 0), self.goals.get(away_id, 0)
+
+
+class MatchLog:
+    # Persisted events plus per-match state that is updated as events are appended (like PaymentLedger).
+    def __init__(self, events=None):
+        self.events = events if events is not None else []
+        self.matches = {}
+        self.by_id = {}
+        for event in self.events:
+            self._apply(event)
+
+    def match(self, key):
+        return self.matches.get(key) or MatchState()
+
+    def append(self, event):
+        self.events.append(event)
+        self._apply(event)
+        return event
+
+    def _apply(self, event):
+        self.by_id[event['id']] = event
+        state = self.matches.setdefault(event['match'], MatchState())
+        kind, at = event['type'], datetime.datetime.fromisoformat(event['at'])
+        if kind == KICKOFF and state.status == NOT_STARTED:
+            state.status, state.started = RUNNING, at
+        elif kind == PAUSE and state.status == RUNNING:
+            state.status, state.paused_at = PAUSED, at
+        elif kind == RESUME and state.status == PAUSED:
+            state.paused_seconds += (at - state.paused_at).total_seconds()
+            state.status, state.paused_at = RUNNING, None
+        elif kind == END and state.status in (RUNNING, PAUSED):
+            # Ending while paused: the clock stopped at the pause.
+            state.status, state.ended = FINISHED, state.paused_at or at
+        elif kind == GOAL:
+            state.goals[event['team']] = state.goals.get(event['team'], 0) + 1
+            if event.get('player'):
+                state.scorers[event['player']] = state.scorers.get(event['player'], 0) + 1
+            state.events.append(event)
+        elif kind in CARD_TYPES:
+            state.events.append(event)
+        elif kind == VOID:
+            target = self.by_id.get(event.get('ref'))
+            if target is None or target not in state.events: return
+            state.events.remove(target)
+            if target['type'] == GOAL:
+                state.goals[target['team']] -= 1
+                if target.get('player'):
+                    state.scorers[target['player']] -= 1
+                    if not state.scorers[target['player']]: del state.scorers[target['player']]
+
+
+def pitch_queue(matches, log, results):
+    # -> {pitch: match on the console}: the game running there, else the next one in schedule order
+    # that was neither played live nor had its result entered by hand.
+    live, upcoming = {}, {}
+    for m in matches:
+        status = log.match(match_key(m)).status
+        if status in (RUNNING, PAUSED):
+            live.setdefault(m.pitch, m)
+        elif status == NOT_STARTED and match_key(m) not in results:
+            upcoming.setdefault(m.pitch, m)
+    return {pitch: live.get(pitch) or upcoming[pitch] for pitch in sorted(set(live) | set(upcoming))}
+
+
+def final_scores(log, matches, keys):
+    # -> [(match, home goals, away goals, scorers)] for the finished games among `keys`: at the final whistle
+    # (or a correction afterwards) the live score becomes the match result.
+    by_key = {match_key(m): m for m in matches}
+    finished = []
+    for key in dict.fromkeys(keys):
+        state = log.match(key)
+        if state.status == FINISHED and key in by_key:
+            match = by_key[key]
+            finished.append((match, *state.score(match.home_id, match.away_id), dict(state.scorers)))
+    return finished
@@ -0,0 +1,239 @@
+# Kentep League Manager - typed event model and the compact, versioned snapshot format
+#
+# The app edits plain dicts (widgets and st.data_editor bind to them); everything that is stored or
+# sent goes through Event, which is smaller in memory and serializes to a compact record:
+#
+#   v1 (legacy)  the KEYS_TO_PERSIST dict itself: {'teams_data': [{'id', 'team_name_display', ..., 'players': [{...}]}], ...}
+#   v2           {'v': 2, 'event': {other keys}, 'teams': [[id, name, color, [player row, ...]], ...], 'payments': [[...], ...]}
+#                player row: [id, name, flags, rating, position, player_uid] with trailing nulls dropped
+#
+# pack()/unpack() add zlib on top for byte stores (sqlite); JSON stores (jsonbin) take the v2 dict as is.
+import collections
+import json
+import zlib
+from dataclasses import dataclass, field
+
+from kentep_core.event import EVENT_SETTING_DEFAULTS
+from kentep_core.ledger import amount_due
+from kentep_core.state import json_default
+from kentep_core.teams import new_player_id
+
+SCHEMA_VERSION = 2
+PACK_MAGIC = b'KT'
+FLAG_GK = 1
+FLAG_PAID = 2
+PAYMENT_KINDS = ('payment', 'refund')
+MODEL_KEYS = ('teams_data', 'payment_ledger')
+
+
+@dataclass(slots=True)
+class Player:
+    id: str
+    name: str
+    is_gk: bool = False
+    paid: bool = False
+    rating: float | None = None
+    position: str | None = None
+    player_uid: str | None = None
+
+    def to_row(self):
+        row = [self.id, self.name, FLAG_GK * self.is_gk | FLAG_PAID * self.paid, self.rating, self.position, self.player_uid]
+        while row[-1] is None: row.pop()
+        return row
+
+    @classmethod
+    def from_row(cls, row):
+        pid, name, flags, *rest = row
+        return cls(pid, name, bool(flags & FLAG_GK), bool(flags & FLAG_PAID), *rest)
+
+    def to_dict(self):
+        player = {'id': self.id, 'name': self.name, 'is_gk': self.is_gk, 'paid': self.paid}
+        if self.rating is not None or self.position is not None:
+            player.update(rating=self.rating, position=self.position)
+        if self.player_uid is not None:
+            player['player_uid'] = self.player_uid
+        return player
+
+
+@dataclass(slots=True)
+class Team:
+    id: str
+    name: str
+    color_hex: str
+    players: dict = field(default_factory=dict)  # player id -> Player, in roster order
+
+    def to_dict(self):
+        return {'id': self.id, 'team_name_display': self.name, 'team_color_hex': self.color_hex,
+                'players': [p.to_dict() for p in self.players.values()]}
+
+
+@dataclass(slots=True)
+class Payment:
+    id: int
+    player_id: str
+    amount: float
+    kind: str
+    note: str = ''
+    source: str = ''
+    at: str | None = None
+
+    def to_row(self):
+        return [self.id, self.player_id, self.amount, PAYMENT_KINDS.index(self.kind), self.note, self.source, self.at]
+
+    @classmethod
+    def from_row(cls, row):
+        pid, player_id, amount, kind, *rest = row
+        if not isinstance(kind, int) or not 0 <= kind < len(PAYMENT_KINDS):
+            raise ValueError(f"payment {pid}: unknown kind {kind!r}")
+        return cls(pid, player_id, amount, PAYMENT_KINDS[kind], *rest)
+
+    def to_dict(self):
+        return {'id': self.id, 'player_id': self.player_id, 'amount': self.amount, 'kind': self.kind,
+                'note': self.note, 'source': self.source, 'at': self.at}
+
+
+@dataclass(slots=True)
+class Event:
+    fields: dict                                  # every other persisted key (settings, pools, registry, results)
+    teams: dict = field(default_factory=dict)     # team id -> Team, in display order
+    payments: list = field(default_factory=list)
+    player_team: dict = field(default_factory=dict, repr=False)  # player id -> team id
+
+    def __post_init__(self):
+        self.player_team = {pid: t.id for t in self.teams.values() for pid in t.players}
+
+    # --- Lookups (O(1) through the index maps) ---
+    def player(self, player_id):
+        return self.teams[self.player_team[player_id]].players[player_id]
+
+    def team_of(self, player_id):
+        return self.teams[self.player_team[player_id]]
+
+    def add_player(self, team_id, player):
+        if player.id in self.player_team:
+            player.id = new_player_id(self.player_team)
+        self.teams[team_id].players[player.id] = player
+        self.player_team[player.id] = team_id
+        return player
+
+    def move_player(self, player_id, team_id):
+        source = self.teams[self.player_team[player_id]]
+        if source.id != team_id:
+            self.teams[team_id].players[player_id] = source.players.pop(player_id)
+            self.player_team[player_id] = team_id
+
+    def remove_player(self, player_id):
+        return self.teams[self.player_team.pop(player_id)].players.pop(player_id)
+
+    # --- Snapshot dicts (what the app keeps in session state) ---
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        # Duplicate player ids (older events could produce them) get a fresh id; the first one keeps it.
+        teams, seen, holders = {}, set(), collections.defaultdict(list)  # holders: stored id -> ids now in use
+        for t in snapshot.get('teams_data') or []:
+            team = teams[t['id']] = Team(t['id'], t.get('team_name_display'), t.get('team_color_hex'))
+            for p in t.get('players', []):
+                pid = p['id'] if p['id'] not in seen else new_player_id(seen)
+                seen.add(pid)
+                holders[p['id']].append(pid)
+                team.players[pid] = Player(pid, p['name'], bool(p.get('is_gk')), bool(p.get('paid')), p.get('rating'), p.get('position'), p.get('player_uid'))
+        payments = []
+        for e in snapshot.get('payment_ledger') or []:
+            if e['kind'] not in PAYMENT_KINDS:
+                raise ValueError(f"payment {e['id']}: unknown kind {e['kind']!r}")
+            payments.append(Payment(e['id'], e['player_id'], e['amount'], e['kind'], e.get('note', ''), e.get('source', ''), e.get('at')))
+        shared = {old: ids for old, ids in holders.items() if len(ids) > 1}
+        if shared:
+            players = {pid: p for team in teams.values() for pid, p in team.players.items()}
+            payments = _reassign_payments(payments, shared, players, snapshot)
+        return cls({k: v for k, v in snapshot.items() if k not in MODEL_KEYS}, teams, payments)
+
+    def to_snapshot(self):
+        return dict(self.fields, teams_data=[t.to_dict() for t in self.teams.values()], payment_ledger=[p.to_dict() for p in self.payments])
+
+
+def _reassign_payments(payments, shared, players, snapshot):
+    # shared: stored id -> the ids its players have now. The payments follow the one paid player; when none
+    # or several of them are paid the split is unknown, so theirs are rebooked from the paid flags instead.
+    # Ids are renumbered afterwards (PaymentLedger numbers events by position).
+    prices = {k: snapshot.get(k, EVENT_SETTING_DEFAULTS[k]) for k in ('price_player', 'price_gk')}
+    kept, rebooked = [], []
+    for payment in payments:
+        ids = shared.get(payment.player_id)
+        paid = [pid for pid in ids if players[pid].paid] if ids else []
+        if ids is None or len(paid) == 1:
+            payment.player_id = paid[0] if ids else payment.player_id
+            kept.append(payment)
+        else:
+            rebooked.append(payment)
+    for old in dict.fromkeys(p.player_id for p in rebooked):
+        for pid in shared[old]:
+            player = players[pid]
+            due = amount_due({'is_gk': player.is_gk}, prices['price_player'], prices['price_gk'])
+            if player.paid and due > 0:
+                kept.append(Payment(0, pid, due, PAYMENT_KINDS[0], "paid flag (duplicate id)", 'legacy', rebooked[0].at))
+    for number, payment in enumerate(kept, start=1):
+        payment.id = number
+    return kept
+
+
+# --- Versioned records ---
+def encode_record(event):
+    return {'v': SCHEMA_VERSION, 'event': event.fields,
+            'teams': [[t.id, t.name, t.color_hex, [p.to_row() for p in t.players.values()]] for t in event.teams.values()],
+            'payments': [p.to_row() for p in event.payments]}
+
+
+def _event_from_v2(record):
+    teams = {}
+    for team_id, name, color_hex, rows in record['teams']:
+        teams[team_id] = Team(team_id, name, color_hex, {row[0]: Player.from_row(row) for row in rows})
+    return Event(dict(record['event']), teams, [Payment.from_row(row) for row in record['payments']])
+
+
+def _migrate_v1(record):
+    return encode_record(Event.from_snapshot(record))
+
+
+MIGRATIONS = {1: _migrate_v1}  # version -> function returning the record at the next version
+
+
+def record_version(record):
+    return record.get('v', 1) if isinstance(record.get('v'), int) else 1
+
+
+def decode_record(record):
+    version = record_version(record)
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"snapshot format v{version} is newer than this app (v{SCHEMA_VERSION})")
+    while version < SCHEMA_VERSION:
+        record = MIGRATIONS[version](record)
+        version = record_version(record)
+    return _event_from_v2(record)
+
+
+def compact_record(snapshot):
+    return encode_record(Event.from_snapshot(snapshot))
+
+
+def snapshot_from_record(record):
+    # Any stored version -> the app's snapshot dict. An empty record (new bin) stays empty.
+    return decode_record(record).to_snapshot() if record else {}
+
+
+def pack(snapshot):
+    payload = json.dumps(compact_record(snapshot), default=json_default, ensure_ascii=False, separators=(',', ':'))
+    return PACK_MAGIC + zlib.compress(payload.encode('utf-8'), 6)
+
+
+def unpack(data):
+    # Packed bytes, or JSON text written by older versions. Anything else raises ValueError.
+    try:
+        if isinstance(data, (bytes, memoryview)) and bytes(data[:len(PACK_MAGIC)]) == PACK_MAGIC:
+            data = zlib.decompress(bytes(data[len(PACK_MAGIC):]))
+        record = json.loads(data)
+    except (zlib.error, ValueError) as exc:
+        raise ValueError(f"not a Kentep snapshot: {exc}") from None
+    if not isinstance(record, dict):
+        raise ValueError("not a Kentep snapshot: expected a JSON object")
+    return snapshot_from_record(record)
@@ -0,0 +1,44 @@
+# Kentep League Manager - player list entries and team rules
+import re
+
+POSITIONS = ('GK', 'DF', 'MF', 'FW')
+UNKNOWN_POSITION = '?'
+DEFAULT_RATING = 5.0
+
+_RATING_SUFFIX = re.compile(r'\((\d+(?:[.,]\d+)?)\)\s*$')
+_POSITION_SUFFIX = re.compile(r'\[(\w+)\]\s*$')
+
+
+def parse_player_entry(text):
+    # "Budi Santoso (8) [MF]" -> name, rating, position. Both markers are optional and may come in either order.
+    name, rating, position = text.strip(), None, None
+    for _ in range(2):
+        match = _RATING_SUFFIX.search(name)
+        if match and rating is None:
+            rating = float(match.group(1).replace(',', '.'))
+            name = name[:match.start()].strip()
+            continue
+        match = _POSITION_SUFFIX.search(name)
+        if match and position is None and match.group(1).upper() in POSITIONS:
+            position = match.group(1).upper()
+            name = name[:match.start()].strip()
+    return {'name': name, 'rating': rating, 'position': position}
+
+
+def parse_constraints(text):
+    # One rule per line: "Budi = Andi" keeps them together, "Budi != Andi" keeps them apart.
+    together, apart, errors = [], [], []
+    for line_no, line in enumerate((text or '').splitlines(), start=1):
+        line = line.strip()
+        if not line: continue
+        if '!=' in line:
+            left, right = line.split('!=', 1); target = apart
+        elif '=' in line:
+            left, right = line.split('=', 1); target = together
+        else:
+            errors.append(f"Line {line_no}: expected 'A = B' or 'A != B'"); continue
+        if left.strip() and right.strip():
+            target.append((left.strip(), right.strip()))
+        else:
+            errors.append(f"Line {line_no}: missing player name")
+    return together, apart, errors
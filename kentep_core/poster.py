@@ -0,0 +1,226 @@
+# Kentep League Manager - poster rendering (WhatsApp text, PNG, PDF)
+import datetime
+import io
+import zipfile
+
+from kentep_core.fixtures import schedule_event_fixtures, format_fixture_lines
+from kentep_core.state import snapshot_hash
+
+COLOR_TO_EMOJI_MAP = {
+    "#0000FF": "🔵", "#FFFF00": "🟡", "#FFFFFF": "⚪",
+    "#000000": "⚫", "#FF0000": "🔴",
+}
+DEFAULT_COLOR_EMOJI = "🎨"
+
+POSTER_KEYS = (
+    'event_title', 'event_date', 'event_time_start', 'event_time_end', 'event_place', 'event_publisher',
+    'event_organizer', 'kick_off_time', 'price_player', 'price_gk', 'game_duration', 'teams_data',
+    'num_pitches', 'min_rest_minutes', 'changeover_minutes', 'double_round_robin',
+)
+POSTER_FORMATS = {'txt': 'text/plain', 'png': 'image/png', 'pdf': 'application/pdf'}
+
+# WhatsApp gets its *bold* markers and emoji; the image/PDF template is plain because the bundled font has no emoji.
+TEXT_TEMPLATES = {
+    'whatsapp': {
+        'title': "*{}*", 'place': "⛳ *{}*", 'publisher': "📽 {}", 'organizer': "👮 {}", 'kick_off': "*KICK OFF {}*",
+        'team': "*{name} {emoji}:*", 'gk': " (GK)", 'paid': " (Paid ✅)", 'fixtures': "*Game Fixtures :*",
+    },
+    'plain': {
+        'title': "{}", 'place': "{}", 'publisher': "Video/Foto: {}", 'organizer': "Wasit: {}", 'kick_off': "KICK OFF {}",
+        'team': "{name}", 'gk': " (GK)", 'paid': " (Paid)", 'fixtures': "Game Fixtures",
+    },
+}
+
+PAGE_WIDTH = 1080
+A4_PAGE = (1240, 1754)  # 150 dpi
+MARGIN = 48
+HEADER_COLOR = "#14532D"
+TEXT_COLOR = "#111111"
+MUTED_COLOR = "#555555"
+
+
+def poster_snapshot(snapshot):
+    return {k: snapshot.get(k) for k in POSTER_KEYS}
+
+
+def poster_hash(snapshot):
+    return snapshot_hash(poster_snapshot(snapshot))
+
+
+def _as_date(value):
+    return datetime.date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _as_time(value):
+    return datetime.time.fromisoformat(value) if isinstance(value, str) else value
+
+
+def poster_context(snapshot):
+    # Accepts live session values or a stored snapshot (ISO date/time strings).
+    ctx = {k: snapshot.get(k) for k in POSTER_KEYS}
+    ctx['event_date'] = _as_date(ctx['event_date'])
+    for k in ('event_time_start', 'event_time_end', 'kick_off_time'):
+        ctx[k] = _as_time(ctx[k])
+    ctx['num_pitches'] = ctx['num_pitches'] or 1
+    ctx['teams'] = []
+    for team in ctx.pop('teams_data') or []:
+        if not (team.get('team_name_display') or '').strip(): continue
+        color_hex = (team.get('team_color_hex') or '').upper()
+        ctx['teams'].append({
+            'id': team['id'], 'name': team['team_name_display'], 'color_hex': color_hex,
+            'emoji': COLOR_TO_EMOJI_MAP.get(color_hex, DEFAULT_COLOR_EMOJI),
+            'players': sorted(team['players'], key=lambda p: p.get('is_gk', False)),
+        })
+    ctx['schedule'] = None
+    if len(ctx['teams']) >= 2:
+        ctx['schedule'] = schedule_event_fixtures(
+            [t['id'] for t in ctx['teams']], ctx['event_date'], ctx['kick_off_time'], ctx['event_time_start'], ctx['event_time_end'],
+            ctx['game_duration'], ctx['num_pitches'], ctx['min_rest_minutes'] or 0, ctx['changeover_minutes'] or 0, bool(ctx['double_round_robin'])
+        )
+    return ctx
+
+
+def poster_sections(ctx, template='whatsapp'):
+    # [(kind, lines)] with kind in header/team/fixtures; every renderer lays these out its own way.
+    tpl = TEXT_TEMPLATES[template]
+    header = [tpl['title'].format(ctx['event_title'].upper()), ctx['event_date'].strftime('%d/%m/%Y'),
+              f"Pkl. {ctx['event_time_start'].strftime('%H.%M')} - {ctx['event_time_end'].strftime('%H.%M')}", "",
+              tpl['place'].format(ctx['event_place'].upper())]
+    if ctx['event_publisher']: header.append(tpl['publisher'].format(ctx['event_publisher']))
+    if ctx['event_organizer']: header.append(tpl['organizer'].format(ctx['event_organizer']))
+    header += ["", tpl['kick_off'].format(ctx['kick_off_time'].strftime('%H.%M')), "",
+               f"HTM Player : {ctx['price_player']:,.0f}", f"HTM GK : {ctx['price_gk']:,.0f}"]
+    sections = [('header', header, None)]
+    for team in ctx['teams']:
+        lines = [tpl['team'].format(name=team['name'], emoji=team['emoji'])]
+        lines += [f"{n}. {p['name']}{tpl['gk'] if p.get('is_gk') else ''}{tpl['paid'] if p.get('paid') else ''}"
+                  for n, p in enumerate(team['players'], start=1)]
+        sections.append(('team', lines, team['color_hex']))
+    fixtures = [tpl['fixtures'], f"{ctx['game_duration']} menit/Game", "Home (H) Kiri", "Away (A) Kanan"]
+    if ctx['num_pitches'] > 1: fixtures.append(f"{ctx['num_pitches']} Lapangan (L1-L{ctx['num_pitches']})")
+    fixtures.append("")
+    if ctx['schedule'] is not None:
+        names = {t['id']: f"{t['name']} {t['emoji']}" if template == 'whatsapp' else t['name'] for t in ctx['teams']}
+        fixtures += format_fixture_lines(ctx['schedule'], names) or ["Not enough teams for fixtures (minimum 2)."]
+    else:
+        fixtures.append("Only one or zero teams defined, cannot generate fixtures.")
+    sections.append(('fixtures', fixtures, None))
+    return sections
+
+
+def render_text(ctx):
+    lines = []
+    for kind, section, _ in poster_sections(ctx, 'whatsapp'):
+        lines += section
+        lines.append("\n" if kind == 'header' else "")
+    return "\n".join(lines[:-1])
+
+
+# --- Image / PDF ---
+def _fonts():
+    from PIL import ImageFont
+    try:
+        return {size: ImageFont.load_default(size=size) for size in (22, 28, 44)}
+    except TypeError:  # Pillow < 10.1 has a single bitmap font
+        font = ImageFont.load_default()
+        return {size: font for size in (22, 28, 44)}
+
+
+def _layout(ctx):
+    # Flattens the poster into rows of (text, size, color, swatch, band) with their heights.
+    rows = [("", 22, "#FFFFFF", None, True)]
+    for kind, lines, color_hex in poster_sections(ctx, 'plain'):
+        for idx, line in enumerate(lines):
+            if kind == 'header':
+                size = 44 if idx == 0 else 28
+                rows.append((line, size, "#FFFFFF", None, True))
+            elif idx == 0:
+                rows.append((line, 28, TEXT_COLOR, color_hex or "#888888", False))
+            else:
+                rows.append((line, 22, TEXT_COLOR if kind == 'team' else MUTED_COLOR, None, False))
+        rows.append(("", 22, TEXT_COLOR, None, kind == 'header'))
+    return [(row, int(row[1] * 1.45)) for row in rows]
+
+
+def _draw_rows(image, rows, fonts, top):
+    from PIL import ImageDraw
+    draw = ImageDraw.Draw(image)
+    y = top
+    for (text, size, color, swatch, band), height in rows:
+        if band:
+            draw.rectangle([0, y, image.width, y + height], fill=HEADER_COLOR)
+        x = MARGIN
+        if swatch:
+            draw.rounded_rectangle([x, y + 6, x + size - 6, y + size], radius=4, fill=swatch, outline="#333333")
+            x += size + 8
+        draw.text((x, y), text, font=fonts[size], fill=color)
+        y += height
+    return y
+
+
+def render_png(ctx):
+    from PIL import Image
+    rows = _layout(ctx)
+    height = sum(h for _, h in rows) + MARGIN
+    image = Image.new("RGB", (PAGE_WIDTH, height), "#FFFFFF")
+    _draw_rows(image, rows, _fonts(), top=0)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_pdf(ctx):
+    # Flows the same rows over A4 pages; a team block is not split unless it is longer than a page.
+    from PIL import Image
+    rows = _layout(ctx)
+    page_height = A4_PAGE[1] - 2 * MARGIN
+    pages, current, used = [], [], 0
+    for i, (row, height) in enumerate(rows):
+        block = height
+        if row[3]:  # team heading: keep the whole team together when it fits
+            j = i + 1
+            while j < len(rows) and not rows[j][0][3] and rows[j][0][0]:
+                block += rows[j][1]; j += 1
+        if current and used + min(block, page_height) > page_height:
+            pages.append(current); current, used = [], 0
+        current.append((row, height)); used += height
+    if current: pages.append(current)
+    fonts = _fonts()
+    images = []
+    for page_rows in pages:
+        image = Image.new("RGB", A4_PAGE, "#FFFFFF")
+        _draw_rows(image, page_rows, fonts, top=MARGIN)
+        images.append(image)
+    buffer = io.BytesIO()
+    images[0].save(buffer, format="PDF", save_all=True, append_images=images[1:], resolution=150.0)
+    return buffer.getvalue()
+
+
+POSTER_RENDERERS = {'txt': render_text, 'png': render_png, 'pdf': render_pdf}
+
+
+def image_output_available():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def render_poster(snapshot, fmt):
+    return POSTER_RENDERERS[fmt](poster_context(snapshot))
+
+
+def render_batch(snapshots, formats=('txt', 'pdf'), render=render_poster):
+    # snapshots: {event_key: snapshot}. One zip with a folder per event; `render` lets callers plug in a cache.
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        folders = set()
+        for event_key, snapshot in snapshots.items():
+            folder = f"{snapshot.get('event_date') or ''}_{snapshot.get('event_title') or ''}".replace('/', '-').strip('_ ') or "event"
+            if folder in folders: folder = f"{folder}_{event_key}"  # same date and title: keep both events
+            folders.add(folder)
+            for fmt in formats:
+                data = render(snapshot, fmt)
+                archive.writestr(f"{folder}/poster.{fmt}", data.encode('utf-8') if isinstance(data, str) else data)
+    return buffer.getvalue()
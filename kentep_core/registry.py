@@ -0,0 +1,234 @@
+# Kentep League Manager - player registry and duplicate detection
+import collections
+import hashlib
+import math
+import re
+import unicodedata
+
+NEAR_DUPLICATE_THRESHOLD = 0.75
+# Trigram lists longer than this are not scanned at query time (every name is still indexed): a name whose
+# rarest trigrams are all this common ("Player 1".."Player 9999") is only partly checked and counted in
+# `truncated`, which keeps the check linear instead of comparing such names with each other.
+MAX_POSTING_LENGTH = 256
+DUPLICATE_REPORT_LIMIT = 20
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+_REPEATS = re.compile(r"(.)\1+")
+# Common Indonesian spelling variants (old/new spelling, loan words) folded before hashing.
+_PHONETIC_FOLDS = (("dj", "j"), ("tj", "c"), ("oe", "u"), ("sj", "sy"), ("ph", "f"), ("kh", "k"), ("q", "k"),
+                   ("x", "ks"), ("v", "f"), ("z", "s"), ("y", "i"), ("w", "u"))
+
+
+def normalize_name(name):
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch))
+    name = _NON_WORD.sub(' ', name.casefold())
+    return _SPACES.sub(' ', name).strip()
+
+
+def phonetic_key(normalized):
+    # Spelling variants only ("Djoko" / "Joko", "Rizky" / "Riski"); vowels stay, so "Dedi" and "Dodi" differ.
+    tokens = []
+    for token in normalized.split():
+        if len(token) > 2 and token.isalpha():  # initials and numbers are kept as typed
+            for old, new in _PHONETIC_FOLDS:
+                token = token.replace(old, new)
+            token = _REPEATS.sub(r'\1', token)
+        tokens.append(token)
+    return ' '.join(tokens)
+
+
+def trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def is_initials_variant(a, b):
+    # "budi" / "budi s" / "budi s k": same leading tokens, the longer one only adds initials.
+    ta, tb = a.split(), b.split()
+    if len(ta) > len(tb): ta, tb = tb, ta
+    return len(ta) < len(tb) and tb[:len(ta)] == ta and all(len(t) <= 2 for t in tb[len(ta):])
+
+
+def numbered_stem(normalized):
+    # "player 7" -> "player"; None when the name does not end in a number or a single letter.
+    head, _, last = normalized.rpartition(' ')
+    return head if head and (last.isdigit() or len(last) == 1) else None
+
+
+def is_numbered_variant(a, b):
+    # "player 1" / "player 2", "budi a" / "budi b", "player" / "player 2": a number or letter that tells two
+    # people apart, never a duplicate. ("budi" / "budi s" stays an initials variant.)
+    stem_a, stem_b = numbered_stem(a), numbered_stem(b)
+    if stem_a is not None and stem_a == stem_b:
+        return True
+    return (stem_a == b and a.rpartition(' ')[2].isdigit()) or (stem_b == a and b.rpartition(' ')[2].isdigit())
+
+
+def initials_core(normalized):
+    tokens = normalized.split()
+    while len(tokens) > 1 and len(tokens[-1]) <= 2:
+        tokens.pop()
+    return ' '.join(tokens)
+
+
+def player_uid_for(normalized):
+    return "plr_" + hashlib.blake2b(normalized.encode('utf-8'), digest_size=6).hexdigest()
+
+
+class _NameIndex:
+    # Trigram postings plus phonetic and initials buckets over normalized names.
+    def __init__(self):
+        self.names = []
+        self.grams = []
+        self.stems = []
+        self.postings = collections.defaultdict(list)
+        self.by_phonetic = collections.defaultdict(list)
+        self.by_core = collections.defaultdict(list)
+        self.truncated = 0
+
+    @staticmethod
+    def keys_for(normalized):
+        return trigrams(normalized), phonetic_key(normalized), initials_core(normalized)
+
+    def add(self, normalized, keys=None):
+        idx = len(self.names)
+        grams, phonetic, core = keys or self.keys_for(normalized)
+        self.names.append(normalized)
+        self.grams.append(grams)
+        self.stems.append(numbered_stem(normalized))
+        for g in grams:
+            self.postings[g].append(idx)
+        self.by_phonetic[phonetic].append(idx)
+        self.by_core[core].append(idx)
+        return idx
+
+    def similar(self, normalized, threshold=NEAR_DUPLICATE_THRESHOLD, keys=None):
+        # Returns {index: score}. Prefix filtering: a name reaching the Dice threshold must share at
+        # least one of the query's rarest trigrams, so only those (short) posting lists are scanned
+        # and each candidate is then scored exactly.
+        grams, phonetic, core = keys or self.keys_for(normalized)
+        min_overlap = math.ceil(threshold * len(grams) / (2.0 - threshold))
+        postings = sorted((self.postings.get(g, ()) for g in grams), key=len)
+        candidates = set()
+        for posting in postings[:len(grams) - min_overlap + 1]:
+            if len(posting) > MAX_POSTING_LENGTH:
+                self.truncated += 1
+                break
+            candidates.update(posting)
+        found = {}
+        stem = numbered_stem(normalized)
+        for idx in candidates:
+            if stem is not None and self.stems[idx] == stem:
+                continue  # "player 7" vs "player 8": skipped before scoring, there can be thousands
+            score = 2.0 * len(grams & self.grams[idx]) / (len(grams) + len(self.grams[idx]))
+            if score >= threshold:
+                found[idx] = score
+        for idx in self.by_phonetic.get(phonetic, ()):
+            found[idx] = max(found.get(idx, 0.0), 0.9)
+        for idx in self.by_core.get(core, ()):
+            if is_initials_variant(normalized, self.names[idx]):
+                found[idx] = max(found.get(idx, 0.0), 0.85)
+        return {idx: score for idx, score in found.items() if not is_numbered_variant(normalized, self.names[idx])}
+
+
+def find_duplicates(names, threshold=NEAR_DUPLICATE_THRESHOLD):
+    # exact: {normalized: [original names...]} for names that normalize to the same string.
+    # near:  [(name_a, name_b, score)] for distinct normalized names that look alike.
+    # truncated: how many names were only partly checked (see MAX_POSTING_LENGTH).
+    by_normalized = collections.defaultdict(list)
+    for name in names:
+        by_normalized[normalize_name(name)].append(name)
+    by_normalized.pop('', None)
+    exact = {norm: group for norm, group in by_normalized.items() if len(group) > 1}
+    index = _NameIndex()
+    near = []
+    for norm, group in by_normalized.items():
+        keys = index.keys_for(norm)
+        for idx, score in index.similar(norm, threshold, keys).items():
+            near.append((by_normalized[index.names[idx]][0], group[0], round(score, 2)))
+        index.add(norm, keys)
+    return {'exact': exact, 'near': near, 'truncated': index.truncated}
+
+
+def format_duplicate_report(report, limit=DUPLICATE_REPORT_LIMIT):
+    # Exact groups first, then the closest near pairs; past `limit` entries the rest is only counted.
+    parts = [f"{group[0]} (x{len(group)})" for group in report['exact'].values()]
+    parts += [f"{a} ≈ {b}" for a, b, _ in sorted(report['near'], key=lambda pair: -pair[2])]
+    text = ', '.join(parts[:limit])
+    if len(parts) > limit:
+        text += f" (top {limit} of {len(parts)})"
+    return text
+
+
+class PlayerRegistry:
+    # Canonical players across events. `records` is the plain dict that gets persisted
+    # ({uid: {'name': ..., 'aliases': [...]}}); the lookup indexes are rebuilt from it.
+    # Several players may share a name: `_exact` maps a name to all of their uids, oldest first.
+    def __init__(self, records=None):
+        self.records = records if records is not None else {}
+        self._exact = collections.defaultdict(list)
+        self._index = _NameIndex()
+        self._index_uids = []
+        for uid, record in self.records.items():
+            self._add_to_index(uid, record['name'])
+            for alias in record.get('aliases', ()):
+                self._add_exact(alias, uid)
+
+    def _add_exact(self, normalized, uid):
+        if uid not in self._exact[normalized]:
+            self._exact[normalized].append(uid)
+
+    def _add_to_index(self, uid, name):
+        normalized = normalize_name(name)
+        self._add_exact(normalized, uid)
+        self._index.add(normalized)
+        self._index_uids.append(uid)
+
+    def __len__(self):
+        return len(self.records)
+
+    def lookup(self, name):
+        uids = self._exact.get(normalize_name(name))
+        return uids[0] if uids else None
+
+    def candidates(self, name):
+        # Every known player with this name or alias.
+        return list(self._exact.get(normalize_name(name), ()))
+
+    def register(self, name, new=False, exclude=()):
+        # The known player with this name, skipping uids in `exclude` (already taken in the event), else
+        # a new one. new=True always adds a new player: a second "Budi" who is not the known Budi.
+        normalized = normalize_name(name)
+        if not normalized:
+            return None
+        if not new:
+            uid = next((uid for uid in self._exact.get(normalized, ()) if uid not in exclude), None)
+            if uid is not None:
+                return uid
+        uid = player_uid_for(normalized)
+        while uid in self.records:
+            uid = player_uid_for(normalized + uid)
+        self.records[uid] = {'name': name.strip(), 'aliases': []}
+        self._add_to_index(uid, name)
+        return uid
+
+    def add_alias(self, uid, name):
+        normalized = normalize_name(name)
+        if uid in self.records and normalized and normalized not in self._exact:
+            self.records[uid].setdefault('aliases', []).append(normalized)
+            self._add_exact(normalized, uid)
+
+    def similar(self, name, threshold=NEAR_DUPLICATE_THRESHOLD, limit=5):
+        normalized = normalize_name(name)
+        scores = {}
+        for idx, score in self._index.similar(normalized, threshold).items():
+            uid = self._index_uids[idx]
+            if self._index.names[idx] != normalized:
+                scores[uid] = max(scores.get(uid, 0.0), score)
+        return sorted(scores.items(), key=lambda item: -item[1])[:limit]
+
+    def display_name(self, uid):
+        record = self.records.get(uid)
+        return record['name'] if record else None
@@ -0,0 +1,91 @@
+# Kentep League Manager - roster editing operations
+GRID_COLUMNS = ['team_id', 'name', 'is_gk', 'paid', 'rating', 'position']
+
+
+def index_players(teams):
+    # player id -> (team dict, player dict)
+    return {p['id']: (t, p) for t in teams for p in t['players']}
+
+
+def roster_rows(teams, team_filter=None, name_filter=None):
+    needle = (name_filter or '').strip().casefold()
+    rows, refs = [], []
+    for t in teams:
+        if team_filter and t['id'] != team_filter: continue
+        for p in t['players']:
+            if needle and needle not in p['name'].casefold(): continue
+            rows.append({'team_id': t['id'], 'name': p['name'], 'is_gk': bool(p.get('is_gk')), 'paid': bool(p.get('paid')),
+                         'rating': p.get('rating'), 'position': p.get('position')})
+            refs.append(p['id'])
+    return rows, refs
+
+
+def move_players(teams, player_ids, target_team_id):
+    teams_by_id = {t['id']: t for t in teams}
+    target = teams_by_id[target_team_id]
+    wanted = set(player_ids)
+    moved = []
+    for t in teams:
+        if t is target or not wanted: continue
+        keep = []
+        for p in t['players']:
+            (moved if p['id'] in wanted else keep).append(p)
+        t['players'] = keep
+    target['players'].extend(moved)
+    return len(moved)
+
+
+def swap_players(teams, first_id, second_id):
+    players = index_players(teams)
+    (team_a, a), (team_b, b) = players[first_id], players[second_id]
+    if team_a is team_b:
+        return False
+    ia, ib = team_a['players'].index(a), team_b['players'].index(b)
+    team_a['players'][ia], team_b['players'][ib] = b, a
+    return True
+
+
+def _clean_value(column, value):
+    if column in ('is_gk', 'paid'):
+        return bool(value)
+    if column == 'name':
+        return (value or '').strip()
+    if column == 'rating':
+        return None if value is None or value != value else float(value)
+    return value or None
+
+
+def apply_grid_changes(teams, refs, changes, default_team_id, new_player_id):
+    # `changes` is the st.data_editor state: edited_rows {row: {column: value}}, added_rows [...], deleted_rows [...].
+    # `refs` maps grid rows back to player ids. Returns the set of touched player ids.
+    teams_by_id = {t['id']: t for t in teams}
+    players = index_players(teams)
+    touched = set()
+    moves = {}
+    for row, edits in changes.get('edited_rows', {}).items():
+        team, player = players[refs[int(row)]]
+        for column, value in edits.items():
+            if column not in GRID_COLUMNS: continue
+            if column == 'team_id':
+                if value in teams_by_id and value != team['id']:
+                    moves.setdefault(value, []).append(player['id'])
+            elif column != 'name' or _clean_value(column, value):
+                player[column] = _clean_value(column, value)
+        touched.add(player['id'])
+    for target_team_id, player_ids in moves.items():
+        move_players(teams, player_ids, target_team_id)
+    deleted = {refs[int(row)] for row in changes.get('deleted_rows', [])}
+    if deleted:
+        for t in teams:
+            t['players'] = [p for p in t['players'] if p['id'] not in deleted]
+        touched |= deleted
+    for added in changes.get('added_rows', []):
+        team = teams_by_id.get(added.get('team_id')) or teams_by_id.get(default_team_id)
+        if team is None: continue
+        player = {'id': new_player_id(players), 'name': _clean_value('name', added.get('name')) or 'New Player',
+                  'is_gk': bool(added.get('is_gk')), 'paid': bool(added.get('paid')),
+                  'rating': _clean_value('rating', added.get('rating')), 'position': added.get('position') or None}
+        team['players'].append(player)
+        players[player['id']] = (team, player)
+        touched.add(player['id'])
+    return touched
@@ -0,0 +1,137 @@
+# Kentep League Manager - results, league table and player stats
+POINTS_WIN = 3
+POINTS_DRAW = 1
+TABLE_FIELDS = ('played', 'won', 'drawn', 'lost', 'goals_for', 'goals_against', 'points')
+
+
+def match_key(match):
+    # Stable across re-timing the schedule (pitches, durations); a pairing appears once per leg.
+    return f"{match.leg}:{match.home_id}:{match.away_id}"
+
+
+def result_deltas(home_id, away_id, home_goals, away_goals, sign=1):
+    # {team_id: {field: delta}} for one result; sign=-1 takes a result back out.
+    def side(goals_for, goals_against):
+        won, drawn = goals_for > goals_against, goals_for == goals_against
+        return {'played': sign, 'won': sign * won, 'drawn': sign * drawn, 'lost': sign * (goals_for < goals_against),
+                'goals_for': sign * goals_for, 'goals_against': sign * goals_against,
+                'points': sign * (POINTS_WIN if won else POINTS_DRAW if drawn else 0)}
+    return {home_id: side(home_goals, away_goals), away_id: side(away_goals, home_goals)}
+
+
+def _empty_row(team_id, name=None):
+    return dict({'team_id': team_id, 'name': name or team_id}, **{field: 0 for field in TABLE_FIELDS})
+
+
+def rank_standings(rows, head_to_head):
+    # rows: table rows (dicts with TABLE_FIELDS). head_to_head: {(team, opponent): {'points', 'goals_for', 'goals_against'}}.
+    # Order: points, then a mini-table of the matches between the tied teams (points, goal difference,
+    # goals), then overall goal difference, goals scored and name.
+    by_points = {}
+    for row in rows:
+        by_points.setdefault(row['points'], []).append(row)
+    ranked = []
+    for points in sorted(by_points, reverse=True):
+        group = by_points[points]
+        ids = {row['team_id'] for row in group}
+
+        def mini(row):
+            games = [head_to_head.get((row['team_id'], other)) for other in ids if other != row['team_id']]
+            games = [g for g in games if g]
+            return (sum(g['points'] for g in games), sum(g['goals_for'] - g['goals_against'] for g in games), sum(g['goals_for'] for g in games))
+
+        group.sort(key=lambda row: (*(-v for v in mini(row)), -(row['goals_for'] - row['goals_against']), -row['goals_for'], str(row['name'])))
+        ranked.extend(group)
+    return [dict(row, rank=rank, goal_difference=row['goals_for'] - row['goals_against']) for rank, row in enumerate(ranked, start=1)]
+
+
+class LeagueTable:
+    # Table for one set of results, updated per result instead of recomputed. `results` is the plain dict
+    # that gets persisted: {match key: {'home', 'away', 'home_goals', 'away_goals', 'scorers': {uid: goals}}}.
+    def __init__(self, results=None, team_names=None):
+        self.results = results if results is not None else {}
+        self.team_names = dict(team_names or {})
+        self.rows = {}
+        self.head_to_head = {}
+        for result in self.results.values():
+            self._apply(result, 1)
+
+    def _row(self, team_id):
+        if team_id not in self.rows:
+            self.rows[team_id] = _empty_row(team_id, self.team_names.get(team_id))
+        return self.rows[team_id]
+
+    def _apply(self, result, sign):
+        deltas = result_deltas(result['home'], result['away'], result['home_goals'], result['away_goals'], sign)
+        for team_id, delta in deltas.items():
+            row = self._row(team_id)
+            for field, value in delta.items():
+                row[field] += value
+        for team_id, opponent_id in ((result['home'], result['away']), (result['away'], result['home'])):
+            h2h = self.head_to_head.setdefault((team_id, opponent_id), {'points': 0, 'goals_for': 0, 'goals_against': 0})
+            for field in h2h:
+                h2h[field] += deltas[team_id][field]
+
+    def record(self, key, home_id, away_id, home_goals, away_goals, scorers=None):
+        # Replaces any earlier result for the same match; returns the previous result (or None).
+        previous = self.results.get(key)
+        if previous is not None:
+            self._apply(previous, -1)
+        result = {'home': home_id, 'away': away_id, 'home_goals': int(home_goals), 'away_goals': int(away_goals),
+                  'scorers': {uid: int(goals) for uid, goals in (scorers or {}).items() if goals}}
+        self.results[key] = result
+        self._apply(result, 1)
+        return previous
+
+    def remove(self, key):
+        previous = self.results.pop(key, None)
+        if previous is not None:
+            self._apply(previous, -1)
+        return previous
+
+    def standings(self, team_ids=()):
+        for team_id in team_ids:
+            self._row(team_id)
+        return rank_standings([dict(row, name=self.team_names.get(tid, row['name'])) for tid, row in self.rows.items()], self.head_to_head)
+
+
+def record_match(table, match, home_goals, away_goals, scorers=None, season='', event_key=None):
+    # None goals clears the result. A result stays filed under the season/event it was first recorded in.
+    # Returns (match key, result or None, season, event key) for the season store.
+    key = match_key(match)
+    previous = table.results.get(key) or {}
+    season, event_key = previous.get('season') or season, previous.get('event_key') or event_key
+    if home_goals is None or away_goals is None:
+        table.remove(key)
+        return key, None, season, event_key
+    table.record(key, match.home_id, match.away_id, home_goals, away_goals, scorers)
+    result = table.results[key]
+    if season: result.update(season=season, event_key=event_key)
+    return key, result, season, event_key
+
+
+def player_stat_deltas(result, previous, rosters):
+    # {player uid: {'appearances': d, 'goals': d}} for replacing `previous` (or nothing) with `result` (or nothing).
+    # rosters: {team_id: [player uid, ...]}; both teams' players appear once per played match.
+    deltas = {}
+
+    def add(uid, field, value):
+        if value:
+            deltas.setdefault(uid, {'appearances': 0, 'goals': 0})[field] += value
+
+    for res, sign in ((previous, -1), (result, 1)):
+        if res is None: continue
+        for team_id in (res['home'], res['away']):
+            for uid in rosters.get(team_id, ()):
+                add(uid, 'appearances', sign)
+        for uid, goals in res.get('scorers', {}).items():
+            add(uid, 'goals', sign * goals)
+    return {uid: d for uid, d in deltas.items() if d['appearances'] or d['goals']}
+
+
+def team_rosters(teams):
+    return {t['id']: [p.get('player_uid') or p['id'] for p in t['players']] for t in teams}
+
+
+def player_names(teams):
+    return {p.get('player_uid') or p['id']: p['name'] for t in teams for p in t['players']}
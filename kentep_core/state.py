@@ -0,0 +1,102 @@
+# Kentep League Manager - change tracking for persisted state
+import datetime
+import hashlib
+import json
+
+REVISION_KEY = 'state_revision'
+SYNCED_REVISION_KEY = 'synced_revision'
+CHANGED_KEYS_KEY = 'state_changed_keys'
+KEY_REVISIONS_KEY = 'state_key_revisions'
+HASH_CACHE_KEY = 'state_hash_cache'
+SYNCED_HASH_KEY = 'synced_state_hash'
+QUEUED_SAVE_KEY = 'queued_save'
+
+
+def json_default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def init_revision_tracking(state):
+    # Deliberately not part of the resettable defaults: the revision must never go backwards.
+    if REVISION_KEY not in state: state[REVISION_KEY] = 0
+    if SYNCED_REVISION_KEY not in state: state[SYNCED_REVISION_KEY] = 0
+    if CHANGED_KEYS_KEY not in state: state[CHANGED_KEYS_KEY] = set()
+    if KEY_REVISIONS_KEY not in state: state[KEY_REVISIONS_KEY] = {}
+    if HASH_CACHE_KEY not in state: state[HASH_CACHE_KEY] = (None, None)
+    if SYNCED_HASH_KEY not in state: state[SYNCED_HASH_KEY] = None
+    if QUEUED_SAVE_KEY not in state: state[QUEUED_SAVE_KEY] = None
+
+
+def bump_revision(state, *keys):
+    state[REVISION_KEY] = state.get(REVISION_KEY, 0) + 1
+    state[CHANGED_KEYS_KEY] = set(state.get(CHANGED_KEYS_KEY) or ()) | set(keys)
+    key_revisions = state.get(KEY_REVISIONS_KEY)
+    if key_revisions is None:
+        key_revisions = state[KEY_REVISIONS_KEY] = {}
+    for key in keys:
+        key_revisions[key] = state[REVISION_KEY]
+    return state[REVISION_KEY]
+
+
+def key_revision(state, key):
+    # Revision at which `key` last changed, so caches can depend on a single key.
+    return (state.get(KEY_REVISIONS_KEY) or {}).get(key, 0)
+
+
+def has_unsynced_changes(state):
+    return state.get(REVISION_KEY, 0) != state.get(SYNCED_REVISION_KEY, 0)
+
+
+def mark_synced(state, content_hash=None, revision=None):
+    # `revision`: the (possibly older) revision a confirmed write was taken at; never moves backwards.
+    current = state.get(REVISION_KEY, 0)
+    revision = current if revision is None else revision
+    if revision < state.get(SYNCED_REVISION_KEY, 0):
+        return
+    state[SYNCED_REVISION_KEY] = revision
+    state[SYNCED_HASH_KEY] = content_hash
+    if revision == current:
+        state[CHANGED_KEYS_KEY] = set()
+
+
+def mark_queued(state, ticket, content_hash):
+    # The backend took the snapshot but has not confirmed it: the state stays unsynced until confirm_queued().
+    state[QUEUED_SAVE_KEY] = {'ticket': ticket, 'hash': content_hash, 'revision': state.get(REVISION_KEY, 0)}
+
+
+def queued_hash(state):
+    queued = state.get(QUEUED_SAVE_KEY)
+    return queued['hash'] if queued else None
+
+
+def confirm_queued(state, is_confirmed):
+    queued = state.get(QUEUED_SAVE_KEY)
+    if queued is None or not is_confirmed(queued['ticket']):
+        return False
+    state[QUEUED_SAVE_KEY] = None
+    mark_synced(state, queued['hash'], revision=queued['revision'])
+    return True
+
+
+def changed_since_sync(state, content_hash):
+    # Revision says "something was touched"; the hash filters out edits that were undone.
+    return content_hash is None or content_hash != state.get(SYNCED_HASH_KEY)
+
+
+def snapshot_hash(snapshot):
+    canonical = json.dumps(snapshot, sort_keys=True, separators=(',', ':'), default=json_default)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def cached_state_hash(state, build_snapshot, cache_key=HASH_CACHE_KEY):
+    # Hashing walks the whole tree, so only do it once per revision.
+    revision = state.get(REVISION_KEY, 0)
+    cached_revision, cached_hash = state.get(cache_key) or (None, None)
+    if cached_revision != revision:
+        cached_hash = snapshot_hash(build_snapshot())
+        state[cache_key] = (revision, cached_hash)
+    return cached_hash
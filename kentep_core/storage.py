@@ -0,0 +1,594 @@
+# Kentep League Manager - storage backends
+import contextlib
+import datetime
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+from kentep_core.delta import keyed_view, snapshot_from_view, rebase, apply_ops
+from kentep_core.model import compact_record, snapshot_from_record, pack, unpack
+from kentep_core.season import TABLE_FIELDS, rank_standings, result_deltas, player_stat_deltas
+from kentep_core.state import json_default
+
+
+def event_key_for(snapshot):
+    # Snapshots saved before events had an id fall back to the old date|title key (see legacy_event_id).
+    return snapshot.get('event_id') or legacy_event_id(snapshot)
+
+
+def legacy_event_id(snapshot):
+    return f"{snapshot.get('event_date') or ''}|{snapshot.get('event_title') or ''}"
+
+
+def to_json_record(snapshot):
+    # Same shape the jsonbin record has: dates/times as ISO strings.
+    return json.loads(json.dumps(snapshot, default=json_default))
+
+
+def record_revision(record):
+    # jsonbin has no revision counter: a content hash stands in for one.
+    return hashlib.sha1(json.dumps(record, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()[:16]
+
+
+class StorageBackend:
+    name = "none"
+    supports_history = False
+    supports_seasons = False
+    supports_delta = False
+    supports_log_append = False
+    cache = None  # SnapshotCache for remote backends: sessions start from it and revalidate in the background
+
+    @property
+    def cache_key(self):
+        return self.name
+
+    def snapshot_from_doc(self, doc):
+        raise NotImplementedError
+
+    def refresh_cache(self):
+        # Background revalidation: conditional fetch, then replay of queued offline edits. Optional note.
+        raise NotImplementedError
+
+    def load_cached(self):
+        # -> cache entry + 'snapshot' (the queued local state when there is one), or None.
+        entry = self.cache.get(self.cache_key) if self.cache else None
+        if not entry or 'doc' not in entry:
+            return None
+        return dict(entry, snapshot=self.snapshot_from_doc(entry['outbox']['doc'] if entry['outbox'] else entry['doc']))
+
+    def cached_revision(self):
+        entry = self.cache.get(self.cache_key) if self.cache else None
+        return entry.get('revision') if entry else None
+
+    def queued_edits(self):
+        entry = self.cache.get(self.cache_key) if self.cache else None
+        return entry['outbox']['edits'] if entry and entry['outbox'] else 0
+
+    def revalidate(self):
+        return self.cache.revalidate(self.cache_key, self.refresh_cache) if self.cache else False
+
+    def revalidation_status(self):
+        return self.cache.check_status(self.cache_key) if self.cache else None
+
+    def current_revision(self):
+        # Cheap change marker for read-only consumers (the public viewer); None: unknown, reload to be sure.
+        if self.cache is None:
+            return None
+        self.revalidate()  # rate-limited and in the background: picks up writes from other app processes
+        return self.cached_revision()
+
+    def load_current(self):
+        # Latest state for read-only consumers, from the cache when there is one.
+        cached = self.load_cached()
+        return cached['snapshot'] if cached is not None else self.load_latest()
+
+    def load_latest(self):
+        raise NotImplementedError
+
+    def save(self, snapshot, label=None):
+        # -> None once written, or a ticket for save_confirmed() when the write is only queued.
+        raise NotImplementedError
+
+    def save_confirmed(self, ticket):
+        return True
+
+    def save_failed(self):
+        # True when the last queued write was refused for good and waits for retry_failed_save().
+        return False
+
+    def retry_failed_save(self):
+        pass
+
+    def list_events(self, limit=50):
+        return []
+
+    def load_event(self, event_key):
+        raise NotImplementedError
+
+    def append_match_log(self, event_key, events):
+        raise NotImplementedError
+
+    def describe_status(self):
+        return None
+
+    def latency(self):
+        # {label: seconds or None} for the diagnostics panel.
+        return {}
+
+
+class JsonBinStorage(StorageBackend):
+    # One snapshot per bin; writes go through the background CloudSyncWorker.
+    name = "jsonbin"
+
+    def __init__(self, worker, cache=None):
+        self.worker = worker
+        self.cache = cache
+        self._lock = threading.Lock()
+        worker.on_written = self._written
+
+    @property
+    def cache_key(self):
+        return f"jsonbin:{self.worker.bin_id}"
+
+    def snapshot_from_doc(self, doc):
+        return snapshot_from_record(doc)
+
+    def load_latest(self):
+        record, etag = self.worker.fetch_if_changed()
+        if self.cache:
+            self.cache.confirm(self.cache_key, record_revision(record), record, etag=etag)
+        return snapshot_from_record(record)
+
+    def save(self, snapshot, label=None):
+        record = to_json_record(compact_record(snapshot))
+        with self._lock:
+            seq = self.cache.queue(self.cache_key, record) if self.cache else None
+            return self.worker.submit(record, bin_name=label, tag=(seq, record))
+
+    def save_confirmed(self, ticket):
+        return ticket is None or self.worker.written_seq >= ticket
+
+    def save_failed(self):
+        return self.worker.status()['failed']
+
+    def retry_failed_save(self):
+        self.worker.retry_failed()
+
+    def _written(self, tag, etag=None):
+        # Keeps the PUT's ETag so the next revalidation stays conditional. Without one the next
+        # revalidation is a plain GET and its 200 brings the ETag along.
+        seq, record = tag
+        if self.cache:
+            self.cache.confirm(self.cache_key, record_revision(record), record, etag=etag, outbox_seq=seq)
+
+    def refresh_cache(self):
+        entry = self.cache.get(self.cache_key) or {}
+        fetched = self.worker.fetch_if_changed(entry.get('etag'))
+        if fetched is not None:
+            record, etag = fetched
+            self.cache.confirm(self.cache_key, record_revision(record), record, etag=etag)
+        with self._lock:
+            # Edits queued before a restart. Whole-record PUT: the queued copy wins, as any save would.
+            outbox = (self.cache.get(self.cache_key) or {}).get('outbox')
+            if outbox and not self.worker.status()['pending']:
+                self.worker.submit(outbox['doc'], tag=(outbox['seq'], outbox['doc']))
+                return f"📤 Sending {outbox['edits']} queued edit(s)"
+        return None
+
+    def describe_status(self):
+        return self.worker.describe_status()
+
+    def latency(self):
+        status = self.worker.status()
+        return {'PUT': status['last_latency'], 'GET': status['last_fetch_latency'], 'sync lag': status['lag_seconds']}
+
+
+class DeltaStorage(StorageBackend):
+    # Shared document on a kentep_core.syncserver. Sessions send only their changes against the revision
+    # they last saw (kept per session by the app), so concurrent organizers do not overwrite each other.
+    name = "delta"
+    supports_delta = True
+
+    def __init__(self, client, cache=None):
+        self.client = client
+        self.cache = cache
+        self._lock = threading.Lock()  # a queued replay and a session's sync must not send the same ops twice
+
+    @property
+    def cache_key(self):
+        return f"delta:{self.client.doc_url}"
+
+    def snapshot_from_doc(self, doc):
+        return snapshot_from_view(doc)
+
+    def fetch(self):
+        # -> (revision, keyed view); the view is the base for the session's next sync().
+        revision, view = self.client.fetch()
+        if self.cache:
+            self.cache.confirm(self.cache_key, revision, view)
+        return revision, view
+
+    def load_latest(self):
+        return snapshot_from_view(self.fetch()[1])
+
+    def save(self, snapshot, label=None):
+        # Without a base: take whatever is on the server as the base (last writer wins per field).
+        revision, view = self.fetch()
+        self.sync(revision, view, snapshot)
+
+    def sync(self, base_revision, base_view, snapshot, held_paths=()):
+        # See delta.rebase(); 'local' comes back as a snapshot dict for the session.
+        view = keyed_view(to_json_record(snapshot))
+        with self._lock:
+            seq = self.cache.queue(self.cache_key, view, base_revision=base_revision, base=base_view) if self.cache else None
+            result = rebase(base_revision, base_view, view, self.client.patch, held_paths)
+        if self.cache:
+            self.cache.confirm(self.cache_key, result['revision'], result['base'], outbox_seq=seq)
+        result['local'] = snapshot_from_view(result['local'])
+        return result
+
+    def refresh_cache(self):
+        entry = self.cache.get(self.cache_key) or {}
+        since = self.client.ops_since(entry['revision']) if entry.get('doc') is not None else None
+        if since is None:
+            self.fetch()
+        elif since[1]:
+            self.cache.confirm(self.cache_key, since[0], apply_ops(entry['doc'], since[1]))
+        with self._lock:
+            outbox = (self.cache.get(self.cache_key) or {}).get('outbox')
+            if not outbox:
+                return None
+            # Offline edits merge like any sync; where they clash with newer edits the server copy is kept.
+            result = rebase(outbox['base_revision'], outbox['base'], outbox['doc'], self.client.patch)
+            self.cache.confirm(self.cache_key, result['revision'], result['base'], outbox_seq=outbox['seq'])
+        if result['conflicts']:
+            return f"⚠️ {len(result['conflicts'])} queued edit(s) clashed with newer changes; the server copy was kept"
+        return f"📤 Sent {outbox['edits']} queued edit(s)"
+
+    def describe_status(self):
+        return self.client.describe_status()
+
+    def latency(self):
+        return {'PATCH/GET': self.client.last_latency}
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    event_key TEXT NOT NULL UNIQUE,
+    event_date TEXT,
+    title TEXT,
+    snapshot BLOB NOT NULL,  -- model.pack(); rows written before it are plain JSON text
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_date ON events (event_date);
+CREATE INDEX IF NOT EXISTS idx_events_updated ON events (updated_at);
+CREATE TABLE IF NOT EXISTS teams (
+    event_id INTEGER NOT NULL REFERENCES events (id) ON DELETE CASCADE,
+    team_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT,
+    color_hex TEXT,
+    PRIMARY KEY (event_id, team_id)
+);
+CREATE TABLE IF NOT EXISTS players (
+    event_id INTEGER NOT NULL REFERENCES events (id) ON DELETE CASCADE,
+    team_id TEXT NOT NULL,
+    player_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_gk INTEGER NOT NULL DEFAULT 0,
+    paid INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_players_event_team ON players (event_id, team_id);
+CREATE INDEX IF NOT EXISTS idx_players_name ON players (name COLLATE NOCASE);
+-- Live match log rows are appended one by one instead of rewriting the snapshot.
+CREATE TABLE IF NOT EXISTS match_log (
+    seq INTEGER PRIMARY KEY,
+    event_id INTEGER NOT NULL REFERENCES events (id) ON DELETE CASCADE,
+    log_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    UNIQUE (event_id, log_id)
+);
+"""
+
+# Season aggregates are kept up to date per result (delta upserts), never rebuilt from history.
+# Every lookup path is a primary key or index prefix: (season, ...).
+SEASON_SCHEMA = """
+CREATE TABLE IF NOT EXISTS season_results (
+    season TEXT NOT NULL,
+    event_key TEXT NOT NULL,
+    match_key TEXT NOT NULL,
+    home_id TEXT NOT NULL,
+    away_id TEXT NOT NULL,
+    home_goals INTEGER NOT NULL,
+    away_goals INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    PRIMARY KEY (season, event_key, match_key)
+);
+CREATE TABLE IF NOT EXISTS season_standings (
+    season TEXT NOT NULL,
+    team_id TEXT NOT NULL,
+    name TEXT,
+    played INTEGER NOT NULL DEFAULT 0,
+    won INTEGER NOT NULL DEFAULT 0,
+    drawn INTEGER NOT NULL DEFAULT 0,
+    lost INTEGER NOT NULL DEFAULT 0,
+    goals_for INTEGER NOT NULL DEFAULT 0,
+    goals_against INTEGER NOT NULL DEFAULT 0,
+    points INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (season, team_id)
+);
+CREATE TABLE IF NOT EXISTS season_head_to_head (
+    season TEXT NOT NULL,
+    team_id TEXT NOT NULL,
+    opponent_id TEXT NOT NULL,
+    points INTEGER NOT NULL DEFAULT 0,
+    goals_for INTEGER NOT NULL DEFAULT 0,
+    goals_against INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (season, team_id, opponent_id)
+);
+CREATE TABLE IF NOT EXISTS season_attendance (
+    season TEXT NOT NULL,
+    event_key TEXT NOT NULL,
+    player_uid TEXT NOT NULL,
+    PRIMARY KEY (season, event_key, player_uid)
+);
+CREATE TABLE IF NOT EXISTS season_player_stats (
+    season TEXT NOT NULL,
+    player_uid TEXT NOT NULL,
+    name TEXT,
+    attended INTEGER NOT NULL DEFAULT 0,
+    appearances INTEGER NOT NULL DEFAULT 0,
+    goals INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (season, player_uid)
+);
+CREATE INDEX IF NOT EXISTS idx_season_results_recorded ON season_results (season, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_season_player_goals ON season_player_stats (season, goals DESC, appearances DESC);
+"""
+_STANDINGS_UPSERT = (
+    f"INSERT INTO season_standings (season, team_id, name, {', '.join(TABLE_FIELDS)}) VALUES (?, ?, ?{', ?' * len(TABLE_FIELDS)}) "
+    "ON CONFLICT (season, team_id) DO UPDATE SET name = COALESCE(excluded.name, name), "
+    + ", ".join(f"{f} = {f} + excluded.{f}" for f in TABLE_FIELDS)
+)
+_PLAYER_STATS_UPSERT = (
+    "INSERT INTO season_player_stats (season, player_uid, name, attended, appearances, goals) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (season, player_uid) DO UPDATE SET name = COALESCE(excluded.name, name), attended = attended + excluded.attended, "
+    "appearances = appearances + excluded.appearances, goals = goals + excluded.goals"
+)
+
+
+class SQLiteStorage(StorageBackend):
+    # Local file database: one row per event (keyed by its stable event_id, see event_key_for) plus
+    # indexed teams/players tables for history queries.
+    name = "sqlite"
+    supports_history = True
+    supports_seasons = True
+    supports_log_append = True
+
+    def __init__(self, path, pool_size=4, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._last_saved_at = None
+        self._last_save_seconds = None
+        self._last_error = None
+        self._writes = 0
+        self._lock = threading.Lock()
+        with self.connection() as conn:
+            conn.executescript(SQLITE_SCHEMA + SEASON_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def save(self, snapshot, label=None):
+        started = time.perf_counter()
+        record = to_json_record(snapshot)
+        match_log = record.pop('match_log', None) or []  # lives in its own table, see append_match_log()
+        now = datetime.datetime.now().isoformat(timespec='seconds')
+        try:
+            with self.connection() as conn, conn:
+                event_key = event_key_for(record)
+                conn.execute(
+                    "INSERT INTO events (event_key, event_date, title, snapshot, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (event_key) DO UPDATE SET event_date = excluded.event_date, title = excluded.title, "
+                    "snapshot = excluded.snapshot, updated_at = excluded.updated_at",
+                    (event_key, record.get('event_date'), record.get('event_title'), pack(record), now)
+                )
+                event_id = conn.execute("SELECT id FROM events WHERE event_key = ?", (event_key,)).fetchone()[0]
+                self._insert_log(conn, event_id, match_log)
+                conn.execute("DELETE FROM players WHERE event_id = ?", (event_id,))
+                conn.execute("DELETE FROM teams WHERE event_id = ?", (event_id,))
+                teams = record.get('teams_data') or []
+                conn.executemany(
+                    "INSERT INTO teams (event_id, team_id, position, name, color_hex) VALUES (?, ?, ?, ?, ?)",
+                    [(event_id, t['id'], pos, t.get('team_name_display'), t.get('team_color_hex')) for pos, t in enumerate(teams)]
+                )
+                conn.executemany(
+                    "INSERT INTO players (event_id, team_id, player_id, name, is_gk, paid) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(event_id, t['id'], p['id'], p['name'], int(bool(p.get('is_gk'))), int(bool(p.get('paid'))))
+                     for t in teams for p in t.get('players', [])]
+                )
+        except sqlite3.Error as exc:
+            with self._lock:
+                self._last_error = str(exc)
+            raise
+        with self._lock:
+            self._writes += 1
+            self._last_saved_at = datetime.datetime.now()
+            self._last_save_seconds = time.perf_counter() - started
+            self._last_error = None
+
+    def load_latest(self):
+        with self.connection() as conn:
+            row = conn.execute("SELECT id, snapshot FROM events ORDER BY updated_at DESC, id DESC LIMIT 1").fetchone()
+            return self._snapshot_with_log(conn, row)
+
+    def load_event(self, event_key):
+        with self.connection() as conn:
+            row = conn.execute("SELECT id, snapshot FROM events WHERE event_key = ?", (event_key,)).fetchone()
+            return self._snapshot_with_log(conn, row)
+
+    def current_revision(self):
+        # Changes with every save and every appended match log row (updated_at alone only has seconds).
+        with self.connection() as conn:
+            row = conn.execute("SELECT (SELECT MAX(updated_at) FROM events) AS saved, (SELECT MAX(seq) FROM match_log) AS logged").fetchone()
+        return (self._writes, row['saved'], row['logged'])
+
+    def _snapshot_with_log(self, conn, row):
+        if row is None:
+            return {}
+        snapshot = unpack(row['snapshot'])
+        snapshot['match_log'] = [json.loads(r['payload']) for r in conn.execute("SELECT payload FROM match_log WHERE event_id = ? ORDER BY seq", (row['id'],))]
+        return snapshot
+
+    @staticmethod
+    def _insert_log(conn, event_id, events):
+        # Rows already stored are skipped, so a full save after appends writes nothing here.
+        conn.executemany("INSERT OR IGNORE INTO match_log (event_id, log_id, payload) VALUES (?, ?, ?)",
+                         [(event_id, e['id'], json.dumps(e, ensure_ascii=False)) for e in events])
+
+    def append_match_log(self, event_key, events):
+        # False when the event has no row yet (never saved): the caller falls back to a full save.
+        with self.connection() as conn, conn:
+            row = conn.execute("SELECT id FROM events WHERE event_key = ?", (event_key,)).fetchone()
+            if row is None:
+                return False
+            self._insert_log(conn, row['id'], events)
+        with self._lock:
+            self._writes += 1
+        return True
+
+    def list_events(self, limit=50):
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT e.event_key, e.event_date, e.title, e.updated_at, "
+                "(SELECT COUNT(*) FROM players p WHERE p.event_id = e.id) AS player_count "
+                "FROM events e ORDER BY e.event_date DESC, e.updated_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_player_history(self, name, limit=50):
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT e.event_date, e.title, p.team_id, t.name AS team_name, p.is_gk, p.paid FROM players p JOIN events e ON e.id = p.event_id "
+                "LEFT JOIN teams t ON t.event_id = p.event_id AND t.team_id = p.team_id "
+                "WHERE p.name = ? COLLATE NOCASE ORDER BY e.event_date DESC LIMIT ?", (name, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    # --- Season ---
+    def record_result(self, season, event_key, key, result, rosters, team_names=None, player_names=None):
+        # result: LeagueTable result dict, or None to take the match's result back out.
+        # rosters: {team_id: [player uid, ...]} for the whole event (attendance + appearances).
+        team_names, player_names = team_names or {}, player_names or {}
+        now = datetime.datetime.now().isoformat(timespec='seconds')
+        with self.connection() as conn, conn:
+            row = conn.execute("SELECT result FROM season_results WHERE season = ? AND event_key = ? AND match_key = ?",
+                               (season, event_key, key)).fetchone()
+            previous = json.loads(row['result']) if row else None
+            if previous is None and result is None:
+                return
+            if result is None:
+                conn.execute("DELETE FROM season_results WHERE season = ? AND event_key = ? AND match_key = ?", (season, event_key, key))
+            else:
+                conn.execute(
+                    "INSERT INTO season_results (season, event_key, match_key, home_id, away_id, home_goals, away_goals, result, recorded_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (season, event_key, match_key) DO UPDATE SET "
+                    "home_goals = excluded.home_goals, away_goals = excluded.away_goals, result = excluded.result, recorded_at = excluded.recorded_at",
+                    (season, event_key, key, result['home'], result['away'], result['home_goals'], result['away_goals'], json.dumps(result), now)
+                )
+            team_deltas, h2h_rows = {}, []
+            for res, sign in ((previous, -1), (result, 1)):
+                if res is None: continue
+                deltas = result_deltas(res['home'], res['away'], res['home_goals'], res['away_goals'], sign)
+                for team_id, delta in deltas.items():
+                    total = team_deltas.setdefault(team_id, dict.fromkeys(TABLE_FIELDS, 0))
+                    for field, value in delta.items(): total[field] += value
+                h2h_rows += [(season, a, b, deltas[a]['points'], deltas[a]['goals_for'], deltas[a]['goals_against'])
+                             for a, b in ((res['home'], res['away']), (res['away'], res['home']))]
+            conn.executemany(_STANDINGS_UPSERT, [(season, tid, team_names.get(tid), *(d[f] for f in TABLE_FIELDS)) for tid, d in team_deltas.items()])
+            conn.executemany(
+                "INSERT INTO season_head_to_head (season, team_id, opponent_id, points, goals_for, goals_against) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (season, team_id, opponent_id) DO UPDATE SET points = points + excluded.points, "
+                "goals_for = goals_for + excluded.goals_for, goals_against = goals_against + excluded.goals_against", h2h_rows
+            )
+            stat_rows = [(season, uid, player_names.get(uid), 0, d['appearances'], d['goals'])
+                         for uid, d in player_stat_deltas(result, previous, rosters).items()]
+            # Attendance counts once per event: only players without an attendance row yet get +1.
+            if result is not None:
+                for uid in {uid for team_id in (result['home'], result['away']) for uid in rosters.get(team_id, ())}:
+                    if conn.execute("INSERT OR IGNORE INTO season_attendance (season, event_key, player_uid) VALUES (?, ?, ?)",
+                                    (season, event_key, uid)).rowcount:
+                        stat_rows.append((season, uid, player_names.get(uid), 1, 0, 0))
+            # ...and is taken back once none of their team's results for the event is left.
+            if previous is not None:
+                kept = {str(team_id) for r in conn.execute("SELECT home_id, away_id FROM season_results WHERE season = ? AND event_key = ?",
+                                                           (season, event_key)) for team_id in r}
+                for team_id in {previous['home'], previous['away']}:
+                    if str(team_id) in kept: continue
+                    for uid in rosters.get(team_id, ()):
+                        if conn.execute("DELETE FROM season_attendance WHERE season = ? AND event_key = ? AND player_uid = ?",
+                                        (season, event_key, uid)).rowcount:
+                            stat_rows.append((season, uid, player_names.get(uid), -1, 0, 0))
+            conn.executemany(_PLAYER_STATS_UPSERT, stat_rows)
+
+    def season_standings(self, season):
+        with self.connection() as conn:
+            rows = [dict(r) for r in conn.execute("SELECT * FROM season_standings WHERE season = ?", (season,))]
+            h2h = {(r['team_id'], r['opponent_id']): dict(r) for r in conn.execute(
+                "SELECT team_id, opponent_id, points, goals_for, goals_against FROM season_head_to_head WHERE season = ?", (season,))}
+        return rank_standings([r for r in rows if r['played']], h2h)
+
+    def season_player_stats(self, season, limit=50):
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT player_uid, name, attended, appearances, goals FROM season_player_stats WHERE season = ? "
+                "ORDER BY goals DESC, appearances DESC LIMIT ?", (season, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def list_seasons(self):
+        with self.connection() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT season FROM season_standings ORDER BY season")]
+
+    def latency(self):
+        with self._lock:
+            return {'save': self._last_save_seconds}
+
+    def describe_status(self):
+        with self._lock:
+            if self._last_error:
+                return f"⚠️ Local save failed: {self._last_error}"
+            if self._last_saved_at:
+                return f"💾 Saved locally: {self._last_saved_at.strftime('%H:%M:%S')}"
+        return None
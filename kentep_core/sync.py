@@ -0,0 +1,311 @@
+# Kentep League Manager - background cloud sync
+import atexit
+import datetime
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from kentep_core.state import json_default
+
+JSONBIN_BASE_URL = "https://api.jsonbin.io/v3"
+
+DEFAULT_DEBOUNCE_SECONDS = 1.5
+DEFAULT_MAX_WAIT_SECONDS = 10.0
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_MAX = 30.0
+DEFAULT_TIMEOUT = 10
+
+
+class CloudSyncWorker:
+    # One worker per bin. The script thread only serializes and hands over a snapshot;
+    # the worker thread debounces bursts into a single PUT and retries with backoff.
+    def __init__(self, api_key, bin_id, base_url=JSONBIN_BASE_URL, debounce_seconds=DEFAULT_DEBOUNCE_SECONDS,
+                 max_wait_seconds=DEFAULT_MAX_WAIT_SECONDS, backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX,
+                 timeout=DEFAULT_TIMEOUT):
+        self.bin_id = bin_id
+        self.base_url = base_url.rstrip('/')
+        self.debounce_seconds = debounce_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.on_written = None  # called on the worker thread with (`tag`, response ETag or None) of every confirmed PUT
+
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.headers.update({'Content-Type': 'application/json', 'X-Master-Key': api_key})
+
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._pending = None
+        self._in_flight = False
+        self._dirty_since = None
+        self._failed = None  # last job refused with a permanent error, kept for retry_failed()
+        self._atexit_registered = False
+
+        self.submitted_count = 0
+        self.written_count = 0
+        self.written_seq = 0  # submit() number of the newest confirmed snapshot
+        self.coalesced_count = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_success_at = None
+        self.last_latency = None
+        self.last_fetch_latency = None
+
+    @property
+    def bin_url(self):
+        return f"{self.base_url}/b/{self.bin_id}"
+
+    def start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name=f"cloud-sync-{self.bin_id}", daemon=True)
+                self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+        return self
+
+    def stop(self, flush_timeout=5.0):
+        self.flush(timeout=flush_timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=flush_timeout)
+
+    def submit(self, snapshot, bin_name=None, tag=None):
+        # -> sequence number of this snapshot; it is written once `written_seq` reaches it.
+        payload = json.dumps(snapshot, default=json_default)
+        with self._cond:
+            return self._queue(payload, bin_name, tag)
+
+    def retry_failed(self):
+        # Sends the snapshot a permanent error stopped again (e.g. after fixing the key). None if there is none.
+        with self._cond:
+            job, self._failed = self._failed, None
+            if job is None:
+                return None
+            if self._pending is not None:
+                return self._pending['seq']  # a newer snapshot is already on its way
+            return self._queue(job['payload'], job['bin_name'], job['tag'])
+
+    def _queue(self, payload, bin_name, tag):
+        now = time.monotonic()
+        first_submitted_at = now
+        if self._pending is not None:
+            self.coalesced_count += 1
+            first_submitted_at = self._pending['first_submitted_at']
+        if self._dirty_since is None:
+            self._dirty_since = now
+        self.submitted_count += 1
+        self._pending = {'payload': payload, 'bin_name': bin_name, 'tag': tag, 'seq': self.submitted_count,
+                         'submitted_at': now, 'first_submitted_at': first_submitted_at}
+        self._cond.notify_all()
+        return self.submitted_count
+
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending is not None or self._in_flight:
+                if self._thread is None or not self._thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def fetch_latest(self):
+        return self.fetch_if_changed()[0]
+
+    def fetch_if_changed(self, etag=None):
+        # Conditional GET: None when the bin still matches `etag` (304), else (record, new ETag or None).
+        started = time.monotonic()
+        headers = {'If-None-Match': etag} if etag else {}
+        response = self.session.get(f"{self.bin_url}/latest", headers=headers, timeout=self.timeout)
+        self.last_fetch_latency = time.monotonic() - started
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        return response.json().get('record', {}), response.headers.get('ETag')
+
+    def status(self):
+        with self._cond:
+            return {
+                'pending': self._pending is not None or self._in_flight,
+                'lag_seconds': 0.0 if self._dirty_since is None else time.monotonic() - self._dirty_since,
+                'submitted': self.submitted_count,
+                'written': self.written_count,
+                'written_seq': self.written_seq,
+                'failed': self._failed is not None,
+                'coalesced': self.coalesced_count,
+                'consecutive_failures': self.consecutive_failures,
+                'last_error': self.last_error,
+                'last_success_at': self.last_success_at,
+                'last_latency': self.last_latency,
+                'last_fetch_latency': self.last_fetch_latency,
+            }
+
+    def describe_status(self):
+        s = self.status()
+        if s['failed'] and not s['pending']:
+            return f"⛔ Sync stopped: {s['last_error']} (not retried automatically)"
+        if s['consecutive_failures']:
+            return f"⚠️ Sync failed x{s['consecutive_failures']} (lag {s['lag_seconds']:.0f}s): {s['last_error']}"
+        if s['pending']:
+            return f"⏳ Syncing... (lag {s['lag_seconds']:.1f}s)"
+        if s['last_success_at']:
+            return f"✅ Last sync: {s['last_success_at'].strftime('%H:%M:%S')} ({s['last_latency'] * 1000:.0f} ms)"
+        return None
+
+    # --- Worker thread ---
+    def _take_next_job(self):
+        with self._cond:
+            while self._pending is None and not self._stopping:
+                self._cond.wait()
+            if self._pending is None:
+                return None
+            # Debounce: wait until no newer snapshot has arrived for `debounce_seconds`, but no longer than
+            # `max_wait_seconds` after the first one, so a steady stream of edits still gets written.
+            while not self._stopping:
+                deadline = min(self._pending['submitted_at'] + self.debounce_seconds,
+                               self._pending['first_submitted_at'] + self.max_wait_seconds)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            job, self._pending = self._pending, None
+            self._in_flight = True
+            return job
+
+    def _put(self, job):
+        headers = {'X-Bin-Name': job['bin_name']} if job['bin_name'] else {}
+        response = self.session.put(self.bin_url, data=job['payload'].encode('utf-8'), headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.headers.get('ETag')
+
+    def _run(self):
+        while True:
+            job = self._take_next_job()
+            if job is None:
+                return
+            attempt = 0
+            while True:
+                started = time.monotonic()
+                try:
+                    etag = self._put(job)
+                except requests.exceptions.RequestException as exc:
+                    status_code = getattr(exc.response, 'status_code', None)
+                    with self._cond:
+                        self.consecutive_failures += 1
+                        self.last_error = f"HTTP {status_code}" if status_code else type(exc).__name__
+                        # 4xx other than 429 will not get better by retrying (bad key, missing bin).
+                        permanent = status_code is not None and 400 <= status_code < 500 and status_code != 429
+                        if permanent:
+                            self._failed = job
+                            if self._pending is None:
+                                self._dirty_since = None
+                        if permanent or self._stopping or self._pending is not None:
+                            # A newer snapshot supersedes this one; it is retried as part of that write.
+                            self._in_flight = False
+                            self._cond.notify_all()
+                            break
+                        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                        attempt += 1
+                        self._cond.wait(delay)
+                        if self._pending is not None or self._stopping:
+                            self._in_flight = False
+                            self._cond.notify_all()
+                            break
+                    continue
+                with self._cond:
+                    self.written_count += 1
+                    self.written_seq = max(self.written_seq, job['seq'])
+                    self._failed = None
+                    self.consecutive_failures = 0
+                    self.last_error = None
+                    self.last_latency = time.monotonic() - started
+                    self.last_success_at = datetime.datetime.now()
+                    self._in_flight = False
+                    if self._pending is None:
+                        self._dirty_since = None
+                    self._cond.notify_all()
+                if self.on_written is not None and job['tag'] is not None:
+                    self.on_written(job['tag'], etag)
+                break
+
+
+class DeltaSyncClient:
+    # Talks to kentep_core.syncserver. Calls run on the script thread: a patch only carries the changed
+    # fields, so it is small enough not to need the background worker.
+    def __init__(self, base_url, doc_id, token=None, timeout=DEFAULT_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.doc_id = doc_id
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.headers.update({'Content-Type': 'application/json'})
+        if token:
+            self.session.headers['X-Sync-Token'] = token
+        self._lock = threading.Lock()
+        self.last_latency = None
+        self.last_error = None
+        self.last_success_at = None
+        self.bytes_sent = 0
+
+    @property
+    def doc_url(self):
+        return f"{self.base_url}/docs/{self.doc_id}"
+
+    def _request(self, method, url, ok=(200,), **kwargs):
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            if response.status_code not in ok:
+                response.raise_for_status()
+        except requests.exceptions.RequestException as exc:
+            status_code = getattr(exc.response, 'status_code', None)
+            with self._lock:
+                self.last_error = f"HTTP {status_code}" if status_code else type(exc).__name__
+            raise
+        with self._lock:
+            self.last_latency = time.monotonic() - started
+            self.last_success_at = datetime.datetime.now()
+            self.last_error = None
+        return response
+
+    def fetch(self):
+        body = self._request('GET', self.doc_url).json()
+        return body['revision'], body['doc']
+
+    def ops_since(self, revision):
+        # Revalidation: (revision, ops written after `revision`), or None when the server log no longer
+        # reaches back that far (410) and the whole document has to be fetched.
+        response = self._request('GET', f"{self.doc_url}/ops", ok=(200, 410), params={'since': revision})
+        if response.status_code == 410:
+            return None
+        body = response.json()
+        return body['revision'], body['ops']
+
+    def patch(self, base_revision, ops):
+        payload = json.dumps({'base': base_revision, 'ops': ops}, default=json_default, separators=(',', ':')).encode('utf-8')
+        with self._lock:
+            self.bytes_sent += len(payload)
+        return self._request('POST', f"{self.doc_url}/patch", ok=(200, 409), data=payload).json()
+
+    def describe_status(self):
+        with self._lock:
+            if self.last_error:
+                return f"⚠️ Sync failed: {self.last_error}"
+            if self.last_success_at:
+                return f"✅ Last sync: {self.last_success_at.strftime('%H:%M:%S')} ({self.last_latency * 1000:.0f} ms)"
+        return None
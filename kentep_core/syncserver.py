@@ -0,0 +1,124 @@
+# Kentep League Manager - small delta sync server (self-hosted, or a local stand-in for testing)
+#
+#   python -m kentep_core.syncserver --port 8765 [--file kentep-sync.json] [--token secret]
+#
+#   GET  /docs/<id>                -> {'revision', 'doc'}
+#   GET  /docs/<id>/ops?since=<n>  -> {'revision', 'ops'}         (410 when the log no longer reaches <n>)
+#   POST /docs/<id>/patch          {'base', 'ops'} -> 200 {'status': 'ok', 'revision', 'ops'}
+#                                  409 {'status': 'conflict' | 'stale', ...} (see DeltaDocument.patch)
+import argparse
+import json
+import os
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from kentep_core.delta import DeltaDocument
+
+
+class DocumentStore:
+    def __init__(self, path=None):
+        self.path = path
+        self.docs = {}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as fh:
+                for doc_id, saved in json.load(fh).items():
+                    self.docs[doc_id] = DeltaDocument(saved['doc'], saved['revision'])
+
+    def get(self, doc_id):
+        if doc_id not in self.docs:
+            self.docs[doc_id] = DeltaDocument()
+        return self.docs[doc_id]
+
+    def save(self):
+        # Called with the lock held. The op log is not kept: after a restart clients resync from the document.
+        if not self.path: return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump({doc_id: {'doc': d.doc, 'revision': d.revision} for doc_id, d in self.docs.items()}, fh, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+def make_handler(store, token=None):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _route(self):
+            if token and self.headers.get('X-Sync-Token') != token:
+                self._send(401, {'error': 'bad token'})
+                return None
+            url = urllib.parse.urlsplit(self.path)
+            parts = [urllib.parse.unquote(p) for p in url.path.strip('/').split('/')]
+            if len(parts) < 2 or parts[0] != 'docs':
+                self._send(404, {'error': 'not found'})
+                return None
+            return parts[1], parts[2:], urllib.parse.parse_qs(url.query)
+
+        def do_GET(self):
+            route = self._route()
+            if route is None: return
+            doc_id, rest, query = route
+            with store.lock:
+                doc = store.get(doc_id)
+                if not rest:
+                    return self._send(200, {'revision': doc.revision, 'doc': doc.doc})
+                if rest == ['ops']:
+                    since = int(query.get('since', ['0'])[0])
+                    ops = doc.ops_since(since)
+                    if ops is None:
+                        return self._send(410, {'revision': doc.revision})
+                    return self._send(200, {'revision': doc.revision, 'ops': ops})
+            self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            route = self._route()
+            if route is None: return
+            doc_id, rest, _ = route
+            if rest != ['patch']:
+                return self._send(404, {'error': 'not found'})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+                base, ops = int(body['base']), list(body['ops'])
+            except (ValueError, KeyError, TypeError):
+                return self._send(400, {'error': 'expected {"base": <revision>, "ops": [...]}'})
+            with store.lock:
+                result = store.get(doc_id).patch(base, ops)
+                if result['status'] == 'ok' and ops:
+                    store.save()
+            self._send(200 if result['status'] == 'ok' else 409, result)
+
+    return Handler
+
+
+def serve(host='127.0.0.1', port=8765, path=None, token=None):
+    return ThreadingHTTPServer((host, port), make_handler(DocumentStore(path), token))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m kentep_core.syncserver", description="Delta sync server for Kentep League Manager.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--file', help="keep documents in this JSON file across restarts")
+    parser.add_argument('--token', help="require this X-Sync-Token header")
+    args = parser.parse_args(argv)
+    server = serve(args.host, args.port, args.file, args.token)
+    print(f"Kentep sync server on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+# Kentep League Manager - forming teams from the player pools
+import random
+
+from kentep_core.players import DEFAULT_RATING
+
+BASIC_COLORS_LIMITED = {
+    "Blue": "#0000FF", "Yellow": "#FFFF00", "White": "#FFFFFF",
+    "Black": "#000000", "Red": "#FF0000"
+}
+BASIC_COLOR_HEX_LIST = list(BASIC_COLORS_LIMITED.values())
+PLAYER_ID_BITS = 48
+
+
+def generate_team_id(index):
+    if index < 26: return chr(ord('A') + index)
+    return chr(ord('A') + (index // 26) - 1) + chr(ord('A') + (index % 26))
+
+
+def generate_random_basic_color_hex(rng=random):
+    return rng.choice(BASIC_COLOR_HEX_LIST)
+
+
+def new_team(index, rng=random):
+    team_id = generate_team_id(index)
+    return {"id": team_id, "team_name_display": f"Team {team_id}", "team_color_hex": generate_random_basic_color_hex(rng), "players": []}
+
+
+def new_player_id(taken=(), rng=random):
+    # Random, never derived from a position, so it survives moves and removals; redrawn on a clash
+    # with an id already in use (`taken`: any container of ids).
+    while True:
+        player_id = f"p{rng.getrandbits(PLAYER_ID_BITS):012x}"
+        if player_id not in taken:
+            return player_id
+
+
+def form_teams(outfield, goalkeepers, num_teams, balance=True, together=(), apart=(), seed=None, time_budget=None, rng=None):
+    # outfield/goalkeepers: parse_player_entry() dicts. Returns (teams, distribution report or None).
+    # Without balancing, players are dealt round-robin after a shuffle, one keeper per team. Keepers beyond
+    # one per team (the lowest rated when balancing) play outfield, listed with position 'GK'.
+    rng = rng or random.Random(seed)  # every shuffle and id follows the seed
+    teams = [new_team(i, rng) for i in range(num_teams)]
+    goalkeepers = list(goalkeepers)
+    rng.shuffle(goalkeepers)
+    if balance:
+        goalkeepers.sort(key=lambda gk: -(DEFAULT_RATING if gk.get('rating') is None else gk['rating']))
+    outfield = list(outfield) + [dict(gk, position='GK') for gk in goalkeepers[num_teams:]]
+    goalkeepers = goalkeepers[:num_teams]
+    if balance:
+        from kentep_core.distribution import DEFAULT_TIME_BUDGET, distribute_balanced, assign_goalkeepers  # numpy
+        assignment, report = distribute_balanced(outfield, num_teams, together, apart, seed=seed,
+                                                 time_budget=DEFAULT_TIME_BUDGET if time_budget is None else time_budget)
+        gk_assignment = assign_goalkeepers(goalkeepers, report['team_totals'])
+    else:
+        rng.shuffle(outfield)
+        assignment = [idx % num_teams for idx in range(len(outfield))]
+        report = None
+        gk_assignment = list(zip(range(num_teams), goalkeepers))
+
+    taken = set()
+    for entry, team_index in zip(outfield, assignment):
+        player_id = new_player_id(taken, rng); taken.add(player_id)
+        teams[team_index]['players'].append({'id': player_id, 'name': entry['name'], 'is_gk': False, 'paid': False,
+                                             'rating': entry['rating'], 'position': entry['position']})
+    for team_index, entry in gk_assignment:
+        player_id = new_player_id(taken, rng); taken.add(player_id)
+        teams[team_index]['players'].append({'id': player_id, 'name': entry['name'], 'is_gk': True, 'paid': False,
+                                             'rating': entry['rating'], 'position': 'GK'})
+    return teams, report
+
+
+def register_team_players(teams, registry, player_ids=None):
+    # Links players (all, or those in `player_ids`) to a canonical registry uid. A player keeps a uid that
+    # still belongs to its name; two players of one event never share one, so a second "Budi" gets the
+    # next known Budi or a new one. Returns (new name, known name) hints for names that are new but
+    # look like a known player.
+    players = [p for team in teams for p in team['players']]
+    todo = [p for p in players if player_ids is None or p['id'] in player_ids]
+    todo_ids = {id(p) for p in todo}
+    taken = {p.get('player_uid') for p in players if id(p) not in todo_ids}
+    hints = []
+    for player in todo:
+        if registry.lookup(player['name']) is None:
+            hints += [(player['name'], registry.display_name(uid)) for uid, _ in registry.similar(player['name'], limit=1)]
+        uid = player.get('player_uid')
+        if uid is None or uid in taken or uid not in registry.candidates(player['name']):
+            uid = registry.register(player['name'], exclude=taken)
+        player['player_uid'] = uid
+        taken.add(uid)
+    return hints
@@ -0,0 +1,51 @@
+# Kentep League Manager - one shared, read-only copy of the event for the public viewer
+import threading
+import time
+
+DEFAULT_CHECK_SECONDS = 5.0
+
+
+class SharedSnapshot:
+    # Held once per process (st.cache_resource) and read by every viewer session. Viewers call current()
+    # on each run: the backend is asked for its revision (cheap) at most every `check_seconds`, and the
+    # snapshot is only loaded and `build` (snapshot -> derived, read-only view) only rerun when that
+    # revision moved. While one viewer refreshes, the others keep getting the previous view.
+    def __init__(self, revision, load, build, check_seconds=DEFAULT_CHECK_SECONDS):
+        self._revision = revision   # () -> revision marker, or None when the backend has none
+        self._load = load           # () -> snapshot dict
+        self._build = build
+        self.check_seconds = check_seconds
+        self._refresh_lock = threading.Lock()
+        self.view = None
+        self.revision = None
+        self.checked_at = None
+        self.loads = 0
+        self.last_error = None
+
+    def current(self):
+        view = self.view
+        if view is not None and time.monotonic() - self.checked_at < self.check_seconds:
+            return view
+        # The first viewer waits for the initial load; later ones never queue behind a refresh.
+        if not self._refresh_lock.acquire(blocking=view is None):
+            return view
+        try:
+            if self.view is not None and time.monotonic() - self.checked_at < self.check_seconds:
+                return self.view  # refreshed while this viewer was waiting for the lock
+            self._refresh()
+            return self.view
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self):
+        try:
+            revision = self._revision()
+            # No revision marker: reload on every check instead.
+            if self.view is None or revision is None or revision != self.revision:
+                self.view = self._build(self._load())
+                self.revision = revision
+                self.loads += 1
+            self.last_error = None
+        except Exception as exc:  # the viewer keeps showing the last good copy
+            self.last_error = str(exc) or type(exc).__name__
+        self.checked_at = time.monotonic()
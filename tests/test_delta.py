@@ -0,0 +1,91 @@
+# Kentep League Manager - delta sync: two organizers editing one document on a syncserver
+# Run from the repo root: python -m pytest tests
+import copy
+import threading
+
+import pytest
+
+from kentep_core.event import build_event, default_event_settings
+from kentep_core.ledger import PaymentLedger
+from kentep_core.storage import DeltaStorage, to_json_record
+from kentep_core.sync import DeltaSyncClient
+from kentep_core.syncserver import serve
+
+
+@pytest.fixture
+def server_url():
+    server = serve(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+class Organizer:
+    # One app session: the server revision and view it last saw, plus its own edited snapshot.
+    def __init__(self, url, doc_id='event'):
+        self.storage = DeltaStorage(DeltaSyncClient(url, doc_id))
+        self.revision, self.base = self.storage.fetch()
+        self.snapshot = self.storage.load_latest()
+
+    def sync(self, held_paths=()):
+        result = self.storage.sync(self.revision, self.base, self.snapshot, held_paths)
+        self.revision, self.base, self.snapshot = result['revision'], result['base'], copy.deepcopy(result['local'])
+        return result
+
+
+@pytest.fixture
+def organizers(server_url):
+    snapshot, _ = build_event(default_event_settings(), [{'name': f"P{i}", 'rating': None, 'position': None} for i in range(8)], [],
+                              balance=False, seed=1)
+    first = Organizer(server_url)
+    first.snapshot = dict(to_json_record(snapshot), payment_ledger=[])
+    first.sync()
+    return first, Organizer(server_url)
+
+
+def players(snapshot):
+    return [p for team in snapshot['teams_data'] for p in team['players']]
+
+
+def test_non_overlapping_edits_merge(organizers):
+    a, b = organizers
+    a.snapshot['event_place'] = "Lapangan Baru"
+    renamed = b.snapshot['teams_data'][0]['players'][1]
+    renamed['name'] = "Renamed"
+    moved = b.snapshot['teams_data'][0]['players'].pop(2)
+    b.snapshot['teams_data'][1]['players'].append(moved)
+    assert a.sync()['conflicts'] == []
+    result = b.sync()
+    assert result['conflicts'] == [] and result['remote'] > 0
+    stored = b.storage.load_latest()
+    assert stored['event_place'] == "Lapangan Baru"
+    assert {p['id']: p['name'] for p in players(stored)}[renamed['id']] == "Renamed"
+    assert moved['id'] in [p['id'] for p in stored['teams_data'][1]['players']]
+    assert b.snapshot == stored
+
+
+def test_concurrent_ledger_appends_are_both_kept(organizers):
+    a, b = organizers
+    paid_by_a, paid_by_b = players(a.snapshot)[0]['id'], players(b.snapshot)[1]['id']
+    PaymentLedger(a.snapshot['payment_ledger']).record(paid_by_a, 50000)
+    PaymentLedger(b.snapshot['payment_ledger']).record(paid_by_b, 25000)
+    assert a.sync()['conflicts'] == []
+    assert b.sync()['conflicts'] == []
+    ledger = b.storage.load_latest()['payment_ledger']
+    assert sorted((e['player_id'], e['amount']) for e in ledger) == sorted([(paid_by_a, 50000.0), (paid_by_b, 25000.0)])
+    assert len({e['id'] for e in ledger}) == 2
+
+
+def test_same_field_conflict_keeps_the_server_copy_until_resolved(organizers):
+    a, b = organizers
+    a.snapshot['event_place'] = "Field A"
+    b.snapshot.update(event_place="Field B", event_title="New title")
+    assert a.sync()['conflicts'] == []
+    result = b.sync()
+    assert result['conflicts'] == [{'path': '/event_place', 'theirs': "Field A", 'mine': "Field B"}]
+    stored = b.storage.load_latest()
+    assert stored['event_place'] == "Field A" and stored['event_title'] == "New title"
+    assert b.snapshot['event_place'] == "Field B"  # still held locally
+    # "Keep mine": send it again without holding the path.
+    assert b.sync()['conflicts'] == []
+    assert b.storage.load_latest()['event_place'] == "Field B"
@@ -0,0 +1,38 @@
+# Kentep League Manager - fixture scheduling and event settings validation
+# Run from the repo root: python -m pytest tests
+import datetime
+
+import pytest
+
+from kentep_core.cli import build_parser
+from kentep_core.event import coerce_event_settings
+from kentep_core.fixtures import schedule_fixtures
+
+KICK_OFF = datetime.datetime(2026, 1, 10, 17, 0)
+
+
+def test_schedule_keeps_rest_between_games():
+    schedule = schedule_fixtures([1, 2, 3, 4], KICK_OFF, 10, min_rest_minutes=5)
+    assert len(schedule.matches) == 6
+    last_end = {}
+    for m in schedule.matches:
+        for team in (m.home_id, m.away_id):
+            if team in last_end:
+                assert m.start >= last_end[team] + datetime.timedelta(minutes=5)
+            last_end[team] = m.start + datetime.timedelta(minutes=10)
+
+
+def test_zero_length_slot_is_rejected():
+    # game + changeover of 0 minutes never advances the clock past the rest period.
+    with pytest.raises(ValueError):
+        schedule_fixtures([1, 2, 3, 4], KICK_OFF, 0, min_rest_minutes=5)
+    with pytest.raises(ValueError):
+        schedule_fixtures([1, 2, 3, 4], KICK_OFF, 10, changeover_minutes=-10)
+
+
+def test_event_settings_and_cli_need_a_positive_duration():
+    with pytest.raises(ValueError):
+        coerce_event_settings({'game_duration': 0})
+    assert coerce_event_settings({'game_duration': "12"})['game_duration'] == 12
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(['event', 'players.txt', '--duration', '0'])
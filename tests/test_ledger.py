@@ -0,0 +1,83 @@
+# Kentep League Manager - payment ledger, running summary and bank/WhatsApp imports
+# Run from the repo root: python -m pytest tests
+import pytest
+
+from kentep_core.ledger import (
+    PaymentLedger, LedgerSummary, REFUND, EXACT_MATCH, PREFIX_MATCH_SCORE, book_payments, import_entries, iter_payment_matches, roster_name_matcher
+)
+from kentep_core.registry import PlayerRegistry
+from kentep_core.rosters import index_players
+
+PRICE_PLAYER, PRICE_GK = 50000.0, 25000.0
+
+
+@pytest.fixture
+def teams():
+    return [
+        {'id': 1, 'players': [{'id': 'p1', 'name': "Andi Pratama"}, {'id': 'p2', 'name': "Budi Santoso"}]},
+        {'id': 2, 'players': [{'id': 'p3', 'name': "Citra"}, {'id': 'p4', 'name': "Dedi", 'is_gk': True}]},
+    ]
+
+
+def summary_for(teams, ledger):
+    return LedgerSummary(teams, PRICE_PLAYER, PRICE_GK, ledger)
+
+
+def totals(summary):
+    return summary.collected_total, dict(summary.paid_count['team']), summary.rows('role')
+
+
+def test_partial_payments_add_up(teams):
+    ledger = PaymentLedger()
+    summary = summary_for(teams, ledger)
+    players = index_players(teams)
+    assert book_payments(ledger, summary, players, [('p1', 20000, 'payment', "dp")], 'manual') == 1
+    assert summary.outstanding('p1') == 30000.0 and not summary.is_paid('p1') and not teams[0]['players'][0]['paid']
+    book_payments(ledger, summary, players, [('p1', 30000, 'payment', "lunas"), ('p4', 25000, 'payment', "")], 'manual')
+    assert summary.outstanding('p1') == 0.0 and teams[0]['players'][0]['paid']
+    assert summary.collected_total == 75000.0 and summary.paid_count['team'] == {1: 1, 2: 1}
+    assert totals(summary) == totals(summary_for(teams, ledger))
+
+
+def test_refund_reopens_the_bill(teams):
+    ledger = PaymentLedger()
+    summary = summary_for(teams, ledger)
+    players = index_players(teams)
+    book_payments(ledger, summary, players, [('p3', 50000, 'payment', ""), ('p3', 10000, REFUND, "salah transfer")], 'manual')
+    assert ledger.balance('p3') == 40000.0 and summary.outstanding('p3') == 10000.0
+    assert not summary.is_paid('p3') and not teams[1]['players'][0]['paid']
+    assert summary.collected_total == 40000.0 and summary.paid_count['team'][2] == 0
+    # Unknown players and non-positive amounts are skipped.
+    assert book_payments(ledger, summary, players, [('nobody', 50000, 'payment', ""), ('p3', 0, 'payment', "")], 'manual') == 0
+
+
+def test_catch_up_applies_only_new_events(teams):
+    ledger = PaymentLedger()
+    summary = summary_for(teams, ledger)
+    ledger.record('p1', 50000)
+    ledger.record('p2', 20000)
+    ledger.record('p1', 5000, kind=REFUND)
+    summary.catch_up()
+    assert summary.applied == 3
+    assert totals(summary) == totals(summary_for(teams, ledger))
+    summary.catch_up()
+    assert summary.collected_total == 65000.0
+    ledger.record('p4', 25000)
+    summary.catch_up()
+    assert totals(summary) == totals(summary_for(teams, ledger)) and summary.paid_count['role']['gk'] == 1
+
+
+def test_only_exact_matches_are_booked_without_asking(teams):
+    ledger = PaymentLedger()
+    summary = summary_for(teams, ledger)
+    match = roster_name_matcher(teams, PlayerRegistry())
+    lines = ["TRSF 50.000 ANDI PRATAMA", "", "Budi 50rb", "transfer dari Joko 50rb", "Citra lunas"]
+    rows = list(iter_payment_matches(lines, match))
+    assert [(r['line'], r['player_id'], r['score']) for r in rows] == [
+        (1, 'p1', EXACT_MATCH), (3, 'p2', PREFIX_MATCH_SCORE), (4, None, 0.0), (5, 'p3', EXACT_MATCH)]
+    # The fuzzy "Budi" row waits for the organizer; a row without an amount settles the rest of the bill.
+    assert [(pid, amount) for pid, amount, _, _ in import_entries(rows, summary)] == [('p1', 50000.0), ('p3', 50000.0)]
+    ticked = import_entries(rows, summary, choices={1: {'book': True}, 2: {'book': True, 'player_id': 'p4'}})
+    assert [(pid, amount) for pid, amount, _, _ in ticked] == [('p1', 50000.0), ('p2', 50000.0), ('p4', 50000.0), ('p3', 50000.0)]
+    assert book_payments(ledger, summary, index_players(teams), ticked, 'import') == 4
+    assert all(e['source'] == 'import' for e in ledger.events)
@@ -0,0 +1,87 @@
+# Kentep League Manager - compact snapshot format: migrations, pack/unpack, reissued player ids
+# Run from the repo root: python -m pytest tests
+import json
+import zlib
+
+import pytest
+
+from kentep_core.model import PACK_MAGIC, SCHEMA_VERSION, compact_record, decode_record, pack, snapshot_from_record, unpack
+
+
+def player(pid, name, is_gk=False, paid=False, **extra):
+    return dict({'id': pid, 'name': name, 'is_gk': is_gk, 'paid': paid}, **extra)
+
+
+def payment(eid, player_id, amount, kind='payment', note=''):
+    return {'id': eid, 'player_id': player_id, 'amount': amount, 'kind': kind, 'note': note, 'source': 'manual', 'at': "2026-01-10T17:00:00"}
+
+
+SNAPSHOT = {
+    'event_title': "Kentep Cup", 'event_date': "2026-01-10", 'kick_off_time': "17:15:00", 'price_player': 50000.0, 'price_gk': 25000.0,
+    'teams_data': [
+        {'id': 't1', 'team_name_display': "Merah", 'team_color_hex': "#FF0000",
+         'players': [player('p1', "Andi", paid=True, rating=8.0, position='MF', player_uid='u1'), player('p2', "Budi", is_gk=True)]},
+        {'id': 't2', 'team_name_display': "Biru", 'team_color_hex': "#0000FF", 'players': [player('p3', "Citra")]},
+    ],
+    'payment_ledger': [payment(1, 'p1', 50000.0), payment(2, 'p1', 10000.0, 'refund', "overpaid")],
+}
+
+
+def test_v1_record_migrates_to_the_current_version():
+    assert compact_record(SNAPSHOT)['v'] == SCHEMA_VERSION == 2
+    assert 'v' not in SNAPSHOT  # a v1 record is the snapshot dict itself
+    assert decode_record(SNAPSHOT).to_snapshot() == SNAPSHOT
+    assert snapshot_from_record(compact_record(SNAPSHOT)) == SNAPSHOT
+
+
+def test_pack_round_trips():
+    packed = pack(SNAPSHOT)
+    assert packed.startswith(PACK_MAGIC)
+    assert unpack(packed) == SNAPSHOT
+    assert unpack(memoryview(packed)) == SNAPSHOT
+    assert unpack(json.dumps(SNAPSHOT)) == SNAPSHOT  # JSON text from older versions
+
+
+def test_reissued_ids_keep_their_payments():
+    snapshot = dict(SNAPSHOT, teams_data=[
+        {'id': 't1', 'team_name_display': "Merah", 'team_color_hex': "#FF0000", 'players': [player('p1', "Andi")]},
+        {'id': 't2', 'team_name_display': "Biru", 'team_color_hex': "#0000FF", 'players': [player('p1', "Dedi", paid=True)]},
+    ], payment_ledger=[payment(1, 'p1', 50000.0)])
+    restored = unpack(pack(snapshot))
+    first, second = (team['players'][0] for team in restored['teams_data'])
+    assert first['id'] == 'p1' and second['id'] != 'p1'
+    # Only the second holder of the old id is paid, so the payment follows them.
+    assert [(e['id'], e['player_id'], e['amount']) for e in restored['payment_ledger']] == [(1, second['id'], 50000.0)]
+
+
+def test_reissued_ids_with_unclear_payments_are_rebooked_from_paid_flags():
+    snapshot = dict(SNAPSHOT, teams_data=[
+        {'id': 't1', 'team_name_display': "Merah", 'team_color_hex': "#FF0000", 'players': [player('p1', "Andi", paid=True)]},
+        {'id': 't2', 'team_name_display': "Biru", 'team_color_hex': "#0000FF", 'players': [player('p1', "Dedi", is_gk=True, paid=True)]},
+    ], payment_ledger=[payment(1, 'p1', 75000.0)])
+    restored = unpack(pack(snapshot))
+    ids = [team['players'][0]['id'] for team in restored['teams_data']]
+    assert [(e['id'], e['player_id'], e['amount'], e['source']) for e in restored['payment_ledger']] == [
+        (1, ids[0], 50000.0, 'legacy'), (2, ids[1], 25000.0, 'legacy')]
+
+
+@pytest.mark.parametrize('data', [
+    b'XX' + zlib.compress(b'{}'),                    # wrong magic
+    PACK_MAGIC + b'not zlib',                        # right magic, broken body
+    PACK_MAGIC + zlib.compress(b'[1, 2]'),           # not a record
+])
+def test_unreadable_data_is_rejected(data):
+    with pytest.raises(ValueError):
+        unpack(data)
+
+
+def test_newer_versions_are_rejected():
+    with pytest.raises(ValueError, match="newer"):
+        unpack(PACK_MAGIC + zlib.compress(json.dumps({'v': SCHEMA_VERSION + 1, 'event': {}, 'teams': [], 'payments': []}).encode()))
+
+
+def test_unknown_payment_kind_is_rejected():
+    record = compact_record(SNAPSHOT)
+    record['payments'][0][3] = 7
+    with pytest.raises(ValueError, match="unknown kind"):
+        decode_record(record)
@@ -0,0 +1,43 @@
+# Kentep League Manager - season standings and player stats in SQLiteStorage
+# Run from the repo root: python -m pytest tests
+import pytest
+
+from kentep_core.storage import SQLiteStorage
+
+ROSTERS = {'A': ['a1', 'a2'], 'B': ['b1', 'b2'], 'C': ['c1']}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return SQLiteStorage(str(tmp_path / "kentep.db"))
+
+
+def result(home, away, home_goals, away_goals, scorers=None):
+    return {'home': home, 'away': away, 'home_goals': home_goals, 'away_goals': away_goals, 'scorers': scorers or {}}
+
+
+def stats(storage):
+    return {row['player_uid']: (row['attended'], row['appearances'], row['goals']) for row in storage.season_player_stats("2026")}
+
+
+def test_record_then_clear_round_trips(storage):
+    storage.record_result("2026", "ev1", "1", result('A', 'B', 2, 1, {'a1': 2, 'b2': 1}), ROSTERS)
+    storage.record_result("2026", "ev1", "2", result('A', 'C', 0, 0), ROSTERS)
+    assert [row['team_id'] for row in storage.season_standings("2026")] == ['A', 'C', 'B']
+    assert stats(storage)['a1'] == (1, 2, 2) and stats(storage)['b1'] == (1, 1, 0)
+
+    storage.record_result("2026", "ev1", "1", None, ROSTERS)
+    # A still has its draw with C, so only B's players lose the event's attendance.
+    assert stats(storage)['a1'] == (1, 1, 0) and stats(storage)['b1'] == (0, 0, 0)
+    assert {row['team_id'] for row in storage.season_standings("2026")} == {'A', 'C'}
+
+    storage.record_result("2026", "ev1", "2", None, ROSTERS)
+    assert storage.season_standings("2026") == []
+    assert set(stats(storage).values()) == {(0, 0, 0)}
+
+
+def test_attendance_counts_once_per_event(storage):
+    storage.record_result("2026", "ev1", "1", result('A', 'B', 1, 0), ROSTERS)
+    storage.record_result("2026", "ev1", "2", result('B', 'A', 1, 1), ROSTERS)
+    storage.record_result("2026", "ev2", "1", result('A', 'C', 3, 0), ROSTERS)
+    assert stats(storage)['a2'] == (2, 3, 0) and stats(storage)['b1'] == (1, 2, 0)
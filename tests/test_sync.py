@@ -0,0 +1,178 @@
+# Kentep League Manager - CloudSyncWorker against a jsonbin stand-in (http.server)
+# Run from the repo root: python -m pytest tests
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from kentep_core.storage import JsonBinStorage
+from kentep_core.sync import CloudSyncWorker
+
+
+class FakeJsonBin:
+    # PUT /b/<id> stores the record, GET /b/<id>/latest returns it. `fail_puts` answers that many PUTs
+    # with `fail_status` (503 by default).
+    def __init__(self):
+        self.record = {}
+        self.puts = []
+        self.fail_puts = 0
+        self.fail_status = 503
+        self.lock = threading.Lock()
+        bin_ = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=None):
+                data = json.dumps(body).encode() if body is not None else b''
+                self.send_response(status)
+                if status == 200:
+                    self.send_header('ETag', bin_.etag())
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_PUT(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with bin_.lock:
+                    if bin_.fail_puts:
+                        bin_.fail_puts -= 1
+                        return self._send(bin_.fail_status, {'message': 'failed'})
+                    bin_.record = body
+                    bin_.puts.append(body)
+                self._send(200, {'record': body})
+
+            def do_GET(self):
+                with bin_.lock:
+                    self._send(200, {'record': bin_.record})
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def etag(self):
+        return '"' + hashlib.md5(json.dumps(self.record, sort_keys=True).encode()).hexdigest() + '"'
+
+
+@pytest.fixture
+def fake_bin():
+    server = FakeJsonBin()
+    yield server
+    server.server.shutdown()
+
+
+def make_worker(fake_bin, **kwargs):
+    options = dict(debounce_seconds=0.2, backoff_base=0.05, backoff_max=0.1, timeout=2)
+    options.update(kwargs)
+    return CloudSyncWorker('key', 'bin', base_url=fake_bin.url, **options).start()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_burst_of_edits_is_coalesced_into_one_put(fake_bin):
+    worker = make_worker(fake_bin)
+    for n in range(10):
+        worker.submit({'event_title': f"edit {n}"})
+    assert worker.flush(timeout=5)
+    assert [put['event_title'] for put in fake_bin.puts] == ["edit 9"]
+    assert worker.status()['coalesced'] == 9
+    worker.stop()
+
+
+def test_max_wait_bounds_the_debounce(fake_bin):
+    worker = make_worker(fake_bin, debounce_seconds=0.3, max_wait_seconds=0.5)
+    started = time.monotonic()
+    while not fake_bin.puts and time.monotonic() - started < 3:
+        worker.submit({'event_title': "typing"})  # never quiet for the whole debounce
+        time.sleep(0.05)
+    assert fake_bin.puts, "a steady stream of edits was never written"
+    assert time.monotonic() - started < 1.5
+    worker.stop()
+
+
+def test_server_errors_are_retried(fake_bin):
+    fake_bin.fail_puts = 2
+    worker = make_worker(fake_bin)
+    worker.submit({'event_title': "after outage"})
+    assert worker.flush(timeout=5)
+    assert [put['event_title'] for put in fake_bin.puts] == ["after outage"]
+    status = worker.status()
+    assert status['written'] == 1 and status['consecutive_failures'] == 0 and status['last_error'] is None
+    worker.stop()
+
+
+def test_permanent_errors_wait_for_a_manual_retry(fake_bin):
+    fake_bin.fail_puts, fake_bin.fail_status = 1, 401
+    worker = make_worker(fake_bin)
+    seq = worker.submit({'event_title': "bad key"})
+    assert worker.flush(timeout=5)
+    status = worker.status()
+    assert status['failed'] and status['written_seq'] < seq and status['lag_seconds'] == 0.0
+    assert not fake_bin.puts and worker.describe_status().startswith("⛔ Sync stopped: HTTP 401")
+    assert worker.retry_failed() > seq
+    assert worker.flush(timeout=5)
+    assert [put['event_title'] for put in fake_bin.puts] == ["bad key"]
+    assert worker.written_seq > seq and not worker.status()['failed']
+    worker.stop()
+
+
+def test_cloud_sync_status_is_reported(fake_bin):
+    # JsonBinStorage.describe_status() is what the app shows as `cloud_sync_status`.
+    fake_bin.fail_puts = 1
+    storage = JsonBinStorage(make_worker(fake_bin, backoff_base=0.5, backoff_max=0.5))
+    assert storage.describe_status() is None
+    storage.save({'event_title': "Kentep", 'teams_data': []})
+    assert storage.describe_status().startswith("⏳ Syncing")
+    wait_for(lambda: storage.worker.status()['consecutive_failures'])
+    assert storage.describe_status().startswith("⚠️ Sync failed x1") and "HTTP 503" in storage.describe_status()
+    assert storage.worker.flush(timeout=5)
+    assert storage.describe_status().startswith("✅ Last sync")
+    assert fake_bin.puts[-1]['event']['event_title'] == "Kentep"
+    storage.worker.stop()
+
+
+def test_app_reports_cloud_sync_status(fake_bin):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file("../kentep.py", default_timeout=30)
+    at.secrets.update(JSONBIN_API_KEY='key', JSONBIN_BIN_ID='app-bin', JSONBIN_BASE_URL=fake_bin.url, LOCAL_CACHE_PATH="")
+    at.run()
+    assert at.session_state.cloud_sync_status == "🔄 Loaded from cloud"
+    at.text_input(key="event_title").input("Kentep Cup").run()
+    assert at.session_state.cloud_sync_status.startswith("⏳ Syncing")
+    wait_for(lambda: fake_bin.puts)
+    at.run()
+    assert at.session_state.cloud_sync_status.startswith("✅ Last sync")
+    assert fake_bin.puts[-1]['event']['event_title'] == "Kentep Cup"
+
+
+def test_app_stays_unsynced_when_the_write_is_refused(fake_bin):
+    from streamlit.testing.v1 import AppTest
+    from kentep_core.state import has_unsynced_changes
+    at = AppTest.from_file("../kentep.py", default_timeout=30)
+    at.secrets.update(JSONBIN_API_KEY='key', JSONBIN_BIN_ID='refused-bin', JSONBIN_BASE_URL=fake_bin.url, LOCAL_CACHE_PATH="")
+    at.run()
+    fake_bin.fail_puts, fake_bin.fail_status = 1, 401
+    at.text_input(key="event_title").input("Kentep Cup").run()
+    wait_for(lambda: not fake_bin.fail_puts)
+    time.sleep(0.2)
+    at.run()
+    assert has_unsynced_changes(at.session_state) and not fake_bin.puts
+    assert at.session_state.cloud_sync_status.startswith("⛔ Sync stopped: HTTP 401")
+    at.button(key="retry_sync_button").click().run()
+    wait_for(lambda: fake_bin.puts)
+    time.sleep(0.2)
+    at.run()
+    assert not has_unsynced_changes(at.session_state)
+    assert fake_bin.puts[-1]['event']['event_title'] == "Kentep Cup"
@@ -0,0 +1,57 @@
+# Kentep League Manager - team forming: balanced distribution, rules and keepers
+# Run from the repo root: python -m pytest tests
+import pytest
+
+from kentep_core.players import parse_constraints, parse_player_entry
+from kentep_core.teams import form_teams
+
+OUTFIELD = [parse_player_entry(line) for line in (
+    "Andi (9) [FW]", "Budi (8) [MF]", "Citra (7) [DF]", "Dedi (6) [FW]", "Eko (5) [MF]", "Fajar (9) [DF]", "Gilang (4)",
+    "Hadi (7) [FW]", "Indra (6) [MF]", "Joko (8) [DF]", "Kiki (5)", "Lutfi (3) [MF]", "Made (6) [FW]", "Nanda (7)",
+)]
+KEEPERS = [parse_player_entry(line) for line in ("Oki (8)", "Putra (6)", "Rian (5)", "Sandi (3)", "Tono (4)")]
+
+
+def team_of(teams):
+    return {p['name']: team['id'] for team in teams for p in team['players']}
+
+
+def outfield_sizes(teams):
+    return [sum(not p['is_gk'] for p in team['players']) for team in teams]
+
+
+@pytest.mark.parametrize('seed', [1, 7, 42])
+def test_rules_are_honoured_and_sizes_stay_within_one(seed):
+    together, apart, errors = parse_constraints("Andi = Budi\nFajar = Joko\nAndi != Fajar\nHadi != Dedi\nGhost = Andi")
+    assert not errors
+    teams, report = form_teams(OUTFIELD, KEEPERS[:3], 3, together=together, apart=apart, seed=seed, time_budget=2.0)
+    where = team_of(teams)
+    assert where['Andi'] == where['Budi'] and where['Fajar'] == where['Joko']
+    assert where['Andi'] != where['Fajar'] and where['Hadi'] != where['Dedi']
+    assert report['violations'] == 0 and report['unknown_constraint_names'] == ['Ghost']
+    sizes = outfield_sizes(teams)
+    assert max(sizes) - min(sizes) <= 1 and sum(sizes) == len(OUTFIELD)
+    assert [sum(p['is_gk'] for p in team['players']) for team in teams] == [1, 1, 1]
+    assert report['rating_spread'] <= 2
+
+
+def test_extra_keepers_play_outfield():
+    teams, _ = form_teams(OUTFIELD, KEEPERS, 2, seed=3, time_budget=0.5)
+    players = [p for team in teams for p in team['players']]
+    keepers = [p for p in players if p['is_gk']]
+    # The two best keepers keep goal; the rest are outfield players listed as 'GK'.
+    assert sorted(p['name'] for p in keepers) == ["Oki", "Putra"]
+    extra = [p for p in players if p['name'] in ("Rian", "Sandi", "Tono")]
+    assert len(extra) == 3 and all(p['position'] == 'GK' and not p['is_gk'] for p in extra)
+    sizes = outfield_sizes(teams)
+    assert sizes == [9, 8] or sizes == [8, 9]
+
+
+def test_unbalanced_teams_follow_the_seed():
+    first, report = form_teams(OUTFIELD, KEEPERS, 3, balance=False, seed=11)
+    again, _ = form_teams(OUTFIELD, KEEPERS, 3, balance=False, seed=11)
+    assert report is None and first == again
+    sizes = outfield_sizes(first)
+    assert max(sizes) - min(sizes) <= 1 and sum(sizes) == len(OUTFIELD) + 2
+    extra = [p for team in first for p in team['players'] if p['position'] == 'GK' and not p['is_gk']]
+    assert len(extra) == 2